@@ -0,0 +1,137 @@
+"""
+Async Fetching
+Bounded concurrency, token-bucket rate limiting, retries and timeouts for provider requests
+"""
+
+import asyncio
+import functools
+import inspect
+import random
+import threading
+import time
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for coroutines
+
+    Holds up to `capacity` tokens, refilled at `rate` per second. A request
+    takes one token and, when the bucket is empty, reserves the next one
+    and sleeps until it is due. The balance is updated without awaiting,
+    so waiters are served in arrival order without a lock and the bucket
+    can be shared by event loops run one after another.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class RequestLimiter:
+    """
+    Runs provider requests with bounded concurrency, rate limit, retries and timeout
+
+    Args:
+        max_concurrency: Requests in flight at once
+        rate_limit: Requests started per second (None for no limit)
+        burst: Requests that may start back to back (default: one second's worth)
+        timeout: Seconds allowed per attempt (None for no limit)
+        retries: Attempts after the first before a request fails
+        backoff: Delay before the first retry, doubled on each further retry
+        max_backoff: Upper bound on the retry delay
+        jitter: Random extra fraction of each delay, so retries spread out
+    """
+
+    def __init__(self, max_concurrency=8, rate_limit=None, burst=None, timeout=30.0,
+                 retries=3, backoff=0.5, max_backoff=8.0, jitter=0.1):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._semaphore = None
+        self._loop = None
+
+    def delay(self, attempt):
+        """Backoff before retry number `attempt` (0-based)"""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * (1 + self.jitter * random.random())
+
+    async def call(self, function, *args):
+        """
+        Await function(*args) under the limits, retrying failures
+
+        Coroutine functions are awaited directly and cancelled on timeout.
+        Blocking functions run on the default thread pool; a timed-out
+        call is abandoned and its thread finishes in the background.
+
+        Raises:
+            The last attempt's exception (asyncio.TimeoutError on timeout)
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._get_semaphore():
+                    if self.bucket is not None:
+                        await self.bucket.acquire()
+                    return await asyncio.wait_for(self._start(function, args), self.timeout)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.delay(attempt))
+
+    def _start(self, function, args):
+        if inspect.iscoroutinefunction(function) or inspect.iscoroutinefunction(getattr(function, '__call__', None)):
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, functools.partial(function, *args))
+
+    def _get_semaphore(self):
+        # Semaphores belong to one event loop; each sync run starts a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+def run_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code
+
+    Uses asyncio.run, or a helper thread when the caller is already inside
+    an event loop (e.g. a notebook).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    result = {}
+
+    def target():
+        try:
+            result['value'] = asyncio.run(coroutine)
+        except BaseException as e:
+            result['error'] = e
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
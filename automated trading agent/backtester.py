@@ -7,24 +7,155 @@ Simulates trading strategies on historical data
 import pandas as pd
 import numpy as np
 
+from compact import is_compact, compact_columns, integer_dtype
+
+try:
+    from numba import njit
+except ImportError:  # Optional: the NumPy engine is used without it
+    njit = None
+
+def _share_quotient(available_cash, price):
+    """
+    available_cash // price for an entry, guarded against bad closes
+    
+    Non-positive and non-finite closes never buy: a negative close gives
+    0 and NaN or infinite closes fail the affordability check before
+    this. A zero close (or one so small the count overflows) gives inf,
+    and non-finite cash gives inf or NaN; there the legacy loop's int()
+    raises and the bar is skipped.
+    """
+    if price > 0:
+        return available_cash // price
+    return np.inf if price == 0 else 0.0
+
+def _simulate_bars(close, signal, initial_capital, commission_fee,
+                   stop_loss=0.0, take_profit=0.0, trailing_stop=0.0):
+    """
+    Per-bar cash and shares state machine over plain float arrays
+    
+    Written for numba's nopython mode: same rules and float operations as
+    Backtester._simulate, so both produce identical paths. Stops are
+    fractions of the entry price (trailing: of the highest close since
+    entry); 0 disables a stop.
+    
+    Returns:
+        Tuple of (cash, shares, transaction_cost) arrays
+    """
+    n = len(close)
+    cash = np.empty(n)
+    shares = np.empty(n)
+    costs = np.zeros(n)
+    
+    current_cash = initial_capital
+    current_shares = 0
+    # Stop state of the open position
+    stop_price = -np.inf
+    target_price = np.inf
+    high = -np.inf
+    armed = True
+    for i in range(n):
+        price = close[i]
+        skipped = False
+        if signal[i] != 1:
+            # After a stop-out, wait for the entry signal to lapse
+            armed = True
+        if signal[i] == 1 and current_shares == 0:
+            # Rule A: The "Affordability" Check
+            available_cash = current_cash - commission_fee
+            if armed and available_cash > price:
+                quotient = _share_quotient(available_cash, price)
+                if not np.isfinite(quotient):
+                    skipped = True
+                elif quotient > 0:
+                    num_shares = int(quotient)
+                    current_shares = num_shares
+                    current_cash -= (num_shares * price) + commission_fee
+                    costs[i] = commission_fee
+                    if stop_loss > 0:
+                        stop_price = price * (1 - stop_loss)
+                    if take_profit > 0:
+                        target_price = price * (1 + take_profit)
+                    high = price
+        elif (signal[i] == -1 or signal[i] == 0) and current_shares > 0:
+            current_cash += (current_shares * price) - commission_fee
+            current_shares = 0
+            costs[i] = commission_fee
+        elif current_shares > 0:
+            if price > high:
+                high = price
+            if ((stop_loss > 0 and price <= stop_price)
+                    or (take_profit > 0 and price >= target_price)
+                    or (trailing_stop > 0 and price <= high * (1 - trailing_stop))):
+                current_cash += (current_shares * price) - commission_fee
+                current_shares = 0
+                costs[i] = commission_fee
+                stop_price = -np.inf
+                target_price = np.inf
+                armed = False
+        if skipped:
+            # The legacy loop leaves the row of a failed entry zeroed
+            cash[i] = 0.0
+            shares[i] = 0.0
+        else:
+            cash[i] = current_cash
+            shares[i] = current_shares
+    return cash, shares, costs
+
+# Compiled on first use when numba is installed
+if njit is not None:
+    _share_quotient = njit(cache=True, nogil=True)(_share_quotient)
+    _simulate_jit = njit(cache=True, nogil=True)(_simulate_bars)
+else:
+    _simulate_jit = None
+
+ENGINES = ('auto', 'numba', 'array', 'loop')
+
 class Backtester:
     """Class to backtest trading strategies"""
     
-    def __init__(self, initial_capital=10000, commission_fee=1.0):
+    # Bars in the first chunk of a holding period scanned for stops
+    STOP_CHUNK = 256
+    
+    def __init__(self, initial_capital=10000, commission_fee=1.0, engine='auto',
+                 stop_loss=None, take_profit=None, trailing_stop=None):
         self.initial_capital = initial_capital
         self.commission_fee = commission_fee  # Fixed fee per trade
+        # Exit fractions checked on every bar a position is open: below
+        # entry * (1 - stop_loss), above entry * (1 + take_profit), or below
+        # the highest close since entry * (1 - trailing_stop). None disables.
+        self.stop_loss = stop_loss or 0.0
+        self.take_profit = take_profit or 0.0
+        self.trailing_stop = trailing_stop or 0.0
+        # 'numba' (compiled kernel), 'array' (NumPy event jumps), 'loop'
+        # (legacy per-bar loop), or 'auto': numba when installed, else array
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == 'numba' and _simulate_jit is None:
+            raise ImportError("engine='numba' requires the numba package")
+        if engine == 'loop' and self._has_stops():
+            raise ValueError("The legacy loop engine does not support stops")
+        self.engine = engine
         
-    def run(self, data, signals):
+    def run(self, data, signals, narrow=False):
         """
         Run the backtest with Paper Money logic
         
         Args:
             data: DataFrame with price data ('Close')
             signals: DataFrame with 'Signal' and 'Position_Size' columns
+            narrow: Return only the columns the backtest adds ('Signal'
+                onwards) instead of a copy of data with them appended
             
         Returns:
             DataFrame with backtest results
         """
+        if narrow and self.engine != 'loop':
+            # Read the price column in place; nothing from data is copied
+            signal = self._signal_series(signals, data.index)
+            columns = self._backtest_columns(self._first_column(data, 'Close'), signal)
+            columns.insert(0, 'Signal', signal)
+            return columns
+        
         df = data.copy()
         
         # Handle potential MultiIndex from yfinance
@@ -41,6 +172,199 @@ class Backtester:
         else:
             df['Signal'] = 0
 
+        if self.engine == 'loop':
+            df = self._run_loop(df)
+            return df.iloc[:, len(data.columns):] if narrow else df
+        
+        columns = self._backtest_columns(self._first_column(df, 'Close'), self._first_column(df, 'Signal'))
+        if df.columns.isin(columns.columns).any():
+            # Re-running on a results frame: overwrite the existing columns in place
+            return df.assign(**columns)
+        return pd.concat([df, columns], axis=1)
+    
+    def _backtest_columns(self, close, signal):
+        """Simulate trading and build every result column in one frame"""
+        # Pull prices and signals into plain arrays once
+        close_values = close.to_numpy(dtype=np.float64)
+        signal_values = signal.to_numpy(dtype=np.float64)
+        if self.engine in ('auto', 'numba') and _simulate_jit is not None:
+            cash, shares, costs = _simulate_jit(close_values, signal_values,
+                                                float(self.initial_capital), float(self.commission_fee),
+                                                float(self.stop_loss), float(self.take_profit),
+                                                float(self.trailing_stop))
+        else:
+            cash, shares, costs = self._simulate(close_values, signal_values)
+        
+        # Rule C: The "Equity" Calculation
+        # Total Equity = Current Cash + (Shares Held * Current Market Price)
+        equity = pd.Series(cash + shares * close_values, index=close.index)
+        
+        columns = pd.DataFrame({
+            'Cash': cash,
+            'Shares': shares,
+            'Total_Equity': equity,
+            'Transaction_Cost': costs,
+            **self._performance_columns(close, equity, shares)
+        }, index=close.index)
+        if is_compact(close):
+            # Money stays float64; counts and return-like columns shrink
+            columns['Shares'] = shares.astype(integer_dtype(shares))
+            compact_columns(columns, ['Transaction_Cost', 'Strategy_Return', 'Daily_Return',
+                                      'Cumulative_Strategy_Return', 'Cumulative_Market_Return',
+                                      'Peak', 'Drawdown', 'Position'])
+        return columns
+    
+    def _has_stops(self):
+        return bool(self.stop_loss or self.take_profit or self.trailing_stop)
+    
+    def _first_column(self, df, column):
+        """Return a column as a Series (first column if duplicated)"""
+        col = df[column]
+        if isinstance(col, pd.DataFrame):
+            col = col.iloc[:, 0]
+        return col
+    
+    def _signal_series(self, signals, index):
+        """Signal column of signals aligned to the price index"""
+        if 'Signal' not in signals.columns:
+            return pd.Series(0, index=index)
+        signal = self._first_column(signals, 'Signal')
+        if not signal.index.equals(index):
+            signal = signal.reindex(index)
+        return signal
+    
+    def _simulate(self, close, signal):
+        """
+        All-in/all-out cash and shares state machine over plain arrays
+        
+        Only bars where the state can change are visited: buy signals while
+        flat and exit signals (-1 or 0) while holding. Cash and shares are
+        constant in between, so the per-bar paths are filled afterwards.
+        With stops, each holding period is also scanned for the first bar
+        that hits a stop, and re-entry after a stop-out waits for the buy
+        signal to lapse.
+        
+        Returns:
+            Tuple of (cash, shares, transaction_cost) arrays
+        """
+        n = len(close)
+        buy_bars = np.flatnonzero(signal == 1)
+        sell_bars = np.flatnonzero((signal == -1) | (signal == 0))
+        stops = self._has_stops()
+        if stops:
+            lapse_bars = np.flatnonzero(signal != 1)
+            # Trailing exit level per close; scaling commutes with the running
+            # maximum, so the level since entry is a running maximum of this
+            trail = close * (1 - self.trailing_stop) if self.trailing_stop > 0 else None
+        
+        current_cash = self.initial_capital
+        current_shares = 0
+        trade_bars = []
+        skipped_bars = []
+        cash_path = [current_cash]
+        shares_path = [current_shares]
+        
+        i = 0
+        while i < n:
+            if current_shares == 0:
+                k = np.searchsorted(buy_bars, i)
+                if k == len(buy_bars):
+                    break
+                i = buy_bars[k]
+                price = close[i]
+                
+                # Rule A: The "Affordability" Check
+                available_cash = current_cash - self.commission_fee
+                if available_cash > price:
+                    quotient = _share_quotient(available_cash, price)
+                    if not np.isfinite(quotient):
+                        skipped_bars.append(i)
+                    elif quotient > 0:
+                        num_shares = int(quotient)
+                        current_shares = num_shares
+                        current_cash -= (num_shares * price) + self.commission_fee
+                        trade_bars.append(i)
+                        cash_path.append(current_cash)
+                        shares_path.append(current_shares)
+                        entry_bar = i
+            else:
+                k = np.searchsorted(sell_bars, i)
+                exit_bar = sell_bars[k] if k < len(sell_bars) else n
+                stop_bar = self._stop_bar(close, trail, entry_bar, exit_bar) if stops else None
+                if stop_bar is not None:
+                    exit_bar = stop_bar
+                elif exit_bar == n:
+                    break
+                i = exit_bar
+                price = close[i]
+                
+                current_cash += (current_shares * price) - self.commission_fee
+                current_shares = 0
+                trade_bars.append(i)
+                cash_path.append(current_cash)
+                shares_path.append(current_shares)
+                if stop_bar is not None:
+                    # Re-arm entries only after a bar without a buy signal
+                    k = np.searchsorted(lapse_bars, i + 1)
+                    if k == len(lapse_bars):
+                        break
+                    i = lapse_bars[k]
+            i += 1
+        
+        # Map every bar to the state produced by the last trade at or before it
+        state = np.zeros(n, dtype=np.intp)
+        state[trade_bars] = 1
+        state = np.cumsum(state)
+        
+        cash = np.asarray(cash_path, dtype=np.float64)[state]
+        shares = np.asarray(shares_path, dtype=np.float64)[state]
+        # The legacy loop leaves the row of a failed entry zeroed
+        cash[skipped_bars] = 0.0
+        shares[skipped_bars] = 0.0
+        costs = np.zeros(n)
+        costs[trade_bars] = self.commission_fee
+        return cash, shares, costs
+    
+    def _stop_bar(self, close, trail, entry_bar, exit_bar):
+        """
+        First bar in (entry_bar, exit_bar) where a stop is hit, or None
+        
+        The holding period is scanned in growing chunks, so the work is
+        proportional to how long the position actually stays open. trail
+        is close * (1 - trailing_stop), or None without a trailing stop.
+        """
+        entry_price = close[entry_bar]
+        # A disabled level is NaN, which no close compares true against
+        floor = entry_price * (1 - self.stop_loss) if self.stop_loss > 0 else np.nan
+        target_price = entry_price * (1 + self.take_profit) if self.take_profit > 0 else np.nan
+        
+        start, chunk = entry_bar + 1, self.STOP_CHUNK
+        while start < exit_bar:
+            end = min(start + chunk, exit_bar)
+            prices = close[start:end]
+            if trail is None:
+                hit = prices <= floor
+            else:
+                # Running maximum from the bar before the chunk; before the
+                # first chunk that is the entry bar itself
+                levels = np.fmax.accumulate(trail[start - 1:end])[1:]
+                if start > entry_bar + 1:
+                    np.fmax(levels, high, out=levels)
+                high = levels[-1]
+                if self.stop_loss > 0:
+                    # The exit level is the higher of the trailing and fixed stops
+                    np.fmax(levels, floor, out=levels)
+                hit = prices <= levels
+            if self.take_profit > 0:
+                hit |= prices >= target_price
+            k = hit.argmax()
+            if hit[k]:
+                return start + int(k)
+            start, chunk = end, chunk * 2
+        return None
+    
+    def _run_loop(self, df):
+        """Legacy per-bar simulation, kept for parity checks"""
         # Initialize tracking columns
         df['Cash'] = 0.0
         df['Shares'] = 0.0
@@ -51,10 +375,6 @@ class Backtester:
         current_cash = self.initial_capital
         current_shares = 0
         
-        # Handle potential MultiIndex from yfinance
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-
         # Iterate through data to simulate trades
         for i in range(len(df)):
             try:
@@ -92,20 +412,27 @@ class Backtester:
             df.at[df.index[i], 'Shares'] = current_shares
             df.at[df.index[i], 'Total_Equity'] = current_cash + (current_shares * price)
             
+        return df.assign(**self._performance_columns(df['Close'], df['Total_Equity'], df['Shares']))
+    
+    def _performance_columns(self, close, equity, shares):
+        """Derive return, benchmark and drawdown columns from the equity path"""
         # Calculate returns for compatibility with other components
-        df['Portfolio_Value'] = df['Total_Equity']
-        df['Cumulative_Strategy_Return'] = df['Total_Equity'] / self.initial_capital
-        df['Strategy_Return'] = df['Total_Equity'].pct_change().fillna(0)
+        cumulative = equity / self.initial_capital
         
         # Market benchmark
-        df['Daily_Return'] = df['Close'].pct_change().fillna(0)
-        df['Cumulative_Market_Return'] = (1 + df['Daily_Return']).cumprod()
+        daily_return = close.pct_change().fillna(0)
         
         # Calculate Drawdown
-        df['Peak'] = df['Cumulative_Strategy_Return'].cummax()
-        df['Drawdown'] = (df['Cumulative_Strategy_Return'] - df['Peak']) / df['Peak']
-        
-        # Position for trade statistics (1 if holding, 0 if not)
-        df['Position'] = (df['Shares'] > 0).astype(int)
+        peak = cumulative.cummax()
         
-        return df
+        return {
+            'Portfolio_Value': equity,
+            'Cumulative_Strategy_Return': cumulative,
+            'Strategy_Return': equity.pct_change().fillna(0),
+            'Daily_Return': daily_return,
+            'Cumulative_Market_Return': (1 + daily_return).cumprod(),
+            'Peak': peak,
+            'Drawdown': (cumulative - peak) / peak,
+            # Position for trade statistics (1 if holding, 0 if not)
+            'Position': (np.asarray(shares) > 0).astype(int),
+        }
@@ -0,0 +1,342 @@
+"""
+Benchmark Suite
+Offline timings and peak memory for the signal -> backtest -> metrics hot paths
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtester import Backtester, _simulate_jit
+from performance_metrics import PerformanceAnalyzer
+from strategies import (MovingAverageCrossover, RSIStrategy, MACDStrategy,
+                        BollingerBandsStrategy, MomentumStrategy)
+
+STRATEGIES = {
+    'SMA': MovingAverageCrossover,
+    'RSI': RSIStrategy,
+    'MACD': MACDStrategy,
+    'BOLLINGER': BollingerBandsStrategy,
+    'MOMENTUM': MomentumStrategy,
+}
+
+# Regular-session minutes per trading day for minute bars
+SESSION_MINUTES = 390
+
+# (frequency, bars per ticker, tickers) scenarios
+PRESETS = {
+    'quick': [
+        ('daily', 1_000, 1),
+        ('daily', 10_000, 1),
+        ('daily', 2_520, 10),
+        ('minute', 100_000, 1),
+    ],
+    'full': [
+        ('daily', 1_000, 1),
+        ('daily', 10_000, 1),
+        ('daily', 2_520, 100),
+        ('daily', 2_520, 1_000),
+        ('minute', 100_000, 1),
+        ('minute', 1_000_000, 1),
+        ('minute', 10_000_000, 1),
+        ('minute', 100_000, 100),
+    ],
+}
+
+# Backtests timed with and without exits, on each engine that supports stops
+STOP_SETTINGS = {
+    'off': {},
+    'on': {'stop_loss': 0.02, 'take_profit': 0.05, 'trailing_stop': 0.03},
+}
+STOP_ENGINES = ('array', 'numba') if _simulate_jit is not None else ('array',)
+
+def synthetic_index(n_bars, freq='daily', start='2000-01-03'):
+    """
+    Business-day timestamps, or regular-session minute timestamps
+    (09:30-16:00, 390 per day) for freq='minute'
+    """
+    if freq == 'daily':
+        return pd.bdate_range(start, periods=n_bars)
+    if freq != 'minute':
+        raise ValueError(f"Unknown frequency: {freq}")
+
+    n_days = -(-n_bars // SESSION_MINUTES)
+    days = pd.bdate_range(start, periods=n_days).to_numpy()
+    minutes = (np.timedelta64(570, 'm') + np.arange(SESSION_MINUTES) * np.timedelta64(1, 'm'))
+    stamps = (days[:, None] + minutes[None, :]).ravel()[:n_bars]
+    return pd.DatetimeIndex(stamps)
+
+def synthetic_prices(n_bars, freq='daily', seed=0, ticker=0, start_price=100.0):
+    """
+    Seeded OHLCV bars following a geometric random walk
+
+    Each ticker draws from its own (seed, ticker) stream, so a ticker's
+    series does not depend on how many tickers are generated alongside it.
+
+    Returns:
+        DataFrame with Open, High, Low, Close and Volume columns
+    """
+    rng = np.random.default_rng([seed, ticker])
+    # Annualized 20% drift-free volatility, scaled to the bar length
+    bars_per_year = 252 * (SESSION_MINUTES if freq == 'minute' else 1)
+    sigma = 0.2 / np.sqrt(bars_per_year)
+
+    log_returns = rng.normal(0.0, sigma, n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0.0, sigma, n_bars)) * close
+
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, n_bars),
+    }, index=synthetic_index(n_bars, freq))
+
+def synthetic_universe(n_tickers, n_bars, freq='daily', seed=0):
+    """Yield (ticker, prices) pairs one at a time to bound memory"""
+    for i in range(n_tickers):
+        yield f"SYN{i:04d}", synthetic_prices(n_bars, freq, seed, ticker=i)
+
+def _time_stage(func, repeat):
+    """Best wall time over repeat runs, then peak traced memory of one more run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    # Tracing slows allocation down, so memory is measured in a separate run
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(times), peak
+
+def run_scenario(freq, n_bars, n_tickers, strategies, repeat=3, seed=0):
+    """
+    Benchmark every stage of every strategy on one synthetic universe
+
+    Stage times are summed over the tickers; peak memory is the largest
+    single-ticker peak.
+
+    Returns:
+        List of result records, one per (strategy, stage)
+    """
+    backtester = Backtester()
+    analyzer = PerformanceAnalyzer()
+    totals = {}
+
+    for _, data in synthetic_universe(n_tickers, n_bars, freq, seed):
+        for name in strategies:
+            strategy = STRATEGIES[name]({})
+            signals, signal_time, signal_peak = _time_stage(
+                lambda: strategy.generate_signals(data), repeat)
+            results, backtest_time, backtest_peak = _time_stage(
+                lambda: backtester.run(data, signals), repeat)
+            _, metrics_time, metrics_peak = _time_stage(
+                lambda: analyzer.calculate_metrics(results), repeat)
+
+            for stage, seconds, peak in [('generate_signals', signal_time, signal_peak),
+                                         ('backtest', backtest_time, backtest_peak),
+                                         ('metrics', metrics_time, metrics_peak)]:
+                total = totals.setdefault((name, stage), {'seconds': 0.0, 'peak_bytes': 0})
+                total['seconds'] += seconds
+                total['peak_bytes'] = max(total['peak_bytes'], peak)
+
+    records = []
+    for (name, stage), total in totals.items():
+        records.append({
+            'freq': freq,
+            'bars': n_bars,
+            'tickers': n_tickers,
+            'strategy': name,
+            'stage': stage,
+            'seconds': total['seconds'],
+            'bars_per_second': n_bars * n_tickers / total['seconds'] if total['seconds'] else None,
+            'peak_mb': total['peak_bytes'] / 2**20,
+        })
+    return records
+
+def run_stop_scenario(freq, n_bars, n_tickers, strategy='SMA', repeat=3, seed=0):
+    """
+    Benchmark Backtester.run with stops off and on for each engine
+
+    The same signals are backtested with no exits and with stop-loss,
+    take-profit and trailing stop all enabled, so the two stages differ
+    only by the stop checks.
+
+    Returns:
+        List of result records, one per (engine, stops) stage
+    """
+    totals = {}
+    for _, data in synthetic_universe(n_tickers, n_bars, freq, seed):
+        signals = STRATEGIES[strategy]({}).generate_signals(data)
+        for engine in STOP_ENGINES:
+            for stops, settings in STOP_SETTINGS.items():
+                backtester = Backtester(engine=engine, **settings)
+                # Compile the numba kernel outside the timed runs
+                backtester.run(data.iloc[:10], signals.iloc[:10])
+                _, seconds, peak = _time_stage(lambda: backtester.run(data, signals), repeat)
+                total = totals.setdefault((engine, stops), {'seconds': 0.0, 'peak_bytes': 0})
+                total['seconds'] += seconds
+                total['peak_bytes'] = max(total['peak_bytes'], peak)
+
+    records = []
+    for (engine, stops), total in totals.items():
+        records.append({
+            'freq': freq,
+            'bars': n_bars,
+            'tickers': n_tickers,
+            'strategy': strategy,
+            'stage': f"backtest_{engine}_stops_{stops}",
+            'engine': engine,
+            'stops': stops,
+            'seconds': total['seconds'],
+            'bars_per_second': n_bars * n_tickers / total['seconds'] if total['seconds'] else None,
+            'peak_mb': total['peak_bytes'] / 2**20,
+        })
+    return records
+
+def stop_overhead(report):
+    """
+    Time with stops on relative to stops off, per scenario and engine
+
+    Returns:
+        DataFrame with the two timings and their ratio (1.0 = no slowdown)
+    """
+    table = pd.DataFrame(report['results'])
+    if 'stops' not in table.columns:
+        return pd.DataFrame()
+    table = table.dropna(subset=['stops'])
+    keys = ['freq', 'bars', 'tickers', 'strategy', 'engine']
+    off = table[table['stops'] == 'off'][keys + ['seconds']]
+    on = table[table['stops'] == 'on'][keys + ['seconds']]
+    merged = off.merge(on, on=keys, suffixes=('_off', '_on'))
+    merged['ratio'] = merged['seconds_on'] / merged['seconds_off']
+    return merged.reset_index(drop=True)
+
+def environment():
+    """Commit and library versions the results were produced with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+    }
+
+def run_benchmarks(scenarios, strategies=None, repeat=3, seed=0, stops=False):
+    """
+    Run a list of (freq, bars, tickers) scenarios
+
+    With stops=True each scenario also times the backtest with stops off
+    and on for every engine (run_stop_scenario, on the first strategy).
+
+    Returns:
+        Dict with the environment and the list of result records
+    """
+    strategies = [s.upper() for s in (strategies or STRATEGIES)]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies: {unknown}")
+
+    records = []
+    for freq, n_bars, n_tickers in scenarios:
+        print(f"Benchmarking {n_tickers} x {n_bars:,} {freq} bars...")
+        records.extend(run_scenario(freq, n_bars, n_tickers, strategies, repeat, seed))
+        if stops:
+            records.extend(run_stop_scenario(freq, n_bars, n_tickers, strategies[0], repeat, seed))
+    return {'environment': environment(), 'seed': seed, 'repeat': repeat, 'results': records}
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Match records of two benchmark runs and flag slowdowns
+
+    Args:
+        baseline: Results dict (or path to its JSON file) from an earlier commit
+        current: Results dict (or path) to check
+        threshold: Relative slowdown above which a stage counts as a regression
+
+    Returns:
+        DataFrame of matched stages with their time ratio, slowest first
+    """
+    frames = []
+    for run in (baseline, current):
+        if isinstance(run, str):
+            with open(run, 'r') as f:
+                run = json.load(f)
+        frames.append(pd.DataFrame(run['results']))
+
+    keys = ['freq', 'bars', 'tickers', 'strategy', 'stage']
+    table = frames[0].merge(frames[1], on=keys, suffixes=('_baseline', '_current'))
+    table = table[keys + ['seconds_baseline', 'seconds_current', 'peak_mb_baseline', 'peak_mb_current']]
+    table['ratio'] = table['seconds_current'] / table['seconds_baseline']
+    table['regression'] = table['ratio'] > 1 + threshold
+    return table.sort_values('ratio', ascending=False, kind='stable').reset_index(drop=True)
+
+def _scenario(text):
+    """Parse a FREQ:BARS:TICKERS command-line scenario"""
+    freq, bars, tickers = text.split(':')
+    return freq, int(bars), int(tickers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backtest hot paths on synthetic data")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--scenario', type=_scenario, action='append',
+                        help="FREQ:BARS:TICKERS, e.g. minute:1000000:1 (overrides --preset)")
+    parser.add_argument('--strategies', nargs='+', default=None, help="Subset of " + ", ".join(STRATEGIES))
+    parser.add_argument('--stops', action='store_true',
+                        help="Also time the backtest with stops off and on for each engine")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='reports/benchmarks.json')
+    parser.add_argument('--compare', default=None, help="Baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scenario or PRESETS[args.preset], args.strategies, args.repeat, args.seed,
+                            stops=args.stops)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    table = pd.DataFrame(report['results'])
+    print(table[['freq', 'bars', 'tickers', 'strategy', 'stage', 'seconds', 'peak_mb']].to_string(index=False))
+    print(f"[OK] Results written to {args.output}")
+    if args.stops:
+        print(stop_overhead(report).to_string(index=False))
+
+    if args.compare:
+        comparison = compare(args.compare, report, args.threshold)
+        print(comparison.to_string(index=False))
+        regressions = int(comparison['regression'].sum())
+        if regressions:
+            print(f"[FAIL] {regressions} stages slower than baseline by more than {args.threshold:.0%}")
+            return 1
+        print("[OK] No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Compact Dtypes
+float32 prices and small integer signals, volumes and positions
+
+Compact mode is driven by the data: prices stored as float32 (see
+compact_prices) make generate_signals, apply_position_sizing and
+Backtester.run keep their outputs compact as well. Precision versus the
+float64 pipeline:
+
+- Prices are rounded to float32, a relative error of at most 2**-24
+  (about 6e-8), i.e. well under a cent below $100,000.
+- Indicators are computed by pandas in float64 from the rounded prices and
+  stored as float32. Price-level indicators (SMA, EMA, Bollinger bands)
+  stay within about 1e-7 relative of the float64 values. Differences and
+  ratios of prices (MACD, momentum, RSI, volatility, returns) carry an
+  error of about 1e-7 of the price level, so their relative error grows
+  near zero; on synthetic daily data they stay within 5e-6 of each
+  column's largest value (RSI within 2e-4 points).
+- A signal can only differ where two indicators (or an indicator and its
+  threshold) are within that error, e.g. on the exact bar of a crossover.
+- Backtest accounting (Cash, Total_Equity, Portfolio_Value) stays float64
+  and fills at the float32 prices. With the same trades, equity matches
+  the float64 run to about 1e-7 relative. Returns and drawdowns come from
+  two rounded prices and are stored as float32, so they are within about
+  2.5e-7 absolute; summary metrics agree to about 1e-5 relative.
+"""
+
+import numpy as np
+import pandas as pd
+
+PRICE_DTYPE = np.float32
+SIGNAL_DTYPE = np.int8
+
+# Whole-valued columns with values in {-1, 0, 1}
+SIGNAL_COLUMNS = ('Signal', 'Position')
+
+def is_compact(data):
+    """True when a frame (or Series) carries float32 prices"""
+    close = data if isinstance(data, pd.Series) else data.get('Close')
+    return close is not None and getattr(close, 'dtype', None) == PRICE_DTYPE
+
+def integer_dtype(values):
+    """int32 when every value fits, otherwise int64"""
+    info = np.iinfo(np.int32)
+    if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+        return np.int32
+    return np.int64
+
+def compact_prices(df):
+    """
+    Price frame with float32 prices and int32/int64 volume
+
+    Volume with missing values is kept as float32, since integers have no NaN.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if column == 'Volume' and not np.isnan(values.astype(np.float64)).any():
+            columns[column] = values.astype(integer_dtype(values), copy=False)
+        elif np.issubdtype(values.dtype, np.number):
+            columns[column] = values.astype(PRICE_DTYPE, copy=False)
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+def compact_columns(df, columns=None):
+    """
+    Shrink computed columns in place: float64 to float32 and {-1, 0, 1} signals to int8
+
+    Args:
+        df: Frame to convert
+        columns: Columns to convert (default: all)
+    """
+    for column in (df.columns if columns is None else columns):
+        values = df[column]
+        if column in SIGNAL_COLUMNS and not values.isna().any():
+            df[column] = values.to_numpy().astype(SIGNAL_DTYPE)
+        elif values.dtype == np.float64:
+            df[column] = values.to_numpy().astype(PRICE_DTYPE)
+    return df
@@ -0,0 +1,328 @@
+"""
+Covariance Estimation
+Sample, Ledoit-Wolf, EWMA and PCA factor covariance, rolling updates and a cache
+"""
+
+from collections import deque
+
+import pandas as pd
+import numpy as np
+
+from indicators import IndicatorCache
+
+METHODS = ('sample', 'ledoit_wolf', 'ewma', 'factor')
+
+# Covariance matrices keyed by universe, window and estimator
+DEFAULT_CACHE = IndicatorCache(max_bytes=128 * 2**20)
+
+def sample_covariance(returns):
+    """Unbiased sample covariance of a (bars x assets) return array"""
+    centered = returns - returns.mean(axis=0)
+    return centered.T @ centered / (len(returns) - 1)
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity
+
+    Same estimator as sklearn.covariance.ledoit_wolf: the maximum
+    likelihood covariance S is blended with mu * I, mu = trace(S) / n,
+    using the shrinkage intensity that minimizes the expected Frobenius
+    loss. Well conditioned even with fewer bars than assets.
+
+    Returns:
+        Tuple of (covariance, shrinkage intensity)
+    """
+    n_bars = len(returns)
+    centered = returns - returns.mean(axis=0)
+    cov = centered.T @ centered / n_bars
+    return _shrink(cov, ((centered ** 2).sum(axis=1) ** 2).sum(), n_bars)
+
+def _shrink(cov, quartic, n_bars):
+    """
+    Ledoit-Wolf blend of a maximum likelihood covariance
+
+    Args:
+        cov: Maximum likelihood covariance of the window
+        quartic: Sum over bars of the squared norm of each centered bar, squared
+        n_bars: Bars in the window
+    """
+    n_assets = len(cov)
+    variance_mean = np.trace(cov) / n_assets
+
+    delta = (cov ** 2).sum()
+    beta = (quartic / n_bars - delta) / (n_assets * n_bars)
+    delta = (delta - 2 * variance_mean * np.trace(cov) + n_assets * variance_mean ** 2) / n_assets
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+
+    shrunk = (1 - shrinkage) * cov
+    shrunk.flat[::n_assets + 1] += shrinkage * variance_mean
+    return shrunk, shrinkage
+
+def ewma_covariance(returns, decay=0.94):
+    """
+    RiskMetrics covariance: S_t = decay * S_{t-1} + (1 - decay) * r_t r_t'
+
+    Zero mean, started from the first bar's outer product, and evaluated
+    as one weighted product instead of a loop over bars.
+    """
+    n_bars = len(returns)
+    weights = (1 - decay) * decay ** np.arange(n_bars - 1, -1, -1, dtype=np.float64)
+    weights[0] = decay ** (n_bars - 1)
+    return (returns * weights[:, None]).T @ returns
+
+def factor_covariance(returns, n_factors=5):
+    """
+    PCA factor model: the top principal components plus diagonal residuals
+
+    The n_factors largest eigenpairs of the sample covariance explain the
+    common variation; each asset keeps the rest of its own variance as
+    idiosyncratic risk, so the matrix is positive definite.
+    """
+    return _factor_model(sample_covariance(returns), n_factors)
+
+def _factor_model(cov, n_factors=5):
+    """PCA factor model of a sample covariance matrix"""
+    n_factors = min(n_factors, len(cov))
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    loadings = eigenvectors[:, -n_factors:] * np.sqrt(np.maximum(eigenvalues[-n_factors:], 0))
+    common = loadings @ loadings.T
+    residual = np.maximum(np.diag(cov) - np.diag(common), 0)
+    common.flat[::len(cov) + 1] += residual
+    return common
+
+def estimate_covariance(returns, method='sample', **params):
+    """
+    Covariance of a complete (bars x assets) return array
+
+    Args:
+        returns: 2-D array without missing values
+        method: 'sample', 'ledoit_wolf', 'ewma' or 'factor'
+        params: Estimator options (decay for 'ewma', n_factors for 'factor')
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if method == 'sample':
+        return sample_covariance(returns)
+    if method == 'ledoit_wolf':
+        return ledoit_wolf(returns)[0]
+    if method == 'ewma':
+        return ewma_covariance(returns, **params)
+    if method == 'factor':
+        return factor_covariance(returns, **params)
+    raise ValueError(f"Unknown covariance method: {method}")
+
+def covariance_matrix(returns, method='sample', cache=DEFAULT_CACHE, **params):
+    """
+    Cached covariance of a return DataFrame
+
+    Entries are keyed by the universe (column labels), the window (first
+    and last date and length), a digest of the return values and the
+    estimator with its parameters, so repeated requests for the same
+    returns, e.g. from the optimizer and the risk manager, are estimated
+    once.
+
+    Returns:
+        DataFrame (tickers x tickers); read-only values when cached
+
+    Raises:
+        ValueError: If no row has a return for every column
+    """
+    returns = returns.dropna()
+    if returns.empty:
+        raise ValueError("No rows with a return for every column")
+    values = returns.to_numpy(dtype=np.float64)
+    key = (tuple(returns.columns), returns.index[0], returns.index[-1], len(returns),
+           IndicatorCache.fingerprint(values), method, tuple(sorted(params.items())))
+
+    def compute():
+        return estimate_covariance(values, method, **params)
+    values = compute() if cache is None else cache.lookup(key, compute)
+    return pd.DataFrame(values, index=returns.columns, columns=returns.columns, copy=False)
+
+def correlation_from_covariance(cov):
+    """Correlation matrix implied by a covariance matrix"""
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / np.outer(std, std)
+
+class RollingCovariance:
+    """
+    Covariance estimate of a sliding window, updated in place
+
+    Keeps the count, sum and cross-product matrix of the rows in the
+    window, shifted by the first rows added so the final centering does
+    not cancel. Adding or removing one bar is a rank-one update (O(n^2)
+    for n assets) instead of an O(window * n^2) recomputation; update()
+    moves the window by several bars with one rank-k product.
+
+    Each estimator is read from running statistics of the window:
+    'sample' and 'factor' from the cross products (the factor model's
+    eigendecomposition is still redone per estimate), 'ledoit_wolf' also
+    from fourth-moment sums, and 'ewma' from the recursion
+    S = decay * S + (1 - decay) * r r' with the bars that leave the
+    window taken back out. Estimates over a subset of the columns are
+    exact, as if only those assets had been added.
+    """
+
+    def __init__(self, n_assets, method='sample', **params):
+        """
+        Args:
+            n_assets: Columns of the rows added
+            method: 'sample', 'ledoit_wolf', 'ewma' or 'factor'
+            params: Estimator options (decay for 'ewma', n_factors for 'factor')
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown covariance method: {method}")
+        self.method = method
+        self.params = params
+        self.count = 0
+        self.shift = np.zeros(n_assets)
+        self.total = np.zeros(n_assets)
+        self.cross = np.zeros((n_assets, n_assets))
+        if method == 'ledoit_wolf':
+            # Sums of x_i^2, x_i^2 x_j^2 and x_i^2 x_j over the shifted rows
+            self.square_total = np.zeros(n_assets)
+            self.squares = np.zeros((n_assets, n_assets))
+            self.skew = np.zeros((n_assets, n_assets))
+        elif method == 'ewma':
+            self.decay = params.get('decay', 0.94)
+            self.decayed = np.zeros((n_assets, n_assets))
+            self.rows = deque()
+
+    def add(self, rows):
+        """Add one bar (1-D) or a block of bars (2-D) to the window"""
+        self.update(rows, ())
+
+    def remove(self, rows):
+        """Remove bars previously added to the window (the oldest ones, in order, for 'ewma')"""
+        self.update((), rows)
+
+    def update(self, new_rows, old_rows):
+        """Add new_rows and remove old_rows in one rank-k update"""
+        new_rows = np.asarray(new_rows, dtype=np.float64).reshape(-1, len(self.total))
+        old_rows = np.asarray(old_rows, dtype=np.float64).reshape(-1, len(self.total))
+        if self.count == 0 and len(new_rows):
+            self.shift = new_rows.mean(axis=0)
+        block = np.concatenate([new_rows, old_rows]) - self.shift
+        signed = block.copy()
+        signed[len(new_rows):] *= -1
+        self.cross += signed.T @ block
+        self.total += signed.sum(axis=0)
+        if self.method == 'ledoit_wolf':
+            signed *= block
+            self.squares += signed.T @ (block ** 2)
+            self.skew += signed.T @ block
+            self.square_total += signed.sum(axis=0)
+        elif self.method == 'ewma':
+            self._decay(new_rows, old_rows)
+        self.count += len(new_rows) - len(old_rows)
+
+    def _decay(self, new_rows, old_rows):
+        """
+        Run the EWMA recursion over new_rows and take old_rows back out
+
+        A bar i places from the newest holds weight (1 - decay) * decay^i,
+        so after len(new_rows) more steps the leaving bars' weights are
+        known exactly. The zero-mean recursion reads the raw rows.
+        """
+        steps = len(new_rows)
+        ages = np.concatenate([np.arange(steps - 1, -1, -1),
+                               self.count - 1 + steps - np.arange(len(old_rows))])
+        weights = (1 - self.decay) * self.decay ** ages.astype(np.float64)
+        weights[steps:] *= -1
+        rows = np.concatenate([new_rows, old_rows])
+        self.decayed *= self.decay ** steps
+        self.decayed += (rows * weights[:, None]).T @ rows
+        self.rows.extend(new_rows)
+        for _ in range(len(old_rows)):
+            self.rows.popleft()
+
+    def reset(self):
+        self.count = 0
+        self.total[:] = 0.0
+        self.cross[:] = 0.0
+        if self.method == 'ledoit_wolf':
+            self.square_total[:] = 0.0
+            self.squares[:] = 0.0
+            self.skew[:] = 0.0
+        elif self.method == 'ewma':
+            self.decayed[:] = 0.0
+            self.rows.clear()
+
+    @property
+    def mean(self):
+        return self.shift + self.total / self.count
+
+    def covariance(self, columns=None):
+        """
+        The estimator's covariance of the window
+
+        Args:
+            columns: Optional boolean mask of the assets to estimate
+        """
+        block = np.s_[:, :] if columns is None else np.ix_(columns, columns)
+        columns = np.s_[:] if columns is None else columns
+        if self.method == 'ewma':
+            # The recursion started from the first bar's outer product
+            first = self.rows[0][columns]
+            return self.decayed[block] + self.decay ** self.count * np.outer(first, first)
+
+        centered = self.total[columns] / self.count
+        cov = self.cross[block] - self.count * np.outer(centered, centered)
+        if self.method == 'ledoit_wolf':
+            cov /= self.count
+            return _shrink(cov, self._quartic(columns, block, centered), self.count)[0]
+        cov /= self.count - 1
+        if self.method == 'factor':
+            return _factor_model(cov, **self.params)
+        return cov
+
+    def _quartic(self, columns, block, centered):
+        """
+        Sum over bars of ||x_t - m||^4 for the selected columns
+
+        Expanded around the shifted mean m into the running sums, so it
+        needs no pass over the window.
+        """
+        norm = centered @ centered
+        return (self.squares[block].sum()
+                - 4 * self.skew[block].sum(axis=0) @ centered
+                + 4 * centered @ self.cross[block] @ centered
+                + 2 * norm * self.square_total[columns].sum()
+                - 4 * norm * (centered @ self.total[columns])
+                + self.count * norm ** 2)
+
+def rolling_windows(returns, window, ends, method='sample', refresh=50, **params):
+    """
+    Running window statistics at each end, for returns[end - window:end]
+
+    Consecutive windows are moved by adding the new bars and removing the
+    old ones; the statistics are rebuilt from scratch when windows do not
+    overlap and every `refresh` windows to bound rounding drift.
+
+    Yields:
+        Tuple of (end, RollingCovariance); the same object is updated in
+        place for the next window
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    stats = RollingCovariance(returns.shape[1], method, **params)
+    start = stop = 0
+    for i, end in enumerate(ends):
+        first = end - window
+        if first >= stop or i % refresh == 0:
+            stats.reset()
+            stats.add(returns[first:end])
+        else:
+            stats.update(returns[stop:end], returns[start:first])
+        start, stop = first, end
+        yield end, stats
+
+def rolling_covariances(returns, window, ends, refresh=50, method='sample', **params):
+    """
+    Covariance of returns[end - window:end] for each end
+
+    Yields:
+        Tuple of (end, mean, covariance)
+    """
+    for end, stats in rolling_windows(returns, window, ends, method, refresh, **params):
+        yield end, stats.mean, stats.covariance()
@@ -0,0 +1,233 @@
+"""
+Price Data Cache
+Persists downloaded price history per ticker as Parquet files under data/
+"""
+
+import json
+import os
+import re
+
+import pandas as pd
+from pandas.tseries.holiday import (MO, AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay,
+                                    USMemorialDay, USPresidentsDay, USThanksgivingDay,
+                                    nearest_workday, sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
+
+class ExchangeHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Regular full-day closures of the US stock exchanges
+
+    Unscheduled closures are left out on purpose: the calendar is used to
+    prove a range holds no session, so it may only err towards too few
+    holidays.
+    """
+
+    rules = [
+        # A Saturday New Year's Day is not made up on the Friday before
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        Holiday('Martin Luther King Jr. Day', start_date='1998-01-01', month=1, day=1,
+                offset=pd.DateOffset(weekday=MO(3))),
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', start_date='2022-01-01', month=6, day=19, observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+SESSION = CustomBusinessDay(calendar=ExchangeHolidayCalendar())
+
+class DataCache:
+    """
+    On-disk columnar cache of daily price history.
+
+    Each ticker is stored as one Parquet file. A JSON index records the
+    [start, end) date range that has been downloaded for every ticker, so a
+    request can be served from disk when it is fully covered and only the
+    missing head/tail segments need to be fetched otherwise.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir='data'):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self._index = self._read_index()
+
+    def coverage(self, ticker):
+        """Return the cached (start, end) range for a ticker, or None"""
+        entry = self._index.get(ticker)
+        if entry is None or not os.path.exists(self._path(ticker)):
+            return None
+        return pd.Timestamp(entry['start']), pd.Timestamp(entry['end'])
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        """
+        List the (start, end) segments of a request not held in the cache
+
+        Dates are returned as 'YYYY-MM-DD' strings with an exclusive end,
+        matching the yfinance download convention.
+        """
+        start, end = pd.Timestamp(start_date), self._cap_end(end_date)
+        if start >= end:
+            return []
+
+        covered = self.coverage(ticker)
+        if covered is None:
+            return [(self._fmt(start), self._fmt(end))]
+
+        cached_start, cached_end = covered
+        missing = []
+        if start < cached_start:
+            missing.append((self._fmt(start), self._fmt(cached_start)))
+        if end > cached_end:
+            # Extend from the cached end so the covered range stays contiguous
+            missing.append((self._fmt(cached_end), self._fmt(end)))
+        return missing
+
+    def load(self, ticker, start_date, end_date):
+        """Read the cached rows in [start_date, end_date)"""
+        if self.coverage(ticker) is None:
+            return pd.DataFrame()
+
+        df = pd.read_parquet(self._path(ticker))
+        start = self._localize(pd.Timestamp(start_date), df.index)
+        end = self._localize(pd.Timestamp(end_date), df.index)
+        return df.loc[(df.index >= start) & (df.index < end)]
+
+    def store(self, ticker, data, start_date, end_date):
+        """
+        Merge a downloaded segment into the cache and extend its coverage
+
+        Args:
+            ticker: Ticker symbol
+            data: DataFrame returned by the download for [start_date, end_date)
+            start_date: Start of the downloaded range
+            end_date: Exclusive end of the downloaded range
+        """
+        start, end = pd.Timestamp(start_date), self._cap_end(end_date)
+        if data is None or data.empty:
+            self._extend_coverage(ticker, start, end)
+            return
+
+        data = self._flatten_columns(data)
+
+        covered = self.coverage(ticker)
+        if covered is not None:
+            existing = pd.read_parquet(self._path(ticker))
+            data = pd.concat([existing, data])
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+            start, end = min(start, covered[0]), max(end, covered[1])
+
+        tmp_path = self._path(ticker) + '.tmp'
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(ticker))
+
+        # New raw rows make any cleaned copy stale
+        self._remove(self._path(ticker, clean=True))
+        self._index[ticker] = {'start': self._fmt(start), 'end': self._fmt(end)}
+        self._write_index()
+
+    def _extend_coverage(self, ticker, start, end):
+        """
+        Record a segment that returned no rows as covered if it has no sessions
+
+        yfinance also reports failed downloads as empty frames, so an empty
+        segment is only recorded when it provably holds no bars: it is next
+        to cached rows and spans only weekends and exchange holidays. Any
+        other empty segment, such as a failed top-up or dates before
+        listing, stays missing and is requested again.
+        """
+        covered = self.coverage(ticker)
+        if (covered is None or start > covered[1] or end < covered[0]
+                or len(pd.date_range(start, end - pd.Timedelta(days=1), freq=SESSION))):
+            return
+        self._index[ticker]['start'] = self._fmt(min(start, covered[0]))
+        self._index[ticker]['end'] = self._fmt(max(end, covered[1]))
+        self._write_index()
+
+    def load_clean(self, ticker, start_date, end_date, key):
+        """
+        Read the cleaned copy of a request made earlier with the same policy
+
+        Returns:
+            Tuple of (DataFrame, quality summary dict), or None when the
+            ticker was not cleaned for exactly this range and policy
+        """
+        entry = self._index.get(ticker, {}).get('clean')
+        path = self._path(ticker, clean=True)
+        if (entry is None or not os.path.exists(path) or entry['key'] != key
+                or entry['start'] != self._fmt(pd.Timestamp(start_date))
+                or entry['end'] != self._fmt(pd.Timestamp(end_date))):
+            return None
+        return pd.read_parquet(path), entry['summary']
+
+    def store_clean(self, ticker, data, summary, start_date, end_date, key):
+        """Keep the cleaned rows of a request next to the raw file, replacing older ones"""
+        if ticker not in self._index:
+            return
+        tmp_path = self._path(ticker, clean=True) + '.tmp'
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(ticker, clean=True))
+
+        self._index[ticker]['clean'] = {'start': self._fmt(pd.Timestamp(start_date)),
+                                        'end': self._fmt(pd.Timestamp(end_date)),
+                                        'key': key, 'summary': summary}
+        self._write_index()
+
+    def _path(self, ticker, clean=False):
+        """Parquet file path for a ticker (raw, or its cleaned copy)"""
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        suffix = '.clean' if clean else ''
+        return os.path.join(self.cache_dir, f"{safe_name}{suffix}.parquet")
+
+    @staticmethod
+    def _remove(path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _read_index(self):
+        """Load the coverage index, starting fresh if it is missing or corrupt"""
+        try:
+            with open(self._index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        """Atomically rewrite the coverage index"""
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._index_path)
+
+    def _cap_end(self, end_date):
+        """
+        Clamp an exclusive end date to today
+
+        Bars after today do not exist yet, and today's bar may still change,
+        so coverage never extends past it and the next request re-fetches it.
+        """
+        return min(pd.Timestamp(end_date), pd.Timestamp.today().normalize())
+
+    def _flatten_columns(self, data):
+        """Drop the ticker level yfinance adds to single-ticker columns"""
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.copy()
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+    @staticmethod
+    def _localize(timestamp, index):
+        """Match a naive bound to a timezone-aware index"""
+        tz = getattr(index, 'tz', None)
+        if tz is not None and timestamp.tzinfo is None:
+            return timestamp.tz_localize(tz)
+        return timestamp
+
+    @staticmethod
+    def _fmt(timestamp):
+        return timestamp.strftime('%Y-%m-%d')
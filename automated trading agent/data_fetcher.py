@@ -1,27 +1,255 @@
+import asyncio
 
-import yfinance as yf
 import pandas as pd
 
+from async_fetcher import RequestLimiter, run_sync
+from data_cache import DataCache
+from data_quality import summary_frame
+from data_providers import YFinanceProvider
+
 class DataFetcher:
     """
     Class to fetch historical stock data.
     """
-    def __init__(self):
-        pass
+    def __init__(self, cache_dir=None, batch_size=50, provider=None, downloader=None, limiter=None):
+        # Downloads are persisted under cache_dir when it is set
+        self.cache = DataCache(cache_dir) if cache_dir else None
+        self.batch_size = max(1, int(batch_size))
+        # Pluggable source: a DataProvider, or any callable(tickers, start,
+        # end) returning a frame with (Ticker, Price) columns
+        self.provider = provider or downloader or YFinanceProvider()
+        # Concurrency, rate limit, retries and timeouts of the async methods
+        self.limiter = limiter or RequestLimiter()
 
     def fetch_stock_data(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
-        Fetches historical stock data from Yahoo Finance.
+        Fetches historical stock data from the provider (default: Yahoo Finance).
+
+        With a cache configured, only the part of the range that is not
+        already on disk is downloaded.
         """
         print(f"Fetching data for {ticker} from {start_date} to {end_date}...")
         try:
-            data = yf.download(ticker, start=start_date, end=end_date)
-            
+            if self.cache is not None:
+                data = self._fetch_cached(ticker, start_date, end_date)
+            else:
+                data = self._download(ticker, start_date, end_date)
+
             if data.empty:
                 print(f"No data found for {ticker}.")
                 return pd.DataFrame()
-                
+
             return data
         except Exception as e:
             print(f"Error fetching data for {ticker}: {e}")
             return pd.DataFrame()
+
+    def fetch_many(self, tickers, start_date, end_date):
+        """
+        Fetch several tickers with one request per batch_size group
+
+        Tickers that need the same date range (everything, or the same
+        cache top-up segment) are downloaded together. A batch whose
+        request raises is split in halves and each half is requested
+        again, so one bad symbol only fails itself.
+
+        Returns:
+            Tuple of (data, failures): data maps ticker to its DataFrame and
+            failures maps ticker to the reason its download failed
+        """
+        tickers = list(dict.fromkeys(tickers))
+        data, failures = {}, {}
+        for segment_start, segment_end, batch in self._plan_batches(tickers, start_date, end_date):
+            self._fetch_batch(batch, segment_start, segment_end, data, failures)
+        return self._finish(tickers, start_date, end_date, data, failures)
+
+    async def fetch_many_async(self, tickers, start_date, end_date):
+        """
+        Concurrent fetch_many: batches are requested together under the limiter
+
+        Up to limiter.max_concurrency batches are in flight, started no
+        faster than its rate limit; a batch that raises or times out is
+        retried with exponential backoff, then split in halves like in
+        fetch_many before its tickers are reported as failures. Results are
+        identical to fetch_many.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        batches = self._plan_batches(tickers, start_date, end_date)
+        print(f"Fetching {len(tickers)} tickers in {len(batches)} concurrent requests...")
+        results = await asyncio.gather(
+            *[self._request_split(batch, segment_start, segment_end) for segment_start, segment_end, batch in batches])
+
+        data, failures = {}, {}
+        for (segment_start, segment_end, _), parts in zip(batches, results):
+            for batch, frame in parts:
+                if isinstance(frame, BaseException):
+                    failures.update({ticker: self._describe(frame) for ticker in batch})
+                    continue
+                self._store_batch(frame, batch, segment_start, segment_end, data, failures)
+        return self._finish(tickers, start_date, end_date, data, failures)
+
+    async def fetch_stock_data_async(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Async fetch_stock_data with the limiter's retries and timeout"""
+        data, failures = await self.fetch_many_async([ticker], start_date, end_date)
+        if ticker in failures:
+            print(f"Error fetching data for {ticker}: {failures[ticker]}")
+        return data.get(ticker, pd.DataFrame())
+
+    def fetch_many_concurrent(self, tickers, start_date, end_date):
+        """Blocking wrapper around fetch_many_async"""
+        return run_sync(self.fetch_many_async(tickers, start_date, end_date))
+
+    def fetch_stock_data_concurrent(self, ticker, start_date, end_date):
+        """Blocking wrapper around fetch_stock_data_async"""
+        return run_sync(self.fetch_stock_data_async(ticker, start_date, end_date))
+
+    def clean(self, data, start_date, end_date, cleaner):
+        """
+        Run a DataCleaner over fetched data, reusing cleaned copies in the cache
+
+        A ticker fetched for the same range and cleaned with the same
+        policy before is read back from the cache instead of cleaned
+        again; newly cleaned tickers are stored next to their raw file.
+
+        Returns:
+            Tuple of (cleaned dict, quality summary DataFrame indexed by ticker)
+        """
+        cleaned, summaries = {}, {}
+        for ticker, df in data.items():
+            cached = self.cache.load_clean(ticker, start_date, end_date, cleaner.key) if self.cache else None
+            if cached is not None:
+                cleaned[ticker], summaries[ticker] = cached
+                continue
+            cleaned[ticker], summaries[ticker] = cleaner.clean(df)
+            if self.cache is not None:
+                self.cache.store_clean(ticker, cleaned[ticker], summaries[ticker], start_date, end_date, cleaner.key)
+        return cleaned, summary_frame(summaries)
+
+    def _plan_batches(self, tickers, start_date, end_date):
+        """(start, end, tickers) requests covering what is not already cached"""
+        if self.cache is None:
+            segments = {(start_date, end_date): tickers}
+        else:
+            segments = {}
+            for ticker in tickers:
+                for segment in self.cache.missing_ranges(ticker, start_date, end_date):
+                    segments.setdefault(segment, []).append(ticker)
+
+        return [(segment_start, segment_end, group[i:i + self.batch_size])
+                for (segment_start, segment_end), group in segments.items()
+                for i in range(0, len(group), self.batch_size)]
+
+    def _fetch_batch(self, batch, start_date, end_date, data, failures):
+        """Request one batch, splitting it in halves while the request raises"""
+        print(f"Fetching {len(batch)} tickers from {start_date} to {end_date}...")
+        try:
+            frame = self.provider(batch, start_date, end_date)
+        except Exception as e:
+            if len(batch) == 1:
+                failures[batch[0]] = str(e)
+                return
+            middle = len(batch) // 2
+            self._fetch_batch(batch[:middle], start_date, end_date, data, failures)
+            self._fetch_batch(batch[middle:], start_date, end_date, data, failures)
+            return
+        self._store_batch(frame, batch, start_date, end_date, data, failures)
+
+    async def _request_split(self, batch, start_date, end_date):
+        """
+        Async _fetch_batch: request a batch, splitting it while it fails
+
+        Returns:
+            List of (tickers, frame or the exception of a single ticker)
+        """
+        try:
+            return [(batch, await self._request(batch, start_date, end_date))]
+        except Exception as e:
+            if len(batch) == 1:
+                return [(batch, e)]
+        middle = len(batch) // 2
+        first, second = await asyncio.gather(self._request_split(batch[:middle], start_date, end_date),
+                                             self._request_split(batch[middle:], start_date, end_date))
+        return first + second
+
+    async def _request(self, batch, start_date, end_date):
+        download = getattr(self.provider, 'download_async', None) or self.provider
+        return await self.limiter.call(download, batch, start_date, end_date)
+
+    def _store_batch(self, frame, batch, start_date, end_date, data, failures):
+        """Split a downloaded batch into the cache, or into data without one"""
+        frames, errors = self._split_batch(frame, batch)
+        for ticker, error in errors.items():
+            if self.cache is not None and self.cache.coverage(ticker) is not None:
+                # No bars in a top-up segment: the cached rows still serve
+                # the request, and the range is marked covered only if it
+                # has no sessions (otherwise it is retried next run)
+                self.cache.store(ticker, None, start_date, end_date)
+            else:
+                failures[ticker] = error
+        for ticker, df in frames.items():
+            if self.cache is not None:
+                self.cache.store(ticker, df, start_date, end_date)
+            else:
+                data[ticker] = df
+
+    def _finish(self, tickers, start_date, end_date, data, failures):
+        """Read the requested range back from the cache when there is one"""
+        if self.cache is not None:
+            for ticker in tickers:
+                frame = self.cache.load(ticker, start_date, end_date)
+                if not frame.empty:
+                    data[ticker] = frame
+                elif ticker not in failures:
+                    failures[ticker] = 'no data in requested range'
+        return data, failures
+
+    @staticmethod
+    def _describe(error):
+        if isinstance(error, asyncio.TimeoutError):
+            return 'request timed out'
+        return str(error) or type(error).__name__
+
+    def _fetch_cached(self, ticker, start_date, end_date):
+        """Top up the cache with any missing head/tail segment, then read it"""
+        for segment_start, segment_end in self.cache.missing_ranges(ticker, start_date, end_date):
+            segment = self._download(ticker, segment_start, segment_end)
+            self.cache.store(ticker, segment, segment_start, segment_end)
+        return self.cache.load(ticker, start_date, end_date)
+
+    def _download(self, ticker, start_date, end_date):
+        """Download one date range for a single ticker"""
+        frames, _ = self._split_batch(self.provider([ticker], start_date, end_date), [ticker])
+        return frames.get(ticker, pd.DataFrame())
+
+    def _split_batch(self, frame, tickers):
+        """
+        Split a (Ticker, Price) column frame into per-ticker frames
+
+        Each ticker is taken as a column slice and trimmed to its first and
+        last valid row by position, so no per-ticker copy is made unless
+        the ticker has gaps inside its range.
+        """
+        data, failures = {}, {}
+        if frame is None or frame.empty or not isinstance(frame.columns, pd.MultiIndex):
+            return data, {ticker: 'no data returned' for ticker in tickers}
+
+        returned = set(frame.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker not in returned:
+                failures[ticker] = 'no data returned'
+                continue
+
+            df = frame[ticker]
+            valid = df.notna().any(axis=1).to_numpy()
+            if not valid.any():
+                failures[ticker] = 'no data returned'
+                continue
+
+            first = valid.argmax()
+            last = len(valid) - valid[::-1].argmax()
+            df = df.iloc[first:last]
+            if not valid[first:last].all():
+                df = df[valid[first:last]]
+            df.columns = df.columns.rename(None)
+            data[ticker] = df
+        return data, failures
@@ -0,0 +1,138 @@
+"""
+Data Providers
+Pluggable sources of OHLCV history: Yahoo Finance and local file replay
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+PROVIDERS = ('yfinance', 'files')
+
+class DataProvider(ABC):
+    """
+    Source of historical bars for DataFetcher
+
+    A provider returns one frame for a group of tickers with (Ticker, Price)
+    MultiIndex columns covering [start_date, end_date). Tickers it has no
+    data for are simply left out. Providers are callables, so any function
+    with the same signature can be used in their place.
+    """
+
+    name = None
+
+    @abstractmethod
+    def download(self, tickers, start_date, end_date):
+        """Frame of bars for tickers over [start_date, end_date)"""
+        pass
+
+    def __call__(self, tickers, start_date, end_date):
+        return self.download(tickers, start_date, end_date)
+
+class YFinanceProvider(DataProvider):
+    """Yahoo Finance: one request per group of tickers"""
+
+    name = 'yfinance'
+
+    def __init__(self, threads=True):
+        self.threads = threads
+
+    def download(self, tickers, start_date, end_date):
+        # Imported on first download so offline runs do not need yfinance
+        import yfinance as yf
+
+        return yf.download(list(tickers), start=start_date, end=end_date, group_by='ticker',
+                           progress=False, threads=self.threads)
+
+class FileProvider(DataProvider):
+    """
+    Replays OHLCV dumps from a directory instead of the network
+
+    Each ticker is one file, <ticker>.parquet or <ticker>.csv (symbols
+    such as BRK/B use the same safe names as the data cache), indexed by
+    date in the first column. Files are read once and kept in memory, so
+    repeated runs and cache top-ups over the same universe only slice.
+    """
+
+    name = 'files'
+    EXTENSIONS = ('.parquet', '.csv')
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Replay directory not found: {directory}")
+        self.directory = directory
+        self._frames = {}
+
+    def download(self, tickers, start_date, end_date):
+        frames = {}
+        for ticker in tickers:
+            df = self.load(ticker)
+            if df is None:
+                continue
+            start = self._localize(pd.Timestamp(start_date), df.index)
+            end = self._localize(pd.Timestamp(end_date), df.index)
+            # The index is sorted, so the range is one positional slice
+            first, last = df.index.searchsorted([start, end])
+            if last > first:
+                frames[ticker] = df.iloc[first:last]
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+    def load(self, ticker):
+        """Full history of a ticker, or None when there is no file for it"""
+        if ticker not in self._frames:
+            path = self.path(ticker)
+            self._frames[ticker] = None if path is None else self._read(path)
+        return self._frames[ticker]
+
+    def path(self, ticker):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.directory, safe_name + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _read(self, path):
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, engine='pyarrow')
+            df.index = pd.to_datetime(df.index)
+        # Dumps of single-ticker downloads may keep yfinance's ticker level
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        df.index.name = 'Date'
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        return df[~df.index.duplicated(keep='last')]
+
+    @staticmethod
+    def _localize(timestamp, index):
+        """Give a naive bound the index's timezone"""
+        tz = getattr(index, 'tz', None)
+        if tz is not None and timestamp.tzinfo is None:
+            return timestamp.tz_localize(tz)
+        return timestamp
+
+def create_provider(data_config):
+    """
+    Build the provider named by the data section of the configuration
+
+    Args:
+        data_config: Dict with 'provider' ('yfinance' or 'files') and, for
+            'files', 'replay_dir'
+    """
+    name = data_config.get('provider') or 'yfinance'
+    if name == 'yfinance':
+        return YFinanceProvider()
+    if name == 'files':
+        replay_dir = data_config.get('replay_dir')
+        if not replay_dir:
+            raise ValueError("data.provider 'files' needs data.replay_dir")
+        return FileProvider(replay_dir)
+    raise ValueError(f"Unknown data provider: {name}")
@@ -0,0 +1,179 @@
+"""
+Data Quality
+Vectorized cleaning of fetched OHLCV bars with a per-ticker quality summary
+"""
+
+import json
+
+import pandas as pd
+import numpy as np
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close')
+FILL_POLICIES = ('ffill', 'drop', 'none')
+
+class DataCleaner:
+    """
+    Cleans one ticker's bars in a fixed sequence of whole-array passes
+
+    1. Sort the index and keep the last bar of each duplicated timestamp
+    2. Blank zero or negative prices and negative volume
+    3. Blank bad ticks: one-bar close spikes that exceed outlier_threshold
+       robust standard deviations (MAD of log returns) and revert on the
+       next bar. Lasting jumps, e.g. after earnings, are kept
+    4. Repair bars whose High/Low do not bound Open/Close (repair_ohlc),
+       or blank them
+    5. Count calendar gaps longer than max_gap typical bar spacings
+    6. Fill blanked prices by the fill policy: 'ffill' carries the last
+       price forward for at most max_fill bars and drops what is left,
+       'drop' drops every incomplete bar, 'none' leaves NaN in place.
+       Missing volume becomes 0
+
+    Args:
+        config: Dict with outlier_threshold, max_fill, fill, repair_ohlc
+            and max_gap (see config.yaml data.cleaning)
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.outlier_threshold = float(config.get('outlier_threshold', 10.0))
+        self.max_fill = int(config.get('max_fill', 5))
+        self.fill = config.get('fill', 'ffill')
+        self.repair_ohlc = bool(config.get('repair_ohlc', True))
+        self.max_gap = float(config.get('max_gap', 5))
+        if self.fill not in FILL_POLICIES:
+            raise ValueError(f"Unknown fill policy: {self.fill}")
+
+    @property
+    def key(self):
+        """Identifies the policy, so cached results are reused only for the same settings"""
+        return json.dumps({'outlier_threshold': self.outlier_threshold, 'max_fill': self.max_fill,
+                           'fill': self.fill, 'repair_ohlc': self.repair_ohlc,
+                           'max_gap': self.max_gap}, sort_keys=True)
+
+    def clean(self, df):
+        """
+        Clean one ticker's bars
+
+        Returns:
+            Tuple of (cleaned DataFrame, summary dict of counts)
+        """
+        summary = {'rows': len(df)}
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.copy()
+            df.columns = df.columns.get_level_values(0)
+
+        # 1. Order and duplicated timestamps
+        if not df.index.is_monotonic_increasing:
+            df = df.iloc[np.argsort(df.index.to_numpy(), kind='stable')]
+        duplicated = df.index.duplicated(keep='last')
+        summary['duplicates'] = int(duplicated.sum())
+        if summary['duplicates']:
+            df = df[~duplicated]
+
+        columns = [column for column in PRICE_COLUMNS if column in df.columns]
+        prices = df[columns].to_numpy(dtype=np.float64, copy=True)
+        position = {column: i for i, column in enumerate(columns)}
+        volume = df['Volume'].to_numpy(dtype=np.float64, copy=True) if 'Volume' in df.columns else None
+
+        # 2. Impossible values
+        non_positive = prices <= 0
+        summary['non_positive'] = int(non_positive.any(axis=1).sum())
+        prices[non_positive] = np.nan
+        if volume is not None:
+            volume[volume < 0] = np.nan
+
+        # 3. Bad ticks on the close
+        spikes = self._spikes(prices[:, position['Close']]) if 'Close' in position else np.zeros(len(df), bool)
+        summary['outliers'] = int(spikes.sum())
+        prices[spikes] = np.nan
+
+        # 4. OHLC consistency
+        inconsistent = np.zeros(len(df), dtype=bool)
+        if all(column in position for column in ('Open', 'High', 'Low', 'Close')):
+            o, h, l, c = (prices[:, position[column]] for column in ('Open', 'High', 'Low', 'Close'))
+            inconsistent = (h < np.fmax(o, c)) | (l > np.fmin(o, c)) | (h < l)
+            if self.repair_ohlc:
+                high = np.fmax(np.fmax(o, h), np.fmax(l, c))
+                low = np.fmin(np.fmin(o, h), np.fmin(l, c))
+                prices[inconsistent, position['High']] = high[inconsistent]
+                prices[inconsistent, position['Low']] = low[inconsistent]
+            else:
+                prices[inconsistent] = np.nan
+        summary['ohlc_inconsistent'] = int(inconsistent.sum())
+
+        # 5. Calendar gaps
+        summary['gaps'], summary['longest_gap'] = self._gaps(df.index)
+
+        # 6. Missing values
+        missing = np.isnan(prices)
+        summary['missing'] = int(missing.any(axis=1).sum())
+        if self.fill == 'ffill':
+            prices = self._forward_fill(prices, self.max_fill)
+        summary['filled'] = int((missing & ~np.isnan(prices)).any(axis=1).sum())
+        if volume is not None:
+            volume[np.isnan(volume)] = 0.0
+
+        keep = np.ones(len(df), dtype=bool) if self.fill == 'none' else ~np.isnan(prices).any(axis=1)
+        summary['dropped'] = int((~keep).sum())
+
+        cleaned = df.assign(**{column: prices[:, i] for i, column in enumerate(columns)})
+        if volume is not None:
+            # Integer volume stays integer; every gap has been zeroed
+            cleaned['Volume'] = volume.astype(df['Volume'].dtype, copy=False)
+        if not keep.all():
+            cleaned = cleaned[keep]
+        summary['rows_clean'] = len(cleaned)
+        return cleaned, summary
+
+    def clean_many(self, data):
+        """
+        Clean every ticker of a {ticker: DataFrame} dict
+
+        Returns:
+            Tuple of (cleaned dict, summary DataFrame indexed by ticker)
+        """
+        cleaned, summaries = {}, {}
+        for ticker, df in data.items():
+            cleaned[ticker], summaries[ticker] = self.clean(df)
+        return cleaned, summary_frame(summaries)
+
+    def _spikes(self, close):
+        """Bars whose close jumps past the threshold and comes straight back"""
+        spikes = np.zeros(len(close), dtype=bool)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.diff(np.log(close))
+        if len(returns) < 2 or np.isnan(returns).all():
+            return spikes
+
+        deviation = np.abs(returns - np.nanmedian(returns))
+        scale = 1.4826 * np.nanmedian(deviation)
+        if not scale > 0:
+            return spikes
+        limit = self.outlier_threshold * scale
+        up, down = returns > limit, returns < -limit
+        spikes[1:-1] = (up[:-1] & down[1:]) | (down[:-1] & up[1:])
+        return spikes
+
+    def _gaps(self, index):
+        """Number of spacings over max_gap typical spacings, and the longest one"""
+        if len(index) < 3 or not isinstance(index, pd.DatetimeIndex):
+            return 0, None
+        steps = np.diff(index.values)
+        typical = np.median(steps.astype(np.int64))
+        gaps = int((steps.astype(np.int64) > self.max_gap * typical).sum())
+        return gaps, str(pd.Timedelta(steps.max()))
+
+    @staticmethod
+    def _forward_fill(values, limit):
+        """Column-wise forward fill of NaN runs, at most `limit` bars from the last value"""
+        rows = np.arange(len(values))[:, None]
+        last = np.where(np.isnan(values), -1, rows)
+        np.maximum.accumulate(last, axis=0, out=last)
+        fill = np.isnan(values) & (last >= 0) & (rows - last <= limit)
+        filled = values.copy()
+        filled[fill] = values[last[fill], np.nonzero(fill)[1]]
+        return filled
+
+def summary_frame(summaries):
+    """Per-ticker quality summaries as one DataFrame"""
+    return pd.DataFrame.from_dict(summaries, orient='index')
@@ -0,0 +1,132 @@
+"""
+Technical Indicators
+Shared indicator functions with a content-addressed memo cache
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+class IndicatorCache:
+    """
+    LRU memo of indicator results with a memory cap
+
+    Entries are keyed by a digest of the input values plus the indicator
+    name and parameters, so the same window over the same prices is
+    computed once no matter which strategy, or which copy of the frame,
+    asks for it. The index is not part of the key: results are stored as
+    plain arrays and re-wrapped with the caller's index.
+
+    Least recently used entries are evicted once the cached arrays exceed
+    max_bytes. Cached arrays are read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, values, name, params, compute):
+        """
+        Return the cached result for (values, name, params), computing it on a miss
+
+        Args:
+            values: Input array the indicator is computed from
+            name: Indicator name
+            params: Tuple of hashable indicator parameters
+            compute: Zero-argument callable producing the result array
+        """
+        return self.lookup((self.fingerprint(values), name, params), compute)
+
+    def lookup(self, key, compute):
+        """
+        Return the cached array for a hashable key, computing it on a miss
+
+        For callers that key results by something other than the input
+        values (e.g. covariance matrices by universe and window).
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = np.asarray(compute())
+        result.flags.writeable = False
+        with self._lock:
+            if key not in self._entries and result.nbytes <= self.max_bytes:
+                self._entries[key] = result
+                self.nbytes += result.nbytes
+                self._evict()
+        return result
+
+    def set_max_bytes(self, max_bytes):
+        """Change the memory cap, evicting entries as needed"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def fingerprint(values):
+        """Content digest of an array (dtype, shape and bytes)"""
+        values = np.ascontiguousarray(values)
+        digest = hashlib.sha1(values.view(np.uint8), usedforsecurity=False)
+        digest.update(f"{values.dtype.str}{values.shape}".encode())
+        return digest.digest()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+# Shared by every strategy unless one is given its own cache
+DEFAULT_CACHE = IndicatorCache()
+
+def _cached(series, name, params, compute, cache):
+    """Run compute through the cache and wrap the result in series' index"""
+    if cache is None:
+        return compute()
+    values = cache.get(series.to_numpy(), name, params, lambda: compute().to_numpy())
+    return pd.Series(values, index=series.index, name=series.name, copy=False)
+
+def sma(series, window, cache=DEFAULT_CACHE):
+    """Simple moving average"""
+    return _cached(series, 'sma', (window,), lambda: series.rolling(window=window).mean(), cache)
+
+def rolling_std(series, window, cache=DEFAULT_CACHE):
+    """Rolling sample standard deviation"""
+    return _cached(series, 'std', (window,), lambda: series.rolling(window=window).std(), cache)
+
+def ema(series, span, cache=DEFAULT_CACHE):
+    """Recursive exponential moving average (adjust=False)"""
+    return _cached(series, 'ema', (span,), lambda: series.ewm(span=span, adjust=False).mean(), cache)
+
+def rsi(series, period, cache=DEFAULT_CACHE):
+    """Relative Strength Index from rolling mean gains and losses"""
+    def compute():
+        delta = series.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+    return _cached(series, 'rsi', (period,), compute, cache)
+
+def momentum(series, lookback, cache=DEFAULT_CACHE):
+    """Rate of change over lookback bars"""
+    return _cached(series, 'momentum', (lookback,), lambda: series.pct_change(periods=lookback), cache)
@@ -5,7 +5,6 @@ Date: January 2026
 Description: Comprehensive algorithmic trading system with multiple strategies
 """
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -16,81 +15,219 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # Import custom modules
-from strategies import MovingAverageCrossover, RSIStrategy, MACDStrategy
+from strategies import MovingAverageCrossover, RSIStrategy, MACDStrategy, create_strategy
 from backtester import Backtester
+from portfolio_backtester import PortfolioBacktester
 from risk_manager import RiskManager
 from portfolio_optimizer import PortfolioOptimizer
 from performance_metrics import PerformanceAnalyzer
 from data_fetcher import DataFetcher
+from data_providers import create_provider
+from async_fetcher import RequestLimiter
+from data_quality import DataCleaner
+from price_store import PriceStore
+from panel import PricePanel
+from compact import compact_prices
 from visualization import Visualizer
+from parallel_runner import run_pipeline, run_grid_parallel
+import indicators
 
 class TradingSystem:
     """Main trading system orchestrator"""
     
     def __init__(self, config):
         self.config = config
-        self.data_fetcher = DataFetcher()
+        
+        # Downloads are cached on disk under data/ unless cache_dir is null;
+        # replayed files are already local, so they skip the cache
+        data_config = config.get('data', {})
+        provider = create_provider(data_config)
+        # Batches are requested concurrently, rate limited and retried
+        limiter = RequestLimiter(
+            max_concurrency=data_config.get('max_concurrency', 8),
+            rate_limit=data_config.get('rate_limit'),
+            timeout=data_config.get('timeout', 30),
+            retries=data_config.get('retries', 3)
+        )
+        self.data_fetcher = DataFetcher(
+            cache_dir=data_config.get('cache_dir', 'data') if provider.name != 'files' else None,
+            batch_size=data_config.get('batch_size', 50),
+            provider=provider,
+            limiter=limiter
+        )
+        # Fetched bars are cleaned once per dataset before any strategy runs
+        cleaning = data_config.get('cleaning', {})
+        self.cleaner = DataCleaner(cleaning) if cleaning.get('enabled', True) else None
+        self.quality = None
+        # Optional memory-mapped store: prices are read from disk on demand
+        self.store_dir = data_config.get('store_dir')
+        self.store = None
+        # All loaded tickers aligned on one calendar for cross-asset work
+        self.panel = None
         
         # Initialize Backtester with "Paper Money" settings from config
         self.initial_capital = config.get('portfolio', {}).get('initial_capital', 10000)
         self.commission = config.get('capital', {}).get('commission', 1.0)
-        self.backtester = Backtester(initial_capital=self.initial_capital, commission_fee=self.commission)
+        risk_config = config.get('risk_management', config.get('risk_params', {}))
+        self.risk_manager = RiskManager(risk_config)
+        
+        # Optional stop-loss / take-profit / trailing-stop exits inside the backtest
+        stops = {}
+        if risk_config.get('use_stops', False):
+            stops = {'stop_loss': self.risk_manager.stop_loss,
+                     'take_profit': self.risk_manager.take_profit,
+                     'trailing_stop': self.risk_manager.trail_pct}
+        self.backtester = Backtester(initial_capital=self.initial_capital, commission_fee=self.commission, **stops)
+        self.portfolio_backtester = PortfolioBacktester(initial_capital=self.initial_capital,
+                                                        commission_fee=self.commission, **stops)
+        
+        # Copy-free mode: stages share narrow frames instead of full copies
+        self.copy_free = config.get('execution', {}).get('copy_free', False)
+        # Compact mode: float32 prices, int8 signals and positions end to end
+        self.compact = config.get('execution', {}).get('compact', False)
         
-        self.risk_manager = RiskManager(config.get('risk_management', config.get('risk_params', {})))
+        # Memory cap of the indicator memo shared by all strategies
+        cache_mb = config.get('execution', {}).get('indicator_cache_mb', 256)
+        indicators.DEFAULT_CACHE.set_max_bytes(cache_mb * 2**20)
         self.visualizer = Visualizer()
         self.results = {}
         
     def load_data(self, tickers, start_date, end_date):
         """Load historical data for multiple tickers"""
         print(f"Loading data for {len(tickers)} tickers...")
-        self.data = {}
+        if self.store_dir and PriceStore.exists(self.store_dir):
+            store = PriceStore(self.store_dir)
+            if store.covers(tickers, start_date, end_date):
+                self.store = store
+                self.data = store.select(tickers, start_date, end_date)
+                self.panel = self._build_panel()
+                print(f"[OK] {len(self.data)} tickers mapped from {self.store_dir}")
+                return self.data
+        
+        self.data, failures = self.data_fetcher.fetch_many_concurrent(tickers, start_date, end_date)
+        if self.cleaner is not None and self.data:
+            self.data, self.quality = self.data_fetcher.clean(self.data, start_date, end_date, self.cleaner)
+            self._print_quality(self.quality)
+        if self.store_dir and self.data:
+            # Persist the columns once, then work off the memory-mapped copy
+            self.store = PriceStore.write(self.store_dir, self.data, coverage=(start_date, end_date))
+            self.data = self.store.select(list(self.data), start_date, end_date)
+        elif self.compact:
+            self.data = {ticker: compact_prices(df) for ticker, df in self.data.items()}
         for ticker in tickers:
-            try:
-                df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-                self.data[ticker] = df
-                print(f"[OK] {ticker}: {len(df)} days loaded")
-            except Exception as e:
-                print(f"[FAIL] {ticker}: Failed - {str(e)}")
+            if ticker in self.data:
+                print(f"[OK] {ticker}: {len(self.data[ticker])} days loaded")
+            if ticker in failures:
+                print(f"[FAIL] {ticker}: Failed - {failures[ticker]}")
+        self.panel = self._build_panel()
         return self.data
     
+    def _build_panel(self):
+        """Align the loaded tickers once (float32 arrays in compact mode)"""
+        return PricePanel.from_frames(self.data, dtype=np.float32 if self.compact else np.float64)
+    
+    def _print_quality(self, quality):
+        """One line per ticker whose bars needed cleaning"""
+        counts = ['duplicates', 'non_positive', 'outliers', 'ohlc_inconsistent', 'filled', 'dropped']
+        for ticker, row in quality.iterrows():
+            issues = ', '.join(f"{row[name]} {name}" for name in counts if row[name])
+            if issues:
+                print(f"[OK] {ticker}: cleaned ({issues})")
+    
     def run_strategy(self, strategy_name, ticker, params):
         """Execute a specific trading strategy"""
-        print(f"\n{'='*60}")
-        print(f"Running {strategy_name} on {ticker}")
-        print(f"{'='*60}")
+        self._print_header(strategy_name, ticker)
         
         if ticker not in self.data:
             print(f"Error: No data for {ticker}")
             return None
         
-        data = self.data[ticker].copy()
+        # Store-backed frames are read-only maps of the files, so they never
+        # need a defensive copy
+        if self.copy_free or self.store is not None:
+            data = self.data[ticker]
+        else:
+            data = self.data[ticker].copy()
         
         # Apply strategy (case-insensitive)
-        strat_name_upper = strategy_name.upper()
-        if strat_name_upper in ["SMA_CROSSOVER", "SMA"]:
-            strategy = MovingAverageCrossover(params)
-        elif strat_name_upper == "RSI":
-            strategy = RSIStrategy(params)
-        elif strat_name_upper == "MACD":
-            strategy = MACDStrategy(params)
-        else:
+        strategy = create_strategy(strategy_name, params)
+        if strategy is None:
             print(f"Unknown strategy: {strategy_name}")
             return None
         
-        # Generate signals
-        signals = strategy.generate_signals(data)
+        signals, results, metrics = run_pipeline(strategy, data, self.risk_manager, self.backtester,
+                                                 copy_free=self.copy_free)
+        self._store_result(ticker, strategy_name, data, signals, results, metrics)
+        
+        return results
+    
+    def run_grid(self, grid, workers=1):
+        """
+        Execute every (ticker, strategy_name, params) entry of a grid
+        
+        With more than one worker the runs are spread over a process pool;
+        results are merged in grid order and match the serial run exactly.
+        """
+        if workers <= 1:
+            for ticker, strategy_name, params in grid:
+                self.run_strategy(strategy_name, ticker, params)
+            return self.results
+        
+        runnable = []
+        for ticker, strategy_name, params in grid:
+            if ticker not in self.data:
+                print(f"Error: No data for {ticker}")
+            elif create_strategy(strategy_name, params) is None:
+                print(f"Unknown strategy: {strategy_name}")
+            else:
+                runnable.append((ticker, strategy_name, params))
+        
+        print(f"\nRunning {len(runnable)} strategy runs on {workers} workers...")
+        outputs = run_grid_parallel(self.data, runnable, self.risk_manager, self.backtester, workers,
+                                    copy_free=self.copy_free)
+        for ticker, strategy_name, signals, results, metrics in outputs:
+            self._print_header(strategy_name, ticker)
+            self._store_result(ticker, strategy_name, self.data[ticker], signals, results, metrics)
+        return self.results
+    
+    def run_portfolio(self, strategy_name, params, tickers=None):
+        """
+        Execute one strategy on several tickers as a single account
+        
+        All tickers trade from the same cash balance, and each entry is
+        sized by the Position_Size the risk manager assigns it.
+        """
+        tickers = [ticker for ticker in (tickers or self.data) if ticker in self.data]
+        self._print_header(strategy_name, f"portfolio of {len(tickers)} tickers")
         
-        # Apply risk management
-        signals = self.risk_manager.apply_position_sizing(signals)
+        strategy = create_strategy(strategy_name, params)
+        if strategy is None:
+            print(f"Unknown strategy: {strategy_name}")
+            return None
         
-        # Backtest
-        results = self.backtester.run(data, signals)
+        data, signals = {}, {}
+        for ticker in tickers:
+            data[ticker] = self.data[ticker]
+            signals[ticker] = self.risk_manager.apply_position_sizing(
+                strategy.generate_signals(data[ticker], narrow=True), prices=data[ticker], inplace=True)
         
-        # Analyze performance
-        analyzer = PerformanceAnalyzer()
-        metrics = analyzer.calculate_metrics(results)
+        # The panel was aligned at load time; only the signals are placed on it
+        results, holdings = self.portfolio_backtester.run(self.panel, signals)
+        metrics = PerformanceAnalyzer().calculate_metrics(results)
         
-        # Store results
+        key = f"PORTFOLIO_{strategy_name}"
+        self.results[key] = {
+            'data': data,
+            'signals': signals,
+            'results': results,
+            'holdings': holdings,
+            'metrics': metrics
+        }
+        self.print_summary(metrics, 'PORTFOLIO', strategy_name)
+        return results
+    
+    def _store_result(self, ticker, strategy_name, data, signals, results, metrics):
+        """Record one run in self.results and print its summary"""
         key = f"{ticker}_{strategy_name}"
         self.results[key] = {
             'data': data,
@@ -101,8 +238,11 @@ class TradingSystem:
         
         # Print summary
         self.print_summary(metrics, ticker, strategy_name)
-        
-        return results
+    
+    def _print_header(self, strategy_name, ticker):
+        print(f"\n{'='*60}")
+        print(f"Running {strategy_name} on {ticker}")
+        print(f"{'='*60}")
     
     def print_summary(self, metrics, ticker, strategy):
         """Print performance summary with Paper Money metrics"""
@@ -169,6 +309,7 @@ def main():
             'date_range': {'start': '2015-01-01', 'end': '2024-12-01'},
             'portfolio': {'initial_capital': 10000, 'currency': 'USD'},
             'capital': {'commission': 1.0},
+            'data': {'cache_dir': 'data', 'batch_size': 50},
             'risk_management': {
                 'max_position_size': 0.2,
                 'stop_loss': 0.02,
@@ -195,19 +336,26 @@ def main():
     # Mapping strategy names from config to the names used in run_strategy
     # config.yaml has 'sma_crossover', 'rsi', 'macd'
     # main.py expects 'SMA_Crossover', 'RSI', 'MACD'
+    grid = []
     for ticker in tickers_to_test:
         if 'strategies' in config and isinstance(config['strategies'], dict):
             # If strategies are a dict in config.yaml
             for strat_name, strat_params in config['strategies'].items():
-                system.run_strategy(strat_name.upper(), ticker, strat_params)
+                grid.append((ticker, strat_name.upper(), strat_params))
         elif 'strategies' in config and isinstance(config['strategies'], list):
             # If strategies are a list (from our fallback)
             for strategy_config in config['strategies']:
-                system.run_strategy(
-                    strategy_config['name'],
-                    ticker,
-                    strategy_config['params']
-                )
+                grid.append((ticker, strategy_config['name'], strategy_config['params']))
+    
+    # Independent runs are spread over a process pool when workers > 1
+    workers = config.get('execution', {}).get('workers', 1)
+    system.run_grid(grid, workers=workers)
+    
+    # Optionally run each strategy once more as one shared-cash account
+    if config.get('portfolio', {}).get('shared_cash', False):
+        strategies = {strategy_name: params for _, strategy_name, params in grid}
+        for strategy_name, params in strategies.items():
+            system.run_portfolio(strategy_name, params, config['tickers'])
     
     # Compare results
     comparison = system.compare_strategies()
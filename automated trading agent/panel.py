@@ -0,0 +1,170 @@
+"""
+Aligned Price Panel
+All tickers on one master calendar as (dates x tickers) arrays per field
+"""
+
+import pandas as pd
+import numpy as np
+
+class PricePanel:
+    """
+    Multi-ticker price history aligned once, at load time
+
+    Every field (Open, High, Low, Close, Volume, ...) is one float array
+    of shape (dates x tickers) on the sorted union of the tickers' dates;
+    bars a ticker does not have are NaN. `valid` marks the bars each
+    ticker actually has (with a close, when there is a Close field).
+    Tickers map to columns through a dict and dates to rows through the
+    calendar's hash index, so lookups are O(1) and cross-asset code can
+    slice arrays instead of joining frames.
+    """
+
+    def __init__(self, index, tickers, fields, valid):
+        self.index = index
+        self.tickers = list(tickers)
+        self.columns = {ticker: j for j, ticker in enumerate(self.tickers)}
+        self.fields = fields
+        self.valid = valid
+        self._returns = {}
+
+    @classmethod
+    def from_frames(cls, data, fields=None, dtype=np.float64):
+        """
+        Align a dict of ticker -> DataFrame
+
+        Args:
+            data: Dict of ticker -> DataFrame with a sorted DatetimeIndex
+            fields: Columns to keep (default: the first ticker's columns)
+            dtype: Float dtype of the field arrays (float32 in compact mode)
+        """
+        data = {ticker: cls._flatten_columns(df) for ticker, df in data.items() if not df.empty}
+        if fields is None:
+            fields = list(next(iter(data.values())).columns) if data else []
+
+        index = cls._calendar(data.values())
+        shape = (len(index), len(data))
+        arrays = {field: np.full(shape, np.nan, dtype=dtype) for field in fields}
+        valid = np.zeros(shape, dtype=bool)
+        for j, df in enumerate(data.values()):
+            rows = slice(None) if df.index.equals(index) else index.get_indexer(df.index)
+            valid[rows, j] = True
+            for field in fields:
+                if field in df.columns:
+                    arrays[field][rows, j] = df[field].to_numpy(dtype=dtype)
+        if 'Close' in arrays:
+            valid &= ~np.isnan(arrays['Close'])
+        return cls(index, data.keys(), arrays, valid)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, ticker):
+        return ticker in self.columns
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    @property
+    def shape(self):
+        return self.valid.shape
+
+    def column(self, ticker):
+        """Column of a ticker"""
+        return self.columns[ticker]
+
+    def row(self, date):
+        """Row of a calendar date (KeyError if no ticker has a bar then)"""
+        return self.index.get_loc(self._localize(date))
+
+    def rows(self, start_date=None, end_date=None):
+        """Slice of the rows in [start_date, end_date)"""
+        lo = 0 if start_date is None else self.index.searchsorted(self._localize(start_date))
+        hi = len(self.index) if end_date is None else self.index.searchsorted(self._localize(end_date))
+        return slice(lo, hi)
+
+    def value(self, field, ticker, date):
+        """One field of one ticker at one date"""
+        return self.fields[field][self.row(date), self.columns[ticker]]
+
+    def values(self, field='Close', tickers=None):
+        """(dates x tickers) array of a field; a view when tickers is None"""
+        if tickers is None:
+            return self.fields[field]
+        return self.fields[field][:, self._indexer(tickers)]
+
+    def returns(self, field='Close'):
+        """
+        Simple returns of every ticker between its consecutive valid bars
+
+        The same values as each ticker's own pct_change(), placed on the
+        calendar (NaN where a ticker has no bar). Computed once per field.
+        """
+        if field not in self._returns:
+            values = self.fields[field]
+            rows = np.arange(len(values))[:, None]
+            last = np.where(self.valid, rows, -1)
+            np.maximum.accumulate(last, axis=0, out=last)
+            # Row of each ticker's previous valid bar
+            previous = np.full_like(last, -1)
+            previous[1:] = last[:-1]
+            has_previous = self.valid & (previous >= 0)
+            returns = np.full(values.shape, np.nan)
+            columns = np.nonzero(has_previous)[1]
+            # Divided in float64 when the panel is compact
+            returns[has_previous] = values[has_previous].astype(np.float64) / values[previous[has_previous], columns] - 1
+            self._returns[field] = returns
+        return self._returns[field]
+
+    def returns_frame(self, tickers=None, field='Close'):
+        """Returns as a (dates x tickers) DataFrame wrapping the cached array"""
+        returns = self.returns(field)
+        if tickers is not None:
+            returns = returns[:, self._indexer(tickers)]
+        return pd.DataFrame(returns, index=self.index, columns=list(tickers or self.tickers), copy=False)
+
+    def frame(self, ticker, fields=None):
+        """A ticker's own bars as a DataFrame, as it was loaded"""
+        j = self.columns[ticker]
+        rows = self.valid[:, j]
+        return pd.DataFrame({field: self.fields[field][rows, j] for field in (fields or self.fields)},
+                            index=self.index[rows])
+
+    def select(self, tickers):
+        """Panel of a subset of tickers on the calendar dates they cover"""
+        columns = self._indexer(tickers)
+        rows = self.valid[:, columns].any(axis=1)
+        if rows.all():
+            rows = slice(None)
+        fields = {field: values[rows][:, columns] for field, values in self.fields.items()}
+        return PricePanel(self.index[rows], tickers, fields, self.valid[rows][:, columns])
+
+    def _indexer(self, tickers):
+        return np.array([self.columns[ticker] for ticker in tickers], dtype=np.intp)
+
+    def _localize(self, date):
+        timestamp = pd.Timestamp(date)
+        tz = getattr(self.index, 'tz', None)
+        if tz is not None and timestamp.tzinfo is None:
+            return timestamp.tz_localize(tz)
+        return timestamp
+
+    @staticmethod
+    def _calendar(frames):
+        """Sorted union of the frames' dates"""
+        index = None
+        for df in frames:
+            if index is None:
+                index = df.index
+            elif not df.index.equals(index):
+                index = index.union(df.index)
+        if index is None:
+            return pd.DatetimeIndex([])
+        return index if index.is_monotonic_increasing else index.sort_values()
+
+    @staticmethod
+    def _flatten_columns(data):
+        """Drop the ticker level yfinance adds to single-ticker columns"""
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.copy()
+            data.columns = data.columns.get_level_values(0)
+        return data
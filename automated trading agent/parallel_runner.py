@@ -0,0 +1,96 @@
+"""
+Parallel Strategy Runner
+Fans a (ticker, strategy, params) grid out to a process pool
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from strategies import create_strategy
+from performance_metrics import PerformanceAnalyzer
+
+# Price columns the strategy -> risk -> backtest pipeline reads
+PIPELINE_COLUMNS = ['Close']
+
+def run_pipeline(strategy, data, risk_manager, backtester, copy_free=False):
+    """
+    Run one strategy through signals, position sizing, backtest and metrics
+
+    In copy-free mode no stage copies the price frame: the strategy returns
+    only its own columns, position sizing appends to that same frame, and
+    the backtest returns only its result columns.
+
+    Returns:
+        Tuple of (signals, results, metrics)
+    """
+    if copy_free:
+        signals = strategy.generate_signals(data, narrow=True)
+        risk_manager.apply_position_sizing(signals, prices=data, inplace=True)
+        results = backtester.run(data, signals, narrow=True)
+    else:
+        # Generate signals
+        signals = strategy.generate_signals(data)
+
+        # Apply risk management
+        signals = risk_manager.apply_position_sizing(signals)
+
+        # Backtest
+        results = backtester.run(data, signals)
+
+    # Analyze performance
+    analyzer = PerformanceAnalyzer()
+    metrics = analyzer.calculate_metrics(results)
+
+    return signals, results, metrics
+
+def _run_task(task):
+    """
+    Worker entry point: rebuild a narrow price frame and run the pipeline
+
+    Only the columns the pipeline reads are shipped to the worker, and only
+    the columns it adds are sent back.
+    """
+    strategy_name, params, index, columns, risk_manager, backtester = task
+    data = pd.DataFrame(columns, index=index)
+
+    strategy = create_strategy(strategy_name, params)
+    signals, results, metrics = run_pipeline(strategy, data, risk_manager, backtester, copy_free=True)
+    return signals, results, metrics
+
+def run_grid_parallel(data, grid, risk_manager, backtester, workers, copy_free=False):
+    """
+    Run every (ticker, strategy_name, params) entry of the grid in a process pool
+
+    Args:
+        data: Dict of ticker -> price DataFrame
+        grid: List of (ticker, strategy_name, params) tuples
+        risk_manager: RiskManager applied in every run
+        backtester: Backtester used for every run
+        workers: Number of worker processes
+        copy_free: Keep the narrow frames the workers return instead of
+            joining them back onto the price frame
+
+    Returns:
+        List of (ticker, strategy_name, signals, results, metrics) in grid order.
+        The signals and results frames are identical to a serial run in the
+        same mode.
+    """
+    tasks = []
+    for ticker, strategy_name, params in grid:
+        df = data[ticker]
+        columns = {col: df[col].to_numpy() for col in PIPELINE_COLUMNS}
+        tasks.append((strategy_name, params, df.index, columns, risk_manager, backtester))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order, keeping the merge deterministic
+        outputs = list(executor.map(_run_task, tasks))
+
+    merged = []
+    for (ticker, strategy_name, _), (signals, results, metrics) in zip(grid, outputs):
+        if not copy_free:
+            df = data[ticker]
+            signals = pd.concat([df, signals], axis=1)
+            results = pd.concat([df, results], axis=1)
+        merged.append((ticker, strategy_name, signals, results, metrics))
+    return merged
@@ -0,0 +1,118 @@
+"""
+Strategy Parameter Sweep
+Grid and random search over strategy parameters with shared indicators
+"""
+
+import itertools
+
+import pandas as pd
+import numpy as np
+
+import indicators
+from backtester import Backtester
+from performance_metrics import PerformanceAnalyzer
+from strategies import create_strategy
+
+# Combinations that make no sense for a strategy are skipped
+CONSTRAINTS = {
+    'SMA': lambda p: p.get('short', 50) < p.get('long', 200),
+    'SMA_CROSSOVER': lambda p: p.get('short', 50) < p.get('long', 200),
+    'RSI': lambda p: p.get('oversold', 30) < p.get('overbought', 70),
+    'MACD': lambda p: p.get('fast', 12) < p.get('slow', 26),
+}
+
+class ParameterSweep:
+    """Evaluate a strategy over a parameter space and rank the results"""
+
+    def __init__(self, strategy_name, data, backtester=None, analyzer=None, cache=None):
+        self.strategy_name = strategy_name
+        self.backtester = backtester or Backtester()
+        self.analyzer = analyzer or PerformanceAnalyzer()
+
+        # Only Close is read by the signal -> backtest -> metrics chain
+        close = data['Close']
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+        self.prices = close.to_frame('Close')
+        # Windows shared between combinations are computed once. By default
+        # the sweep keeps a private cache (capped like the shared one, least
+        # recently used windows evicted) instead of competing for the shared one
+        self.cache = cache if cache is not None else indicators.IndicatorCache()
+
+    def grid_search(self, param_grid, sort_by='sharpe_ratio'):
+        """
+        Evaluate every combination of a parameter grid
+
+        Args:
+            param_grid: Dict of parameter name -> list of values
+            sort_by: Metric used to rank the combinations (descending)
+
+        Returns:
+            DataFrame with one row per combination: parameters then metrics
+        """
+        names = list(param_grid)
+        combos = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        return self._evaluate(combos, sort_by)
+
+    def random_search(self, param_space, n_iter=100, seed=None, sort_by='sharpe_ratio'):
+        """
+        Evaluate n_iter random combinations of a parameter space
+
+        Args:
+            param_space: Dict of parameter name -> list of values to choose
+                from, or a (low, high) tuple sampled uniformly (integers if
+                both bounds are integers, high inclusive)
+            n_iter: Number of combinations to draw
+            seed: Seed for reproducible draws
+            sort_by: Metric used to rank the combinations (descending)
+        """
+        rng = np.random.default_rng(seed)
+        combos = []
+        for _ in range(n_iter):
+            params = {}
+            for name, space in param_space.items():
+                if isinstance(space, tuple):
+                    low, high = space
+                    if isinstance(low, (int, np.integer)) and isinstance(high, (int, np.integer)):
+                        params[name] = int(rng.integers(low, high + 1))
+                    else:
+                        params[name] = float(rng.uniform(low, high))
+                else:
+                    params[name] = space[rng.integers(len(space))]
+            combos.append(params)
+
+        # Drop repeated draws so each combination is evaluated once
+        unique = {tuple(sorted(p.items())): p for p in combos}
+        return self._evaluate(list(unique.values()), sort_by)
+
+    def evaluate(self, params):
+        """Backtest one parameter combination and return its metrics"""
+        strategy = create_strategy(self.strategy_name, params)
+        if strategy is None:
+            raise ValueError(f"Unknown strategy: {self.strategy_name}")
+        # The strategy (and a composite's children) read indicators through the sweep's cache
+        for member in [strategy, *getattr(strategy, 'strategies', [])]:
+            member.indicator_cache = self.cache
+
+        # Position sizing does not change the all-in/all-out backtest, so the
+        # signals go straight to the backtester
+        signals = strategy.generate_signals(self.prices, narrow=True)[['Signal']]
+        results = self.backtester.run(self.prices, signals, narrow=True)
+        return self.analyzer.calculate_metrics(results)
+
+    def _evaluate(self, combos, sort_by):
+        """Run the valid combinations and build the ranked table"""
+        constraint = CONSTRAINTS.get(self.strategy_name.upper())
+        if constraint is not None:
+            combos = [p for p in combos if constraint(p)]
+
+        print(f"Sweeping {len(combos)} {self.strategy_name} parameter combinations...")
+        rows = []
+        for params in combos:
+            metrics = self.evaluate(params)
+            rows.append({**params, **metrics})
+
+        table = pd.DataFrame(rows)
+        if table.empty:
+            return table
+        return table.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
@@ -1,4 +1,3 @@
-
 """
 Performance Metrics Calculator
 Comprehensive performance analysis for trading strategies
@@ -8,6 +7,14 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 
+TRADING_DAYS = 252
+
+# Metrics derived from the return arrays, in calculate_metrics order
+RETURN_METRICS = ['total_return', 'annualized_return', 'volatility',
+                  'sharpe_ratio', 'sortino_ratio', 'calmar_ratio',
+                  'max_drawdown', 'avg_drawdown']
+MARKET_METRICS = ['information_ratio', 'beta', 'alpha', 'var_95', 'cvar_95']
+
 class PerformanceAnalyzer:
     """Calculate various performance metrics"""
     
@@ -24,139 +31,238 @@ class PerformanceAnalyzer:
         Returns:
             Dictionary of performance metrics
         """
-        metrics = {}
+        n = len(results)
+        if 'Drawdown' in results.columns:
+            drawdown = results['Drawdown'].to_numpy(dtype=np.float64)
+        else:
+            drawdown = np.zeros(n)
         
-        # Basic returns
-        metrics['total_return'] = self._total_return(results)
-        metrics['annualized_return'] = self._annualized_return(results)
-        metrics['volatility'] = self._volatility(results)
+        kernel = self._metrics_kernel(
+            results['Cumulative_Strategy_Return'].to_numpy(dtype=np.float64)[None, :],
+            results['Strategy_Return'].to_numpy(dtype=np.float64)[None, :],
+            results['Daily_Return'].to_numpy(dtype=np.float64)[None, :],
+            results['Cumulative_Market_Return'].to_numpy(dtype=np.float64)[None, :],
+            drawdown[None, :]
+        )
         
-        # Risk-adjusted returns
-        metrics['sharpe_ratio'] = self._sharpe_ratio(results)
-        metrics['sortino_ratio'] = self._sortino_ratio(results)
-        metrics['calmar_ratio'] = self._calmar_ratio(results)
+        metrics = {name: float(kernel[name][0]) for name in RETURN_METRICS}
+        metrics.update(self._drawdown_periods(results))
+        metrics.update(self._trade_statistics(results))
+        metrics.update({name: float(kernel[name][0]) for name in MARKET_METRICS})
+        return metrics
+    
+    def calculate_metrics_batch(self, equity, market_returns, positions=None,
+                                initial_capital=1.0, index=None):
+        """
+        Score many equity curves at once
         
-        # Drawdown metrics
-        metrics['max_drawdown'] = self._max_drawdown(results)
-        metrics['avg_drawdown'] = self._avg_drawdown(results)
-        metrics['drawdown_duration'] = self._drawdown_duration(results)
+        Args:
+            equity: 2-D array (curves x bars) of portfolio values
+            market_returns: Benchmark per-bar returns, 1-D (shared by all
+                curves) or 2-D like equity
+            positions: Optional 2-D array of positions for trade statistics
+            initial_capital: Starting value the equity curves are scaled by
+            index: Optional dates for the bars, used for drawdown dates
+            
+        Returns:
+            DataFrame with one row of metrics per curve
+        """
+        equity = np.atleast_2d(np.asarray(equity, dtype=np.float64))
+        n_curves, n = equity.shape
+        market_returns = np.broadcast_to(np.asarray(market_returns, dtype=np.float64), (n_curves, n))
         
-        # Trade statistics
-        metrics.update(self._trade_statistics(results))
+        # Same derivations as Backtester: returns, benchmark and drawdown
+        cumulative = equity / initial_capital
+        strategy_returns = np.zeros_like(equity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            strategy_returns[:, 1:] = equity[:, 1:] / equity[:, :-1] - 1
+        strategy_returns[np.isnan(strategy_returns)] = 0
+        market_cumulative = np.cumprod(1 + market_returns, axis=1)
+        peak = np.fmax.accumulate(cumulative, axis=1)
+        drawdown = (cumulative - peak) / peak
         
-        # Additional metrics
-        metrics['information_ratio'] = self._information_ratio(results)
-        metrics['beta'] = self._beta(results)
-        metrics['alpha'] = self._alpha(results)
-        metrics['var_95'] = self._value_at_risk(results, 0.95)
-        metrics['cvar_95'] = self._conditional_var(results, 0.95)
+        kernel = self._metrics_kernel(cumulative, strategy_returns, market_returns,
+                                      market_cumulative, drawdown)
+        table = pd.DataFrame({name: kernel[name] for name in RETURN_METRICS})
         
-        return metrics
-    
-    def _total_return(self, df):
-        """Calculate total return"""
-        return df['Cumulative_Strategy_Return'].iloc[-1] - 1
-    
-    def _annualized_return(self, df):
-        """Calculate annualized return"""
-        total_return = self._total_return(df)
-        years = len(df) / 252
-        return (1 + total_return) ** (1 / years) - 1
-    
-    def _volatility(self, df):
-        """Calculate annualized volatility"""
-        return df['Strategy_Return'].std() * np.sqrt(252)
+        periods = [self._longest_drawdown(row < 0) for row in drawdown]
+        table['drawdown_duration'] = [duration for duration, _, _ in periods]
+        if index is not None:
+            table['drawdown_start'] = [index[start] if duration else None for duration, start, _ in periods]
+            table['drawdown_end'] = [index[end] if duration else None for duration, _, end in periods]
+        
+        if positions is not None:
+            positions = np.atleast_2d(np.asarray(positions, dtype=np.float64))
+            trades = pd.DataFrame([
+                self._trade_statistics_arrays(positions[i], cumulative[i], n)
+                for i in range(n_curves)
+            ])
+            table = pd.concat([table, trades], axis=1)
+        
+        for name in MARKET_METRICS:
+            table[name] = kernel[name]
+        return table
     
-    def _sharpe_ratio(self, df):
-        """Calculate Sharpe ratio"""
-        excess_returns = df['Strategy_Return'] - self.risk_free_rate / 252
-        if excess_returns.std() == 0:
-            return 0
-        return (excess_returns.mean() / excess_returns.std()) * np.sqrt(252)
+    def _metrics_kernel(self, cumulative, strategy_returns, market_returns,
+                        market_cumulative, drawdown, confidence=0.95):
+        """
+        Return-based metrics for a batch of curves (rows) in one pass
+        
+        Shared quantities (annualized returns, moments of the strategy,
+        excess and active returns, the VaR quantile) are computed once and
+        every metric is derived from them.
+        
+        Returns:
+            Dict of metric name -> 1-D array with one value per curve
+        """
+        n = cumulative.shape[1]
+        years = n / TRADING_DAYS
+        sqrt_year = np.sqrt(TRADING_DAYS)
+        rf_daily = self.risk_free_rate / TRADING_DAYS
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Basic returns
+            total_return = cumulative[:, -1] - 1
+            annualized_return = (1 + total_return) ** (1 / years) - 1
+            market_annualized = market_cumulative[:, -1] ** (1 / years) - 1
+            
+            # Moments of the strategy returns; excess returns only shift the mean
+            mean = strategy_returns.mean(axis=1)
+            demeaned = strategy_returns - mean[:, None]
+            std = np.sqrt((demeaned ** 2).sum(axis=1) / (n - 1))
+            excess_mean = mean - rf_daily
+            
+            # Downside deviation of the negative excess returns
+            excess = strategy_returns - rf_daily
+            downside = excess < 0
+            downside_count = downside.sum(axis=1)
+            downside_mean = np.where(downside, excess, 0).sum(axis=1) / downside_count
+            downside_std = np.sqrt((np.where(downside, excess - downside_mean[:, None], 0) ** 2).sum(axis=1)
+                                   / (downside_count - 1))
+            
+            # Market moments for beta and the information ratio
+            market_demeaned = market_returns - market_returns.mean(axis=1)[:, None]
+            market_var = (market_demeaned ** 2).sum(axis=1) / (n - 1)
+            covariance = (demeaned * market_demeaned).sum(axis=1) / (n - 1)
+            active = strategy_returns - market_returns
+            active_mean = active.mean(axis=1)
+            active_std = np.sqrt(((active - active_mean[:, None]) ** 2).sum(axis=1) / (n - 1))
+            
+            # Drawdowns
+            max_drawdown = np.fmin.reduce(drawdown, axis=1)
+            underwater = drawdown < 0
+            underwater_count = underwater.sum(axis=1)
+            avg_drawdown = np.where(underwater, drawdown, 0).sum(axis=1) / underwater_count
+            
+            # Tail risk
+            var = np.percentile(strategy_returns, (1 - confidence) * 100, axis=1)
+            tail = strategy_returns <= var[:, None]
+            cvar = np.where(tail, strategy_returns, 0).sum(axis=1) / tail.sum(axis=1)
+            
+            beta = np.where(market_var == 0, 0.0, covariance / market_var)
+            expected_return = self.risk_free_rate + beta * (market_annualized - self.risk_free_rate)
+            
+            return {
+                'total_return': total_return,
+                'annualized_return': annualized_return,
+                'volatility': std * sqrt_year,
+                'sharpe_ratio': np.where(std == 0, 0.0, excess_mean / std * sqrt_year),
+                'sortino_ratio': np.where((downside_count == 0) | (downside_std == 0), 0.0,
+                                          excess_mean / downside_std * sqrt_year),
+                'calmar_ratio': np.where(max_drawdown == 0, 0.0, annualized_return / np.abs(max_drawdown)),
+                'max_drawdown': max_drawdown,
+                'avg_drawdown': np.where(underwater_count == 0, 0.0, avg_drawdown),
+                'information_ratio': np.where(active_std == 0, 0.0, active_mean / active_std * sqrt_year),
+                'beta': beta,
+                'alpha': annualized_return - expected_return,
+                'var_95': var,
+                'cvar_95': cvar,
+            }
     
-    def _sortino_ratio(self, df):
-        """Calculate Sortino ratio (downside deviation)"""
-        excess_returns = df['Strategy_Return'] - self.risk_free_rate / 252
-        downside_returns = excess_returns[excess_returns < 0]
-        if len(downside_returns) == 0 or downside_returns.std() == 0:
-            return 0
-        return (excess_returns.mean() / downside_returns.std()) * np.sqrt(252)
+    def _drawdown_duration(self, df):
+        """Calculate longest drawdown duration in days"""
+        return self._drawdown_periods(df)['drawdown_duration']
     
-    def _calmar_ratio(self, df):
-        """Calculate Calmar ratio"""
-        annual_return = self._annualized_return(df)
-        max_dd = abs(self._max_drawdown(df))
-        if max_dd == 0:
-            return 0
-        return annual_return / max_dd
+    def _drawdown_periods(self, df):
+        """
+        Longest drawdown from run-length encoding of the underwater mask
+        
+        Only drawdowns that have recovered are counted. drawdown_start is
+        the first underwater bar and drawdown_end the bar it recovered on.
+        """
+        periods = {'drawdown_duration': 0, 'drawdown_start': None, 'drawdown_end': None}
+        if 'Drawdown' not in df.columns:
+            return periods
+        
+        duration, start, end = self._longest_drawdown((df['Drawdown'] < 0).to_numpy())
+        if duration:
+            periods['drawdown_duration'] = duration
+            periods['drawdown_start'] = df.index[start]
+            periods['drawdown_end'] = df.index[end]
+        return periods
     
-    def _max_drawdown(self, df):
-        """Calculate maximum drawdown"""
-        if 'Drawdown' in df.columns:
-            return df['Drawdown'].min()
-        return 0
+    def _longest_drawdown(self, in_drawdown):
+        """(duration, start, recovery) positions of the longest recovered drawdown"""
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], in_drawdown.view(np.int8), [0]))))
+        starts, ends = edges[0::2], edges[1::2]
+        
+        # A drawdown still open on the last bar has no recovery yet
+        recovered = ends < len(in_drawdown)
+        starts, ends = starts[recovered], ends[recovered]
+        if len(starts) == 0:
+            return 0, None, None
+        
+        longest = np.argmax(ends - starts)
+        return int(ends[longest] - starts[longest]), starts[longest], ends[longest]
     
-    def _avg_drawdown(self, df):
-        """Calculate average drawdown"""
-        if 'Drawdown' in df.columns:
-            drawdowns = df['Drawdown'][df['Drawdown'] < 0]
-            return drawdowns.mean() if len(drawdowns) > 0 else 0
-        return 0
+    def holding_periods(self, results):
+        """
+        Bars each trade was held, in trade order
+        
+        A trade runs from one position change to the next, the same
+        segments the trade statistics are computed over.
+        """
+        if 'Position' not in results.columns:
+            return np.array([], dtype=np.int64)
+        return np.diff(self._trade_bars(results['Position'].to_numpy(dtype=np.float64)))
     
-    def _drawdown_duration(self, df):
-        """Calculate longest drawdown duration in days"""
-        if 'Drawdown' in df.columns:
-            in_drawdown = df['Drawdown'] < 0
-            durations = []
-            current_duration = 0
-            
-            for is_dd in in_drawdown:
-                if is_dd:
-                    current_duration += 1
-                else:
-                    if current_duration > 0:
-                        durations.append(current_duration)
-                    current_duration = 0
-            
-            return max(durations) if durations else 0
-        return 0
+    def _trade_bars(self, position):
+        """Bars where the position changes"""
+        step = np.diff(position)
+        return np.flatnonzero((step != 0) & ~np.isnan(step)) + 1
     
     def _trade_statistics(self, df):
         """Calculate trade-level statistics"""
         if 'Position' not in df.columns:
-            return {
-                'total_trades': 0,
-                'win_rate': 0,
-                'avg_win': 0,
-                'avg_loss': 0,
-                'profit_factor': 0,
-                'avg_trade_duration': 0
-            }
+            return self._trade_statistics_arrays(None, None, len(df))
+        return self._trade_statistics_arrays(
+            df['Position'].to_numpy(dtype=np.float64),
+            df['Cumulative_Strategy_Return'].to_numpy(),
+            len(df)
+        )
+    
+    def _trade_statistics_arrays(self, position, cumulative, n):
+        """Trade statistics from position and cumulative return arrays"""
+        empty = {
+            'total_trades': 0,
+            'win_rate': 0,
+            'avg_win': 0,
+            'avg_loss': 0,
+            'profit_factor': 0,
+            'avg_trade_duration': 0
+        }
+        if position is None:
+            return empty
         
-        # Identify trades
-        position_changes = df['Position'].diff().fillna(0) != 0
-        trades = df[position_changes]
+        # Identify trades: bars where the position changes
+        trade_bars = self._trade_bars(position)
         
-        if len(trades) < 2:
-            return {
-                'total_trades': 0,
-                'win_rate': 0,
-                'avg_win': 0,
-                'avg_loss': 0,
-                'profit_factor': 0,
-                'avg_trade_duration': 0
-            }
+        if len(trade_bars) < 2:
+            return empty
         
-        # Calculate returns for each trade
-        trade_returns = []
-        for i in range(len(trades) - 1):
-            start_idx = trades.index[i]
-            end_idx = trades.index[i + 1]
-            trade_return = df.loc[end_idx, 'Cumulative_Strategy_Return'] / \
-                          df.loc[start_idx, 'Cumulative_Strategy_Return'] - 1
-            trade_returns.append(trade_return)
+        # Each trade runs from one position change to the next
+        trade_returns = cumulative[trade_bars[1:]] / cumulative[trade_bars[:-1]] - 1
         
-        trade_returns = np.array(trade_returns)
         wins = trade_returns[trade_returns > 0]
         losses = trade_returns[trade_returns < 0]
         
@@ -166,59 +272,9 @@ class PerformanceAnalyzer:
             'avg_win': wins.mean() if len(wins) > 0 else 0,
             'avg_loss': losses.mean() if len(losses) > 0 else 0,
             'profit_factor': abs(wins.sum() / losses.sum()) if len(losses) > 0 and losses.sum() != 0 else 0,
-            'avg_trade_duration': len(df) / len(trades) if len(trades) > 0 else 0
+            'avg_trade_duration': n / len(trade_bars)
         }
     
-    def _information_ratio(self, df):
-        """Calculate information ratio vs benchmark"""
-        excess_returns = df['Strategy_Return'] - df['Daily_Return']
-        if excess_returns.std() == 0:
-            return 0
-        return (excess_returns.mean() / excess_returns.std()) * np.sqrt(252)
-    
-    def _beta(self, df):
-        """Calculate beta vs market"""
-        market_returns = df['Daily_Return'].dropna()
-        strategy_returns = df['Strategy_Return'].dropna()
-        
-        if len(market_returns) != len(strategy_returns):
-            min_len = min(len(market_returns), len(strategy_returns))
-            market_returns = market_returns[-min_len:]
-            strategy_returns = strategy_returns[-min_len:]
-        
-        if len(market_returns) == 0 or market_returns.var() == 0:
-            return 0
-        
-        covariance = np.cov(strategy_returns, market_returns)[0][1]
-        market_variance = market_returns.var()
-        return covariance / market_variance
-    
-    def _alpha(self, df):
-        """Calculate alpha (excess return vs expected return)"""
-        beta = self._beta(df)
-        strategy_return = self._annualized_return(df)
-        market_return = (df['Cumulative_Market_Return'].iloc[-1] - 1)
-        years = len(df) / 252
-        market_return_ann = (1 + market_return) ** (1 / years) - 1
-        
-        expected_return = self.risk_free_rate + beta * (market_return_ann - self.risk_free_rate)
-        return strategy_return - expected_return
-    
-    def _value_at_risk(self, df, confidence=0.95):
-        """Calculate Value at Risk"""
-        returns = df['Strategy_Return'].dropna()
-        if len(returns) == 0:
-            return 0
-        return np.percentile(returns, (1 - confidence) * 100)
-    
-    def _conditional_var(self, df, confidence=0.95):
-        """Calculate Conditional Value at Risk (Expected Shortfall)"""
-        returns = df['Strategy_Return'].dropna()
-        if len(returns) == 0:
-            return 0
-        var = self._value_at_risk(df, confidence)
-        return returns[returns <= var].mean()
-    
     def generate_report(self, metrics):
         """Generate formatted performance report"""
         report = f"""
@@ -241,6 +297,7 @@ DRAWDOWN METRICS:
   Maximum Drawdown:          {metrics['max_drawdown']:>12.2%}
   Average Drawdown:          {metrics['avg_drawdown']:>12.2%}
   Longest DD Duration:       {metrics['drawdown_duration']:>12.0f} days
+  Longest DD Period:         {self._format_period(metrics.get('drawdown_start'), metrics.get('drawdown_end')):>12}
 
 TRADE STATISTICS:
   Total Trades:              {metrics['total_trades']:>12.0f}
@@ -260,4 +317,10 @@ RISK METRICS:
 
 {'='*70}
 """
-        return report
\ No newline at end of file
+        return report
+    
+    def _format_period(self, start, end):
+        """Format a start/end date pair for the report"""
+        if start is None or end is None:
+            return 'n/a'
+        return f"{pd.Timestamp(start):%Y-%m-%d} to {pd.Timestamp(end):%Y-%m-%d}"
@@ -0,0 +1,208 @@
+"""
+Portfolio Backtesting Engine
+Simulates several tickers trading from one shared cash balance
+"""
+
+import pandas as pd
+import numpy as np
+
+from backtester import Backtester
+from panel import PricePanel
+from risk_manager import StopTracker
+
+class PortfolioBacktester(Backtester):
+    """
+    Multi-asset backtest on a common calendar with shared cash
+
+    Each ticker follows the same enter-on-1, exit-on--1/0 rules as the
+    single-ticker Backtester, but an entry only spends its Position_Size
+    fraction of the current portfolio equity, and every trade draws from or
+    returns to the same cash balance. Holdings are kept as one
+    (bars x tickers) array of share counts.
+    """
+
+    def run(self, data, signals):
+        """
+        Run the portfolio backtest
+
+        Args:
+            data: Dict of ticker -> DataFrame with price data ('Close'), or
+                a PricePanel, whose calendar and close array are used as
+                they are instead of being aligned again
+            signals: Dict of ticker -> DataFrame with 'Signal' and optional
+                'Position_Size' columns, e.g. from
+                RiskManager.apply_position_sizing. Without Position_Size each
+                entry targets an equal 1/N share of equity.
+
+        Returns:
+            Tuple of (results, holdings): results is a DataFrame of
+            portfolio-level columns on the common calendar, compatible with
+            PerformanceAnalyzer; holdings is a (bars x tickers) array of
+            shares held, with tickers in the order of data
+        """
+        if isinstance(data, PricePanel):
+            tickers = [ticker for ticker in data.tickers if ticker in signals]
+            panel = data if tickers == data.tickers else data.select(tickers)
+            index = panel.index
+            # Accounting runs in float64 even on a compact (float32) panel
+            close = np.where(panel.valid, panel['Close'].astype(np.float64), np.nan)
+            signal, size = self._align_signals(signals, tickers, index)
+        else:
+            tickers = [ticker for ticker in data if ticker in signals]
+            index = self._calendar(data, tickers)
+            close, signal, size = self._align(data, signals, tickers, index)
+
+        # Prices carry forward over gaps for valuation; no trades on gap bars
+        tradable = ~np.isnan(close)
+        valuation = pd.DataFrame(close).ffill().fillna(0).to_numpy()
+
+        cash, holdings, costs = self._simulate_portfolio(close, valuation, signal, size, tradable)
+
+        holdings_value = (holdings * valuation).sum(axis=1)
+        equity = pd.Series(cash + holdings_value, index=index)
+
+        # Benchmark: equal-weight mix of the assets' daily returns
+        asset_returns = pd.DataFrame(valuation, index=index).pct_change()
+        asset_returns = asset_returns.where(np.isfinite(asset_returns))
+        benchmark = (1 + asset_returns.mean(axis=1).fillna(0)).cumprod()
+
+        results = pd.DataFrame({
+            'Cash': cash,
+            'Holdings_Value': holdings_value,
+            'Total_Equity': equity,
+            'Transaction_Cost': costs,
+            **self._performance_columns(benchmark, equity, holdings.sum(axis=1))
+        }, index=index)
+        # Number of open positions, so every entry and exit shows as a trade
+        results['Position'] = np.count_nonzero(holdings, axis=1)
+        return results, holdings
+
+    def _calendar(self, data, tickers):
+        """Sorted union of every ticker's dates"""
+        index = None
+        for ticker in tickers:
+            index = data[ticker].index if index is None else index.union(data[ticker].index)
+        if index is None:
+            return pd.DatetimeIndex([])
+        return index.sort_values()
+
+    def _align(self, data, signals, tickers, index):
+        """(bars x tickers) close, signal and position size arrays on the calendar"""
+        close = self._stack([self._first_column(data[t], 'Close') for t in tickers], index)
+        signal, size = self._align_signals(signals, tickers, index)
+        return close, signal, size
+
+    def _align_signals(self, signals, tickers, index):
+        """(bars x tickers) signal and position size arrays on the calendar"""
+        k = len(tickers)
+        signal = self._stack([self._signal_series(signals[t], signals[t].index) for t in tickers], index)
+
+        # Long-only: a size is the fraction of equity one entry may spend
+        sizes = [self._first_column(signals[t], 'Position_Size') if 'Position_Size' in signals[t].columns
+                 else pd.Series(1.0 / k, index=signals[t].index) for t in tickers]
+        size = np.clip(np.nan_to_num(self._stack(sizes, index)), 0.0, 1.0)
+        return signal, size
+
+    def _stack(self, columns, index):
+        """Align per-ticker Series to the calendar as one (bars x tickers) float array"""
+        stacked = np.full((len(index), len(columns)), np.nan)
+        for j, column in enumerate(columns):
+            values = column.to_numpy(dtype=np.float64)
+            if column.index.equals(index):
+                stacked[:, j] = values
+            else:
+                rows = index.get_indexer(column.index)
+                on_calendar = rows >= 0
+                stacked[rows[on_calendar], j] = values[on_calendar]
+        return stacked
+
+    def _simulate_portfolio(self, close, valuation, signal, size, tradable):
+        """
+        Shared-cash state machine over (bars x tickers) arrays
+
+        Only bars where some ticker could enter or exit are visited (every
+        bar when stops are set). On those bars exits are filled first, then
+        entries in ticker order, each sized from the equity at that bar's
+        close. Stops are tracked for all tickers at once by a StopTracker;
+        a ticker that was stopped out re-enters only after its buy signal
+        lapses.
+
+        Returns:
+            Tuple of (cash, holdings, transaction_cost) arrays
+        """
+        n, k = close.shape
+        buy = (signal == 1) & tradable & (size > 0)
+        sell = ((signal == -1) | (signal == 0)) & tradable
+        active_bars = np.flatnonzero(buy.any(axis=1) | sell.any(axis=1))
+        
+        stops = self._has_stops()
+        if stops:
+            tracker = StopTracker(k, self.stop_loss, self.take_profit, self.trailing_stop)
+            armed = np.ones(k, dtype=bool)
+            active_bars = np.arange(n)
+
+        current_cash = float(self.initial_capital)
+        current_shares = np.zeros(k, dtype=np.int64)
+        trade_bars = []
+        cash_path = [current_cash]
+        holdings_path = [current_shares]
+        costs = np.zeros(n)
+
+        for i in active_bars:
+            held = current_shares > 0
+            exits = held & sell[i]
+            entries = ~held & buy[i]
+            if stops:
+                armed |= signal[i] != 1
+                stopped = tracker.update(close[i]) & ~exits
+                exits |= stopped
+                armed &= ~stopped
+                entries &= armed
+                tracker.close(exits)
+
+            price = close[i]
+            shares = current_shares.copy()
+            fees = 0.0
+
+            # Exits first, so their proceeds can fund this bar's entries
+            for j in np.flatnonzero(exits):
+                current_cash += (shares[j] * price[j]) - self.commission_fee
+                fees += self.commission_fee
+                shares[j] = 0
+
+            # Cash only falls while filling entries, so tickers priced above
+            # the available cash now can be skipped outright
+            candidates = np.flatnonzero(entries)
+            candidates = candidates[price[candidates] < current_cash - self.commission_fee]
+            if len(candidates):
+                equity = current_cash + float((shares * valuation[i]).sum())
+                cheapest = price[candidates].min()
+                for j in candidates:
+                    # Rule A: The "Affordability" Check, capped at the target size
+                    available_cash = current_cash - self.commission_fee
+                    if available_cash <= cheapest:
+                        break
+                    budget = min(size[i, j] * equity, available_cash)
+                    if budget > price[j]:
+                        num_shares = int(budget // price[j])
+                        shares[j] = num_shares
+                        current_cash -= (num_shares * price[j]) + self.commission_fee
+                        fees += self.commission_fee
+                        if stops:
+                            tracker.open(j, price[j])
+
+            if fees:
+                costs[i] = fees
+                current_shares = shares
+                trade_bars.append(i)
+                cash_path.append(current_cash)
+                holdings_path.append(current_shares)
+
+        # Map every bar to the state produced by the last trade at or before it
+        state = np.zeros(n, dtype=np.intp)
+        state[trade_bars] = 1
+        state = np.cumsum(state)
+
+        cash = np.asarray(cash_path, dtype=np.float64)[state]
+        holdings = np.asarray(holdings_path, dtype=np.int64)[state]
+        return cash, holdings, costs
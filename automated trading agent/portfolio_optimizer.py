@@ -1,4 +1,3 @@
-
 """
 Portfolio Optimizer
 Allocates capital efficiently across assets
@@ -6,23 +5,572 @@ Allocates capital efficiently across assets
 
 import pandas as pd
 import numpy as np
+from scipy.linalg import blas
+
+from covariance import covariance_matrix, estimate_covariance, rolling_windows
+from performance_metrics import TRADING_DAYS
+
+OBJECTIVES = ('min_variance', 'max_sharpe', 'target_return')
+
+def _project(weights, max_weight):
+    """
+    Euclidean projection onto {sum(w) = 1, 0 <= w <= max_weight}
+
+    w = clip(v - tau, 0, max_weight) and sum(w) is piecewise linear in
+    tau, so tau is found exactly from the sorted breakpoints.
+    """
+    n = len(weights)
+    if max_weight * n <= 1:
+        return np.full(n, max_weight)
+    breakpoints = np.concatenate([weights - max_weight, weights])
+    order = np.argsort(breakpoints, kind='stable')
+    breakpoints = breakpoints[order]
+    # Number of weights strictly between 0 and the cap after each breakpoint
+    slope = np.cumsum(np.where(order < n, 1, -1))
+    total = np.empty(2 * n)
+    total[0] = max_weight * n
+    total[1:] = total[0] - np.cumsum(slope[:-1] * np.diff(breakpoints))
+    k = np.searchsorted(-total, -1.0)
+    tau = breakpoints[k - 1] + (total[k - 1] - 1) / slope[k - 1]
+    return np.clip(weights - tau, 0, max_weight)
+
+def _warm_start(weights, max_weight):
+    """
+    Feasible weights close to a previous solution
+
+    Assets the previous solution did not hold stay at exactly 0, so the
+    solver starts from the previous active set instead of a dense point.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if abs(weights.sum() - 1) <= 1e-12 and weights.min() >= 0 and weights.max() <= max_weight:
+        return weights
+    held = weights > 0
+    if held.sum() * max_weight < 1:
+        return _project(weights, max_weight)
+    start = np.zeros(len(weights))
+    start[held] = _project(weights[held], max_weight)
+    return start
+
+def _lowest_variance_start(cov, max_weight):
+    """Feasible start: the lowest-variance assets filled to the cap"""
+    weights = np.zeros(len(cov))
+    order = np.argsort(np.diag(cov), kind='stable')
+    k = int(np.ceil(1 / max_weight - 1e-12))
+    weights[order[:k]] = max_weight
+    weights[order[k - 1]] = 1 - max_weight * (k - 1)
+    return weights
+
+def _room(weights, step, max_weight):
+    """Longest multiple of step that keeps each weight within [0, max_weight]"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(step < 0, weights / -step,
+                        np.where(step > 0, (max_weight - weights) / step, np.inf))
+
+def _projected_gradient(cov, target, max_weight, weights, iterations=20000):
+    """
+    Accelerated projected gradient (FISTA) for min w'Cw / 2 - target'w
+
+    Much slower than the active set, but it cannot cycle, so it is the
+    fallback when the active set hits its iteration limit.
+    """
+    step = 1 / max(np.linalg.eigvalsh(cov)[-1], 1e-300)
+    current = point = weights
+    momentum = 1.0
+    for _ in range(iterations):
+        updated = _project(point - step * (cov @ point - target), max_weight)
+        if np.abs(updated - current).max() <= 1e-13:
+            return updated
+        following = (1 + np.sqrt(1 + 4 * momentum ** 2)) / 2
+        point = updated + (momentum - 1) / following * (updated - current)
+        current, momentum = updated, following
+    return current
+
+class _ActiveSet:
+    """
+    Minimize w'Cw / 2 - gamma * mean'w over the capped long-only simplex
+
+    Primal active-set method. Assets at 0 or at the cap are held fixed
+    while the free ones solve the equality-constrained problem; a step
+    that hits a bound fixes that asset, and at a stationary point a
+    fixed asset with a negative multiplier is released. The inverse of
+    the free assets' KKT matrix is updated by bordering as assets are
+    released and fixed, so an iteration costs O(n^2) rather than a new
+    factorization.
+
+    Sample covariances of more assets than observations are singular.
+    A released asset whose direction has no curvature is moved until
+    some asset hits a bound instead of being added to a singular KKT
+    matrix, so the free assets always have a unique solution.
+    Degenerate (zero-length) steps switch the release rule to the
+    lowest eligible asset, Bland's rule, which cannot cycle; blocking
+    ties always go to the lowest asset. If the iteration limit is still
+    reached, the solve falls back to projected gradient.
+
+    The solver keeps its last solution, so successive solves on the same
+    covariance (the frontier searches in PortfolioOptimizer) start from
+    the previous active set.
+    """
+
+    def __init__(self, cov, max_weight, weights):
+        """
+        Args:
+            cov: Covariance matrix
+            max_weight: Cap on each weight
+            weights: Feasible starting weights (sum to 1, within the bounds)
+        """
+        self.cov = cov
+        self.max_weight = max_weight
+        self.weights = weights.copy()
+        self.lower = self.weights <= 0
+        self.upper = (self.weights >= max_weight) & ~self.lower
+        if (self.lower | self.upper).all():
+            # The budget constraint needs at least one free asset
+            j = np.flatnonzero(self.weights > 0)[-1]
+            self.lower[j] = self.upper[j] = False
+        # Curvature below this is treated as none
+        self.flat = 1e-10 * max(np.diag(cov).max(), 1e-300)
+        self._factorize(np.zeros(len(weights)))
+
+    def solve(self, target):
+        """
+        Optimal weights for the linear term target (gamma * mean)
+
+        Returns:
+            Optimal weights (a new array)
+        """
+        saved = self.weights.copy(), self.lower.copy(), self.upper.copy(), list(self.free), self.kinv.copy()
+        bland = False
+        stationary = False
+        misses = 0
+        updates = 0
+        for _ in range(20 * len(self.weights)):
+            if updates >= 100:
+                # Refresh the bordered inverse before rounding builds up
+                self._factorize(self.cov @ self.weights - target)
+                updates = 0
+                stationary = False
+            free = np.array(self.free, dtype=np.intp)
+
+            newton = not stationary
+            if newton:
+                step = self._newton_step(free, self.cov @ self.weights - target)
+                room = _room(self.weights[free], step, self.max_weight)
+                # A single free asset is set by the budget; only rounding moves it
+                if room.min() >= 1 or len(free) == 1:
+                    self.weights[free] = np.clip(self.weights[free] + step, 0, self.max_weight)
+                    stationary = True
+                else:
+                    position = self._blocking(free, room)
+                    self.weights[free] += room[position] * step
+                    bland |= room[position] <= 0
+                    self._fix(position, step[position] > 0)
+                    updates += 1
+                    continue
+
+            # Put back any budget lost to rounding along the KKT response
+            # to the budget, which keeps the free assets stationary
+            self.weights[free] += (1 - self.weights.sum()) * self.kinv[1:, 0]
+            gradient = self.cov @ self.weights - target
+            gradient -= gradient[free].mean()
+            scale = 1e-12 * max(1.0, np.abs(gradient).max())
+            if np.abs(gradient[free]).max() > scale:
+                # Short of stationary: take another (refining) Newton step,
+                # refactorizing if one was not enough. Past that the KKT
+                # matrix is too ill-conditioned to do better, so carry on
+                misses += newton
+                if misses == 2:
+                    updates = 100
+                if misses < 4:
+                    stationary = False
+                    continue
+            misses = 0
+            violation = np.maximum(np.where(self.lower, -gradient, 0.0), np.where(self.upper, gradient, 0.0))
+            eligible = np.flatnonzero(violation > scale)
+            if len(eligible) == 0:
+                return self.weights.copy()
+            j = eligible[0] if bland else eligible[np.argmax(violation[eligible])]
+
+            # Release j along the direction that keeps the free assets
+            # stationary: the objective falls at rate violation[j] and
+            # bends by the curvature
+            u, curvature = self._coupling(free, j)
+            sign = 1.0 if self.lower[j] else -1.0
+            direction = -sign * u[1:]
+            longest = violation[j] / curvature if curvature > self.flat else np.inf
+            room = _room(self.weights[free], direction, self.max_weight)
+            position = self._blocking(free, room)
+            length = min(longest, self.max_weight, room[position])
+            bland |= length <= 0
+            self.weights[free] += length * direction
+            self.weights[j] += sign * length
+            self.lower[j] = self.upper[j] = False
+            updates += 1
+            if room[position] <= min(longest, self.max_weight):
+                # Another asset reaches its bound first and j takes its place
+                self._fix(position, direction[position] > 0)
+                u, curvature = self._coupling(np.array(self.free, dtype=np.intp), j)
+                self._border(j, u, curvature)
+                stationary = False
+            elif longest <= self.max_weight:
+                self._border(j, u, curvature)
+            else:
+                # j crosses to its other bound; the free assets stay stationary
+                self.weights[j] = self.max_weight if sign > 0 else 0.0
+                self.lower[j], self.upper[j] = sign < 0, sign > 0
+
+        # Restore the last solution so the next solve starts from it
+        self.weights, self.lower, self.upper, self.free, self.kinv = saved
+        return _projected_gradient(self.cov, target, self.max_weight, self.weights)
+
+    def _newton_step(self, free, gradient):
+        """
+        Step to the stationary point of the free assets
+
+        Solved for the correction from the current residual, so a repeated
+        step refines the solution instead of repeating its rounding.
+        """
+        rhs = np.empty(len(free) + 1)
+        rhs[0] = 1 - self.weights.sum()
+        rhs[1:] = -gradient[free]
+        return (self.kinv @ rhs)[1:]
+
+    def _blocking(self, free, room):
+        """Position of the first asset to reach a bound, the lowest asset on ties"""
+        if len(room) == 0:
+            return None
+        ties = np.flatnonzero(room == room.min())
+        return ties[np.argmin(free[ties])]
+
+    def _coupling(self, free, j):
+        """KKT inverse applied to asset j's column, and the curvature left when j is freed"""
+        column = np.empty(len(free) + 1)
+        column[0] = 1.0
+        column[1:] = self.cov[free, j]
+        u = self.kinv @ column
+        return u, self.cov[j, j] - column @ u
+
+    def _border(self, j, u, curvature):
+        """Add asset j to the free set"""
+        if not self.free:
+            self.kinv = np.array([[-self.cov[j, j], 1.0], [1.0, 0.0]])
+            self.free.append(j)
+            return
+        k = len(self.kinv)
+        kinv = np.empty((k + 1, k + 1), order='F')
+        kinv[:k, :k] = self._rank_one(self.kinv, 1 / curvature, u)
+        kinv[:k, k] = kinv[k, :k] = -u / curvature
+        kinv[k, k] = 1 / curvature
+        self.kinv = kinv
+        self.free.append(j)
+
+    def _fix(self, position, at_cap):
+        """Hold the free asset at position at its bound and remove it from the free set"""
+        # Swap it to the end so the inverse only loses its last row and column
+        last = len(self.free) - 1
+        self.free[position], self.free[last] = self.free[last], self.free[position]
+        q = position + 1
+        self.kinv[[q, -1]] = self.kinv[[-1, q]]
+        self.kinv[:, [q, -1]] = self.kinv[:, [-1, q]]
+        j = self.free.pop()
+        self.weights[j] = self.max_weight if at_cap else 0.0
+        self.upper[j], self.lower[j] = at_cap, not at_cap
+        if not self.free:
+            # Only the asset being released is left to free
+            self.kinv = np.zeros((1, 1))
+            return
+        column = self.kinv[:-1, -1].copy()
+        self.kinv = self._rank_one(np.asfortranarray(self.kinv[:-1, :-1]), -1 / self.kinv[-1, -1], column)
+
+    @staticmethod
+    def _rank_one(matrix, scale, vector):
+        """matrix + scale * vector vector', in place (BLAS ger) when matrix is Fortran-ordered"""
+        return blas.dger(scale, vector, vector, a=matrix, overwrite_a=True)
+
+    def _factorize(self, gradient):
+        """
+        Invert the free assets' KKT matrix
+
+        The matrix is singular exactly when C_ff + s * 11' is, so its
+        Cholesky pivots show whether it can be inverted directly.
+        Otherwise the inverse is built by bordering in the free assets
+        one at a time; an asset that is a combination of those already
+        added is moved, with them, along the flat direction (downhill on
+        gradient) until some asset hits a bound.
+        """
+        candidates = np.flatnonzero(~(self.lower | self.upper))
+        block = self.cov[np.ix_(candidates, candidates)]
+        try:
+            pivots = np.diag(np.linalg.cholesky(block + self.flat * 1e10)) ** 2
+        except np.linalg.LinAlgError:
+            pivots = np.zeros(1)
+        if pivots.min() > self.flat:
+            kkt = np.empty((len(candidates) + 1, len(candidates) + 1))
+            kkt[0, 0] = 0.0
+            kkt[0, 1:] = kkt[1:, 0] = 1.0
+            kkt[1:, 1:] = block
+            self.free = list(candidates)
+            # Symmetric, so the transpose is the same matrix in Fortran order
+            self.kinv = np.linalg.inv(kkt).T
+            return
+
+        self.free = []
+        for j in candidates:
+            while not (self.lower[j] or self.upper[j]):
+                free = np.array(self.free, dtype=np.intp)
+                u, curvature = self._coupling(free, j) if self.free else (None, np.inf)
+                if curvature > self.flat:
+                    self._border(j, u, curvature)
+                    break
+                direction = -u[1:]
+                sign = -1.0 if gradient[free] @ direction + gradient[j] > 0 else 1.0
+                direction *= sign
+                room = _room(self.weights[free], direction, self.max_weight)
+                position = self._blocking(free, room)
+                own = (self.max_weight - self.weights[j]) if sign > 0 else self.weights[j]
+                length = min(room[position], own)
+                self.weights[free] += length * direction
+                self.weights[j] += sign * length
+                if own <= room[position]:
+                    self.weights[j] = self.max_weight if sign > 0 else 0.0
+                    self.lower[j], self.upper[j] = sign < 0, sign > 0
+                else:
+                    self._fix(position, direction[position] > 0)
 
 class PortfolioOptimizer:
     """Optimize capital allocation"""
-    
-    def __init__(self, risk_free_rate=0.02):
+
+    def __init__(self, risk_free_rate=0.02, max_weight=1.0, periods_per_year=TRADING_DAYS,
+                 covariance='sample', covariance_params=None):
         self.risk_free_rate = risk_free_rate
-        
-    def optimize_allocation(self, data_dict):
+        self.max_weight = max_weight  # Cap on any single asset's weight (long-only)
+        self.periods_per_year = periods_per_year
+        # Estimator from covariance.METHODS and its options
+        self.covariance = covariance
+        self.covariance_params = covariance_params or {}
+
+    def optimize_allocation(self, data_dict, objective='max_sharpe', target_return=None, lookback=None):
         """
         Calculates optimal weights using Mean-Variance Optimization (Markowitz)
+
+        Args:
+            data_dict: Dictionary of ticker -> DataFrame with 'Close'
+            objective: 'min_variance', 'max_sharpe' or 'target_return'
+            target_return: Annualized return floor for 'target_return'
+            lookback: Use only the last lookback returns (all by default)
+
+        Returns:
+            Dictionary of ticker -> weight; tickers without a complete
+            return history over the lookback get 0
         """
-        # This is a placeholder for a full optimizer implementation
-        # For now, it returns equal weights
         tickers = list(data_dict.keys())
-        n = len(tickers)
-        if n == 0:
+        if len(tickers) == 0:
             return {}
-            
-        weights = {ticker: 1.0/n for ticker in tickers}
-        return weights
+
+        returns = self.returns_matrix(data_dict)
+        if lookback is not None:
+            returns = returns.iloc[-lookback:]
+        valid = returns.notna().all(axis=0).to_numpy()
+        window = returns.loc[:, valid]
+        mean = window.mean(axis=0).to_numpy() * self.periods_per_year
+        # Shared cache: the same universe and window is estimated once
+        cov = covariance_matrix(window, self.covariance, **self.covariance_params).to_numpy()
+
+        weights = np.zeros(len(tickers))
+        weights[valid] = self.optimize(mean, cov * self.periods_per_year, objective, target_return)
+        return dict(zip(tickers, weights))
+
+    def rolling_allocation(self, data_dict, lookback=TRADING_DAYS, rebalance_every=5,
+                           objective='max_sharpe', target_return=None):
+        """
+        Re-optimize every rebalance_every bars on a trailing window
+
+        Returns are aligned into one array up front. The window's running
+        statistics are moved between rebalances by adding and removing
+        bars, and each estimator is read from them instead of being
+        recomputed over the window. Each solve
+        warm-starts from the previous weights, so consecutive solves only
+        move the assets whose bounds changed.
+
+        Returns:
+            DataFrame of weights (rebalance dates x tickers)
+        """
+        returns_df = self.returns_matrix(data_dict)
+        returns = returns_df.to_numpy()
+        n_bars, n_assets = returns.shape
+
+        ends = np.arange(lookback, n_bars + 1, rebalance_every)
+        allocations = np.zeros((len(ends), n_assets))
+        previous = np.zeros(n_assets)
+        gamma = None
+        missing = np.isnan(returns)
+        # Missing returns only affect the assets they exclude below
+        windows = rolling_windows(np.where(missing, 0.0, returns), lookback, ends,
+                                  self.covariance, **self.covariance_params)
+        for row, (end, stats) in enumerate(windows):
+            valid = ~missing[end - lookback:end].any(axis=0)
+            if valid.sum() == 0:
+                continue
+            mean = stats.mean[valid] * self.periods_per_year
+            cov = stats.covariance(valid) * self.periods_per_year
+            start = previous[valid] if previous[valid].sum() > 0 else None
+            weights, gamma = self._optimize(mean, cov, objective, target_return, start, gamma)
+            allocations[row, valid] = weights
+            previous = allocations[row]
+
+        return pd.DataFrame(allocations, index=returns_df.index[ends - 1], columns=returns_df.columns)
+
+    def optimize(self, mean, cov, objective='max_sharpe', target_return=None, initial_weights=None):
+        """
+        Optimal long-only weights for annualized mean returns and covariance
+
+        Args:
+            mean: Expected returns (annualized)
+            cov: Covariance matrix (annualized)
+            objective: 'min_variance', 'max_sharpe' or 'target_return'
+            target_return: Return floor for 'target_return'; the minimum
+                variance portfolio is returned if it already earns it
+            initial_weights: Warm start, e.g. the previous rebalance
+        """
+        return self._optimize(np.asarray(mean, dtype=np.float64), np.asarray(cov, dtype=np.float64),
+                              objective, target_return, initial_weights)[0]
+
+    def _optimize(self, mean, cov, objective, target_return, initial_weights=None, gamma=None):
+        """
+        Solve along the frontier min w'Cw / 2 - gamma * mean'w
+
+        gamma = 0 is the minimum variance portfolio. The maximum Sharpe
+        portfolio is the frontier point where gamma equals variance over
+        excess return, found by secant-accelerated fixed-point iteration
+        from the previous gamma. A target return is met (to 1e-10) by a
+        bracketed search on gamma, along which the portfolio return is
+        non-decreasing.
+
+        Returns:
+            Tuple of (weights, gamma)
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        n = len(mean)
+        if self.max_weight * n < 1 - 1e-12:
+            raise ValueError(f"max_weight {self.max_weight} cannot allocate the budget across {n} assets")
+
+        if initial_weights is None:
+            weights = _lowest_variance_start(cov, self.max_weight)
+        else:
+            weights = _warm_start(initial_weights, self.max_weight)
+
+        start = weights
+        solver = _ActiveSet(cov, self.max_weight, start)
+
+        def solve(g):
+            return solver.solve(g * mean)
+
+        # Highest attainable return: fill the best assets to the cap
+        best = np.sort(mean)[::-1]
+        full = min(int(1 / self.max_weight), n)
+        highest = self.max_weight * best[:full].sum()
+        if full < n:
+            highest += max(1 - self.max_weight * full, 0.0) * best[full]
+
+        if objective == 'min_variance' or (objective == 'max_sharpe' and highest <= self.risk_free_rate):
+            # No portfolio earns the risk-free rate: fall back to min variance
+            return solve(0.0), 0.0
+
+        if objective == 'max_sharpe':
+            gamma = 1.0 if gamma is None else gamma
+            previous = weights
+            last = None
+            for _ in range(200):
+                weights = solve(gamma)
+                excess = mean @ weights - self.risk_free_rate
+                if excess <= 0:
+                    # Grow gamma until the return clears the risk-free rate,
+                    # from where the linear term starts to matter if it was 0
+                    gamma = gamma * 4 or np.abs(cov @ weights).max() / np.abs(mean).max() or 1.0
+                    last = None
+                    continue
+                # Rounding can leave a singular covariance's variance below zero
+                residual = max(weights @ cov @ weights, 0.0) / excess - gamma
+                if abs(residual) <= 1e-10 * gamma or np.abs(weights - previous).max() <= 1e-12:
+                    break
+                updated = gamma + residual
+                if last is not None and residual != last[1]:
+                    # Secant step on the residual: near-riskless windows drive
+                    # gamma geometrically towards 0, which plain iteration
+                    # only approaches
+                    updated = gamma - residual * (gamma - last[0]) / (residual - last[1])
+                    if not updated >= 0:
+                        updated = max(gamma + residual, 0.0)
+                last = gamma, residual
+                previous = weights
+                gamma = updated
+            return weights, gamma
+
+        if target_return is None:
+            raise ValueError("objective='target_return' requires target_return")
+        if target_return > highest + 1e-12:
+            raise ValueError(f"Target return {target_return:.2%} is above the highest attainable {highest:.2%}")
+
+        def shortfall(g):
+            nonlocal weights
+            weights = solve(g)
+            return mean @ weights - target_return
+
+        # Bracket the target starting from the previous gamma, whose
+        # solution is closest to the warm start
+        gamma = gamma or 1.0
+        value = shortfall(gamma)
+        if value < 0:
+            low, shortfall_low = gamma, value
+            high = gamma * 4
+            shortfall_high = shortfall(high)
+            while shortfall_high < 0:
+                low, shortfall_low = high, shortfall_high
+                high *= 4
+                shortfall_high = shortfall(high)
+        else:
+            high, shortfall_high = gamma, value
+            low = gamma / 4
+            shortfall_low = shortfall(low)
+            while shortfall_low >= 0:
+                if low == 0.0:
+                    # The minimum variance portfolio already earns the target.
+                    # A solve from the start gives exactly the min_variance
+                    # result; with a singular covariance that may be another
+                    # minimum variance portfolio, which must also earn it
+                    first = _ActiveSet(cov, self.max_weight, start).solve(0.0 * mean)
+                    return (first if mean @ first >= target_return else weights), 0.0
+                high, shortfall_high = low, shortfall_low
+                low = low / 4 if low > 1e-8 else 0.0
+                shortfall_low = shortfall(low)
+
+        # Illinois false position: the return is piecewise linear in gamma
+        # (linear while the active set holds), so few solves are needed
+        side = 0
+        for _ in range(100):
+            gamma = (low * shortfall_high - high * shortfall_low) / (shortfall_high - shortfall_low)
+            value = shortfall(gamma)
+            if abs(value) <= 1e-10 * max(1.0, abs(target_return)):
+                return weights, gamma
+            if value < 0:
+                low, shortfall_low = gamma, value
+                if side == -1:
+                    shortfall_high /= 2
+                side = -1
+            else:
+                high, shortfall_high = gamma, value
+                if side == 1:
+                    shortfall_low /= 2
+                side = 1
+        return solve(high), high
+
+    def _moments(self, returns):
+        """Annualized mean and covariance of a complete return window"""
+        cov = estimate_covariance(returns, self.covariance, **self.covariance_params)
+        return returns.mean(axis=0) * self.periods_per_year, cov * self.periods_per_year
+
+    @staticmethod
+    def returns_matrix(data_dict):
+        """Close-to-close returns of every ticker on the union of their dates"""
+        closes = pd.concat({ticker: df['Close'] for ticker, df in data_dict.items()}, axis=1)
+        return closes.pct_change(fill_method=None).iloc[1:]
@@ -0,0 +1,203 @@
+"""
+Memory-Mapped Price Store
+Columnar on-disk price history read zero-copy through numpy memmaps
+"""
+
+import json
+import os
+import re
+import shutil
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+class PriceStore(Mapping):
+    """
+    Read-only mapping of ticker -> price DataFrame backed by files on disk
+
+    Layout under the store directory:
+        meta.json          tickers, fields, timezone and row ranges
+        index.npy          shared int64 timestamp index (ns) for all tickers
+        <ticker>/<field>.npy   one contiguous float64 column per field
+
+    A ticker covers the rows [start, end) of the shared index. Its columns
+    hold only its own bars; when it has no bar on some timestamps in that
+    range, positions.npy records which index rows it does have.
+
+    Opening a store reads only meta.json and maps the index. Columns are
+    memory-mapped when a ticker is accessed, and frames wrap them without
+    copying, so only the pages a computation touches are read from disk.
+    """
+
+    META_FILE = 'meta.json'
+    INDEX_FILE = 'index.npy'
+    POSITIONS_FILE = 'positions.npy'
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, self.META_FILE), 'r') as f:
+            meta = json.load(f)
+        self.fields = meta['fields']
+        self._entries = meta['tickers']
+        # Requested [start, end) dates the store was written for, if recorded
+        self.coverage = tuple(meta['coverage']) if meta.get('coverage') else None
+
+        stamps = np.load(os.path.join(store_dir, self.INDEX_FILE), mmap_mode='r')
+        index = pd.DatetimeIndex(np.asarray(stamps).view('M8[ns]'))
+        if meta.get('tz'):
+            index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        self.index = index
+
+    @classmethod
+    def exists(cls, store_dir):
+        return os.path.exists(os.path.join(store_dir, cls.META_FILE))
+
+    @classmethod
+    def write(cls, store_dir, data, fields=None, coverage=None):
+        """
+        Write a dict of ticker -> DataFrame as a new store and open it
+
+        The shared index is the union of every ticker's timestamps. An
+        existing store in store_dir is replaced once the new one is complete.
+
+        Args:
+            store_dir: Directory of the store
+            data: Dict of ticker -> DataFrame with a DatetimeIndex
+            fields: Columns to store (default: every column of the first
+                ticker, e.g. Open, High, Low, Close, Volume)
+            coverage: Optional (start, end) date range the data was
+                requested for, recorded so callers can tell whether a
+                later request is served by the store
+        """
+        data = {ticker: cls._flatten_columns(df) for ticker, df in data.items() if not df.empty}
+        if fields is None:
+            fields = list(next(iter(data.values())).columns) if data else []
+
+        zones = {str(df.index.tz) if df.index.tz is not None else None for df in data.values()}
+        if len(zones) > 1:
+            raise ValueError(f"Cannot store indexes in different timezones together: {sorted(map(str, zones))}")
+        tz = zones.pop() if zones else None
+
+        # Timestamps are kept as naive UTC; the timezone is restored on read
+        indexes = {ticker: cls._naive_utc(df.index) for ticker, df in data.items()}
+        index = pd.DatetimeIndex([])
+        for ticker_index in indexes.values():
+            index = ticker_index if index.empty else index.union(ticker_index)
+        index = index.sort_values()
+
+        tmp_dir = store_dir.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, cls.INDEX_FILE), index.as_unit('ns').asi8)
+
+        entries = {}
+        for ticker, df in data.items():
+            rows = index.get_indexer(indexes[ticker])
+            start, end = int(rows.min()), int(rows.max()) + 1
+            if not (np.diff(rows) > 0).all():
+                order = np.argsort(rows, kind='stable')
+                df, rows = df.iloc[order], rows[order]
+
+            name = cls._dir_name(ticker)
+            ticker_dir = os.path.join(tmp_dir, name)
+            os.makedirs(ticker_dir)
+            for field in fields:
+                values = df[field].to_numpy(dtype=np.float64) if field in df.columns else np.full(len(df), np.nan)
+                np.save(os.path.join(ticker_dir, f"{field}.npy"), values)
+
+            # Gaps inside the ticker's range: keep the rows it actually has
+            contiguous = len(rows) == end - start
+            if not contiguous:
+                np.save(os.path.join(ticker_dir, cls.POSITIONS_FILE), (rows - start).astype(np.int64))
+            entries[ticker] = {'dir': name, 'start': start, 'end': end, 'contiguous': contiguous}
+
+        with open(os.path.join(tmp_dir, cls.META_FILE), 'w') as f:
+            json.dump({'fields': fields, 'tz': tz, 'tickers': entries,
+                       'coverage': list(coverage) if coverage else None}, f, indent=2)
+
+        # Swap the finished store into place
+        if os.path.exists(store_dir):
+            old_dir = store_dir.rstrip(os.sep) + '.old'
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(store_dir, old_dir)
+            os.replace(tmp_dir, store_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, store_dir)
+        return cls(store_dir)
+
+    def covers(self, tickers, start_date, end_date):
+        """True if every ticker is stored for a request inside the recorded coverage"""
+        if self.coverage is None or any(ticker not in self._entries for ticker in tickers):
+            return False
+        start, end = (pd.Timestamp(date) for date in self.coverage)
+        return start <= pd.Timestamp(start_date) and pd.Timestamp(end_date) <= end
+
+    def __getitem__(self, ticker):
+        return self.frame(ticker)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def column(self, ticker, field):
+        """Memory-mapped read-only array of one field for a ticker"""
+        entry = self._entries[ticker]
+        return np.load(os.path.join(self.store_dir, entry['dir'], f"{field}.npy"), mmap_mode='r')
+
+    def frame(self, ticker, start_date=None, end_date=None, fields=None):
+        """
+        Price DataFrame of a ticker over [start_date, end_date)
+
+        Columns are views of the memory-mapped files; no price data is
+        copied or read until it is used.
+        """
+        if ticker not in self._entries:
+            raise KeyError(ticker)
+        entry = self._entries[ticker]
+        index = self.index[entry['start']:entry['end']]
+        if not entry['contiguous']:
+            positions = np.load(os.path.join(self.store_dir, entry['dir'], self.POSITIONS_FILE))
+            index = index[positions]
+
+        # Date bounds by binary search on the sorted index
+        lo = 0 if start_date is None else index.searchsorted(self._localize(start_date, index))
+        hi = len(index) if end_date is None else index.searchsorted(self._localize(end_date, index))
+
+        columns = {field: self.column(ticker, field)[lo:hi] for field in (fields or self.fields)}
+        return pd.DataFrame(columns, index=index[lo:hi], copy=False)
+
+    def select(self, tickers, start_date=None, end_date=None, fields=None):
+        """Dict of ticker -> zero-copy frame for the stored tickers among tickers"""
+        return {ticker: self.frame(ticker, start_date, end_date, fields)
+                for ticker in tickers if ticker in self._entries}
+
+    @staticmethod
+    def _dir_name(ticker):
+        return re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+
+    @staticmethod
+    def _flatten_columns(data):
+        """Drop the ticker level yfinance adds to single-ticker columns"""
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.copy()
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+    @staticmethod
+    def _naive_utc(index):
+        if index.tz is not None:
+            return index.tz_convert('UTC').tz_localize(None)
+        return index
+
+    @staticmethod
+    def _localize(date, index):
+        """Timestamp bound matching a timezone-aware index"""
+        timestamp = pd.Timestamp(date)
+        tz = getattr(index, 'tz', None)
+        if tz is not None and timestamp.tzinfo is None:
+            return timestamp.tz_localize(tz)
+        return timestamp
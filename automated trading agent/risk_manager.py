@@ -6,6 +6,12 @@ Implements position sizing, stop losses, and risk controls
 
 import pandas as pd
 import numpy as np
+from scipy import stats
+
+from compact import is_compact, compact_columns
+from covariance import covariance_matrix, correlation_from_covariance
+from panel import PricePanel
+from value_at_risk import rolling_var
 
 class RiskManager:
     """Comprehensive risk management system"""
@@ -14,20 +20,28 @@ class RiskManager:
         self.max_position_size = params.get('max_position_size', 1.0)
         self.stop_loss = params.get('stop_loss', 0.02)
         self.take_profit = params.get('take_profit', 0.05)
+        self.trail_pct = params.get('trailing_stop')  # None disables
         self.max_drawdown = params.get('max_drawdown', 0.20)
         self.max_correlation = params.get('max_correlation', 0.7)
         self.risk_per_trade = params.get('risk_per_trade', 0.02)
         
-    def apply_position_sizing(self, signals):
+    def apply_position_sizing(self, signals, prices=None, inplace=False):
         """
         Apply position sizing rules based on volatility and risk
         
         Uses Kelly Criterion and volatility-based sizing
+        
+        Args:
+            signals: DataFrame with a 'Signal' column
+            prices: Optional DataFrame to read 'Close' from when signals
+                does not carry the price columns
+            inplace: Add the sizing columns to signals instead of a copy
         """
-        df = signals.copy()
+        df = signals if inplace else signals.copy()
+        close = (signals if prices is None else prices)['Close']
         
         # Calculate volatility
-        df['Volatility'] = df['Close'].pct_change().rolling(20).std()
+        df['Volatility'] = close.pct_change().rolling(20).std()
         
         # Volatility-adjusted position sizing
         avg_vol = df['Volatility'].mean()
@@ -47,6 +61,9 @@ class RiskManager:
                 kelly_fraction = np.clip(kelly_fraction, 0, self.max_position_size)
                 df['Position_Size'] = df['Position_Size'] * kelly_fraction
         
+        # Compact (float32) prices keep the sizing columns float32 as well
+        if is_compact(close):
+            compact_columns(df, ['Volatility', 'Position_Size'])
         return df
     
     def apply_stop_loss(self, df, entry_price, position):
@@ -74,25 +91,72 @@ class RiskManager:
         current_dd = (portfolio_value - peak_value) / peak_value
         return current_dd < -self.max_drawdown
     
-    def calculate_var(self, returns, confidence=0.95):
-        """Calculate Value at Risk"""
+    def calculate_var(self, returns, confidence=0.95, window=None, method='historical'):
+        """
+        Calculate Value at Risk
+        
+        With a window, returns the rolling VaR Series instead of one value
+        over the whole history (see value_at_risk.rolling_var for methods).
+        """
+        if window is not None:
+            return rolling_var(returns, window, confidence, method)['VaR']
         return np.percentile(returns, (1 - confidence) * 100)
     
-    def calculate_position_correlation(self, positions_df):
-        """Calculate correlation between positions"""
-        return positions_df.corr()
+    def calculate_position_correlation(self, positions_df, method=None):
+        """
+        Calculate correlation between positions
+        
+        positions_df is a DataFrame of returns, or a PricePanel whose
+        aligned close-to-close returns are used without re-joining. With a
+        covariance method ('sample', 'ledoit_wolf', 'ewma' or 'factor'),
+        the correlation implied by that cached estimate over the rows where
+        every position has a return.
+        """
+        if isinstance(positions_df, PricePanel):
+            positions_df = positions_df.returns_frame()
+        if method is None:
+            return positions_df.corr()
+        cov = covariance_matrix(positions_df, method)
+        return pd.DataFrame(correlation_from_covariance(cov.to_numpy()), index=cov.index, columns=cov.columns)
     
     def diversification_check(self, new_position, existing_positions):
-        """Check if new position maintains diversification"""
+        """
+        Check if new position maintains diversification
+        
+        Args:
+            new_position: Dict with 'ticker' and 'returns'
+            existing_positions: Dict of ticker -> returns, or a
+                CorrelationScreen of the holdings (e.g. the one a
+                PortfolioRiskManager maintains)
+        """
         if len(existing_positions) == 0:
             return True
         
-        all_positions = existing_positions.copy()
-        all_positions[new_position['ticker']] = new_position['returns']
+        max_corr = self.screen_candidates({new_position['ticker']: new_position['returns']},
+                                          existing_positions, return_max=True).iloc[0]
+        return max_corr < self.max_correlation
+    
+    def screen_candidates(self, candidates, existing_positions, return_max=False):
+        """
+        Diversification check of many candidates at once
         
-        correlation_matrix = pd.DataFrame(all_positions).corr()
-        max_corr = correlation_matrix[new_position['ticker']].drop(new_position['ticker']).max()
+        Only each candidate's correlations against the holdings are
+        computed, never the holdings against each other.
         
+        Args:
+            candidates: Dict of ticker -> returns (or a DataFrame)
+            existing_positions: Dict of ticker -> returns, or a CorrelationScreen
+            return_max: Return each candidate's highest correlation
+                instead of whether it passes
+            
+        Returns:
+            Series indexed by candidate ticker
+        """
+        if not isinstance(existing_positions, CorrelationScreen):
+            existing_positions = CorrelationScreen(existing_positions)
+        max_corr = existing_positions.max_correlation(candidates)
+        if return_max:
+            return max_corr
         return max_corr < self.max_correlation
     
     def trailing_stop(self, df, entry_price, highest_price, position, trail_pct=0.05):
@@ -105,20 +169,192 @@ class RiskManager:
             return df['Close'] >= stop_price
         return False
 
+class StopTracker:
+    """
+    Stop-loss, take-profit and trailing-stop state of many positions
+    
+    Each slot holds one long position's stop and target prices and its
+    highest close since entry. update() advances every open slot by one
+    bar with a few vector operations, so the cost per bar is O(1) per
+    position regardless of how long positions have been open. Stops are
+    fractions as in RiskManager; None or 0 disables one.
+    """
+    
+    def __init__(self, n_positions, stop_loss=None, take_profit=None, trailing_stop=None):
+        self.stop_loss = stop_loss or 0.0
+        self.take_profit = take_profit or 0.0
+        self.trailing_stop = trailing_stop or 0.0
+        self.active = np.zeros(n_positions, dtype=bool)
+        self.stop_price = np.full(n_positions, -np.inf)
+        self.target_price = np.full(n_positions, np.inf)
+        self.high = np.full(n_positions, -np.inf)
+    
+    def open(self, slots, entry_prices):
+        """Start tracking positions entered at entry_prices"""
+        self.active[slots] = True
+        if self.stop_loss > 0:
+            self.stop_price[slots] = entry_prices * (1 - self.stop_loss)
+        if self.take_profit > 0:
+            self.target_price[slots] = entry_prices * (1 + self.take_profit)
+        self.high[slots] = entry_prices
+    
+    def close(self, slots):
+        """Stop tracking positions that were exited"""
+        self.active[slots] = False
+        self.stop_price[slots] = -np.inf
+        self.target_price[slots] = np.inf
+        self.high[slots] = -np.inf
+    
+    def update(self, prices):
+        """
+        Advance all open positions by one bar of closing prices
+        
+        Returns:
+            Boolean mask of the positions whose stop or target was hit;
+            they are closed in the tracker
+        """
+        np.fmax(self.high, np.where(self.active, prices, np.nan), out=self.high)
+        hit = (prices <= self.stop_price) | (prices >= self.target_price)
+        if self.trailing_stop > 0:
+            hit |= prices <= self.high * (1 - self.trailing_stop)
+        hit &= self.active
+        if hit.any():
+            self.close(hit)
+        return hit
+
+class CorrelationScreen:
+    """
+    Returns of held positions, kept aligned for correlation screening
+    
+    Holdings are columns of one zero-filled array with a validity mask on
+    a shared calendar, so adding or removing a position touches a single
+    column. A candidate's correlations against all n holdings come from
+    six vector-matrix products over the pairwise-complete bars (the same
+    values as DataFrame.corr), O(n * T) instead of the O(n^2 * T) of
+    correlating the whole book.
+    """
+    
+    def __init__(self, returns_dict=None):
+        frame = pd.DataFrame(returns_dict or {}, dtype=np.float64)
+        self.index = frame.index
+        self.slots = {ticker: slot for slot, ticker in enumerate(frame.columns)}
+        self._free = []
+        values = frame.to_numpy()
+        self._valid = (~np.isnan(values)).astype(np.float64)
+        self._values = np.where(np.isnan(values), 0.0, values)
+        self._squares = self._values ** 2
+    
+    def __len__(self):
+        return len(self.slots)
+    
+    def __contains__(self, ticker):
+        return ticker in self.slots
+    
+    def add(self, ticker, returns):
+        """Add (or replace) a holding's return series"""
+        if ticker in self.slots:
+            self.remove(ticker)
+        returns = pd.Series(returns, dtype=np.float64)
+        if not returns.index.difference(self.index).empty:
+            self._reindex(self.index.union(returns.index))
+        values = returns.reindex(self.index).to_numpy()
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        valid = ~np.isnan(values)
+        self._valid[:, slot] = valid
+        self._values[:, slot] = np.where(valid, values, 0.0)
+        self._squares[:, slot] = self._values[:, slot] ** 2
+        self.slots[ticker] = slot
+    
+    def remove(self, ticker):
+        """Drop a holding; its column is reused by the next add"""
+        slot = self.slots.pop(ticker)
+        self._valid[:, slot] = 0.0
+        self._values[:, slot] = 0.0
+        self._squares[:, slot] = 0.0
+        self._free.append(slot)
+    
+    def correlations(self, candidates):
+        """
+        Pearson correlation of each candidate with each holding
+        
+        Args:
+            candidates: Dict of ticker -> returns, DataFrame, or one Series
+            
+        Returns:
+            DataFrame (candidates x holdings); NaN where a pair shares
+            fewer than two bars or has no variance
+        """
+        frame = candidates.to_frame() if isinstance(candidates, pd.Series) else pd.DataFrame(candidates)
+        x = frame.reindex(self.index).to_numpy(dtype=np.float64)
+        valid = (~np.isnan(x)).astype(np.float64).T
+        x = np.where(np.isnan(x), 0.0, x).T
+        
+        count = valid @ self._valid
+        sum_x = x @ self._valid
+        sum_xx = (x ** 2) @ self._valid
+        sum_y = valid @ self._values
+        sum_yy = valid @ self._squares
+        sum_xy = x @ self._values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_xy - sum_x * sum_y / count
+            var_x = sum_xx - sum_x ** 2 / count
+            var_y = sum_yy - sum_y ** 2 / count
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+        corr[(count < 2) | ~(var_x > 0) | ~(var_y > 0)] = np.nan
+        
+        return pd.DataFrame(corr[:, list(self.slots.values())], index=frame.columns, columns=list(self.slots))
+    
+    def max_correlation(self, candidates):
+        """Each candidate's highest correlation with a holding other than itself"""
+        corr = self.correlations(candidates)
+        for ticker in corr.index.intersection(corr.columns):
+            corr.loc[ticker, ticker] = np.nan
+        return corr.max(axis=1)
+    
+    def _grow(self):
+        capacity = self._values.shape[1]
+        extra = max(capacity, 8)
+        rows = len(self.index)
+        self._valid = np.hstack([self._valid, np.zeros((rows, extra))])
+        self._values = np.hstack([self._values, np.zeros((rows, extra))])
+        self._squares = np.hstack([self._squares, np.zeros((rows, extra))])
+        self._free.extend(range(capacity + extra - 1, capacity - 1, -1))
+    
+    def _reindex(self, index):
+        rows = index.get_indexer(self.index)
+        for name in ['_valid', '_values', '_squares']:
+            old = getattr(self, name)
+            new = np.zeros((len(index), old.shape[1]))
+            new[rows] = old
+            setattr(self, name, new)
+        self.index = index
+
 class PortfolioRiskManager:
     """Portfolio-level risk management"""
     
     def __init__(self, max_portfolio_risk=0.15):
         self.max_portfolio_risk = max_portfolio_risk
         self.positions = {}
+        # Return histories of held positions for diversification screening
+        self.correlations = CorrelationScreen()
         
-    def add_position(self, ticker, size, entry_price):
-        """Add new position to portfolio"""
+    def add_position(self, ticker, size, entry_price, returns=None):
+        """Add new position to portfolio (with its returns, to screen later candidates)"""
         self.positions[ticker] = {
             'size': size,
             'entry_price': entry_price,
             'current_value': size * entry_price
         }
+        if returns is not None:
+            self.correlations.add(ticker, returns)
+    
+    def remove_position(self, ticker):
+        """Close a position"""
+        self.positions.pop(ticker, None)
+        if ticker in self.correlations:
+            self.correlations.remove(ticker)
     
     def update_position(self, ticker, current_price):
         """Update position value"""
@@ -126,9 +362,29 @@ class PortfolioRiskManager:
             size = self.positions[ticker]['size']
             self.positions[ticker]['current_value'] = size * current_price
     
-    def calculate_portfolio_var(self, returns_dict, confidence=0.95):
-        """Calculate portfolio-wide Value at Risk"""
-        portfolio_returns = pd.DataFrame(returns_dict).sum(axis=1)
+    def calculate_portfolio_var(self, returns_dict, confidence=0.95, window=None, method='historical',
+                                covariance=None):
+        """
+        Calculate portfolio-wide Value at Risk (rolling Series with a window)
+        
+        returns_dict maps ticker to returns, or is a PricePanel whose
+        aligned returns are used as they are. With a covariance method, the
+        Gaussian VaR of the summed positions from that cached covariance
+        estimate over the last window rows (all rows by default) instead.
+        """
+        if isinstance(returns_dict, PricePanel):
+            returns_df = returns_dict.returns_frame()
+        else:
+            returns_df = pd.DataFrame(returns_dict)
+        if covariance is not None:
+            if window is not None:
+                returns_df = returns_df.iloc[-window:]
+            cov = covariance_matrix(returns_df, covariance).to_numpy()
+            mean = returns_df.dropna().mean().sum()
+            return mean + stats.norm.ppf(1 - confidence) * np.sqrt(cov.sum())
+        portfolio_returns = returns_df.sum(axis=1)
+        if window is not None:
+            return rolling_var(portfolio_returns, window, confidence, method)['VaR']
         return np.percentile(portfolio_returns, (1 - confidence) * 100)
     
     def get_portfolio_exposure(self):
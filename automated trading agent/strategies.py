@@ -6,39 +6,74 @@ Contains various algorithmic trading strategies
 import pandas as pd
 import numpy as np
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import indicators
+from compact import is_compact, compact_columns
+from streaming import (MovingAverageCrossoverState, RSIState, MACDState,
+                       BollingerBandsState, MomentumState, CompositeState)
 
 class BaseStrategy(ABC):
     """Abstract base class for all trading strategies"""
     
+    # Indicator memo shared by all strategies; set to None to disable
+    indicator_cache = indicators.DEFAULT_CACHE
+    
     def __init__(self, params):
         self.params = params
         
     @abstractmethod
-    def generate_signals(self, data):
-        """Generate buy/sell signals"""
+    def generate_signals(self, data, narrow=False):
+        """
+        Generate buy/sell signals
+        
+        With narrow=True only the columns the strategy adds are returned
+        (indexed like data), instead of a full copy of data plus them.
+        """
         pass
     
+    def _output_frame(self, data, narrow):
+        """Frame the strategy writes its columns into"""
+        if narrow:
+            return pd.DataFrame(index=data.index)
+        return data.copy()
+    
+    def _finish(self, df, data, narrow):
+        """Keep compact (float32) input compact: float32 indicators, int8 signals"""
+        if is_compact(data):
+            compact_columns(df, df.columns if narrow else df.columns.difference(data.columns, sort=False))
+        return df
+    
     def calculate_positions(self, signals):
         """Convert signals to positions"""
         positions = signals.shift(1)  # Avoid look-ahead bias
         return positions
+    
+    def create_state(self):
+        """
+        Create an incremental state for bar-by-bar signals
+        
+        The state's update(bar) returns the same signal generate_signals
+        produces for that bar, in O(1) per bar.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no streaming mode")
 
 class MovingAverageCrossover(BaseStrategy):
     """Simple Moving Average Crossover Strategy"""
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """
         Generate signals based on SMA crossover
         Buy when short MA crosses above long MA
         Sell when short MA crosses below long MA
         """
-        df = data.copy()
+        df = self._output_frame(data, narrow)
         short_window = self.params.get('short', 50)
         long_window = self.params.get('long', 200)
         
         # Calculate moving averages
-        df['SMA_Short'] = df['Close'].rolling(window=short_window).mean()
-        df['SMA_Long'] = df['Close'].rolling(window=long_window).mean()
+        df['SMA_Short'] = indicators.sma(data['Close'], short_window, self.indicator_cache)
+        df['SMA_Long'] = indicators.sma(data['Close'], long_window, self.indicator_cache)
         
         # Generate signals
         df['Signal'] = 0
@@ -48,53 +83,57 @@ class MovingAverageCrossover(BaseStrategy):
         # Identify crossover points
         df['Crossover'] = df['Signal'].diff()
         
-        return df
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Running-sum SMAs updated one bar at a time"""
+        return MovingAverageCrossoverState(self.params)
 
 class RSIStrategy(BaseStrategy):
     """Relative Strength Index Strategy"""
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """
         Generate signals based on RSI
         Buy when RSI < oversold threshold
         Sell when RSI > overbought threshold
         """
-        df = data.copy()
+        df = self._output_frame(data, narrow)
         period = self.params.get('period', 14)
         oversold = self.params.get('oversold', 30)
         overbought = self.params.get('overbought', 70)
         
         # Calculate RSI
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        df['RSI'] = indicators.rsi(data['Close'], period, self.indicator_cache)
         
         # Generate signals
         df['Signal'] = 0
         df.loc[df['RSI'] < oversold, 'Signal'] = 1  # Oversold - Buy
         df.loc[df['RSI'] > overbought, 'Signal'] = -1  # Overbought - Sell
         
-        return df
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Rolling gain/loss averages updated one bar at a time"""
+        return RSIState(self.params)
 
 class MACDStrategy(BaseStrategy):
     """Moving Average Convergence Divergence Strategy"""
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """
         Generate signals based on MACD crossover
         """
-        df = data.copy()
+        df = self._output_frame(data, narrow)
         fast = self.params.get('fast', 12)
         slow = self.params.get('slow', 26)
         signal = self.params.get('signal', 9)
         
         # Calculate MACD
-        ema_fast = df['Close'].ewm(span=fast, adjust=False).mean()
-        ema_slow = df['Close'].ewm(span=slow, adjust=False).mean()
+        ema_fast = indicators.ema(data['Close'], fast, self.indicator_cache)
+        ema_slow = indicators.ema(data['Close'], slow, self.indicator_cache)
         df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=signal, adjust=False).mean()
+        df['Signal_Line'] = indicators.ema(df['MACD'], signal, self.indicator_cache)
         df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
         
         # Generate signals
@@ -102,68 +141,143 @@ class MACDStrategy(BaseStrategy):
         df.loc[df['MACD'] > df['Signal_Line'], 'Signal'] = 1  # Buy
         df.loc[df['MACD'] < df['Signal_Line'], 'Signal'] = -1  # Sell
         
-        return df
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Recursive EMAs updated one bar at a time"""
+        return MACDState(self.params)
 
 class BollingerBandsStrategy(BaseStrategy):
     """Bollinger Bands Mean Reversion Strategy"""
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """Generate signals based on Bollinger Bands"""
-        df = data.copy()
+        df = self._output_frame(data, narrow)
         period = self.params.get('period', 20)
         std_dev = self.params.get('std_dev', 2)
         
         # Calculate Bollinger Bands
-        df['BB_Middle'] = df['Close'].rolling(window=period).mean()
-        df['BB_Std'] = df['Close'].rolling(window=period).std()
+        df['BB_Middle'] = indicators.sma(data['Close'], period, self.indicator_cache)
+        df['BB_Std'] = indicators.rolling_std(data['Close'], period, self.indicator_cache)
         df['BB_Upper'] = df['BB_Middle'] + (std_dev * df['BB_Std'])
         df['BB_Lower'] = df['BB_Middle'] - (std_dev * df['BB_Std'])
         
         # Generate signals
         df['Signal'] = 0
-        df.loc[df['Close'] < df['BB_Lower'], 'Signal'] = 1  # Buy at lower band
-        df.loc[df['Close'] > df['BB_Upper'], 'Signal'] = -1  # Sell at upper band
+        df.loc[data['Close'] < df['BB_Lower'], 'Signal'] = 1  # Buy at lower band
+        df.loc[data['Close'] > df['BB_Upper'], 'Signal'] = -1  # Sell at upper band
         
-        return df
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Running mean/std bands updated one bar at a time"""
+        return BollingerBandsState(self.params)
 
 class MomentumStrategy(BaseStrategy):
     """Price Momentum Strategy"""
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """Generate signals based on price momentum"""
-        df = data.copy()
+        df = self._output_frame(data, narrow)
         lookback = self.params.get('lookback', 20)
         threshold = self.params.get('threshold', 0.02)
         
         # Calculate momentum
-        df['Momentum'] = df['Close'].pct_change(periods=lookback)
+        df['Momentum'] = indicators.momentum(data['Close'], lookback, self.indicator_cache)
         
         # Generate signals
         df['Signal'] = 0
         df.loc[df['Momentum'] > threshold, 'Signal'] = 1  # Strong upward momentum
         df.loc[df['Momentum'] < -threshold, 'Signal'] = -1  # Strong downward momentum
         
-        return df
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Ring buffer of the last lookback closes"""
+        return MomentumState(self.params)
 
 class CompositeStrategy(BaseStrategy):
     """Combination of multiple strategies"""
     
-    def __init__(self, strategies_list):
+    def __init__(self, strategies_list, weights=None, buy_threshold=0.3, sell_threshold=None, workers=1):
+        """
+        Args:
+            strategies_list: Child strategies whose signals are combined
+            weights: Optional vote weight per child, summing to a positive value (default: equal)
+            buy_threshold: Weighted vote above which the signal is 1
+            sell_threshold: Weighted vote below which the signal is -1
+                (default: -buy_threshold)
+            workers: Threads used to evaluate the children concurrently
+        """
         self.strategies = strategies_list
+        self.weights = np.ones(len(strategies_list)) if weights is None else np.asarray(weights, dtype=np.float64)
+        if len(self.weights) != len(strategies_list):
+            raise ValueError("Need one weight per child strategy")
+        if not self.weights.sum() > 0:
+            raise ValueError("Composite weights must sum to a positive value")
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = -buy_threshold if sell_threshold is None else sell_threshold
+        self.workers = workers
+        self.params = {'weights': list(self.weights), 'buy_threshold': self.buy_threshold,
+                       'sell_threshold': self.sell_threshold, 'workers': workers}
         
-    def generate_signals(self, data):
+    def generate_signals(self, data, narrow=False):
         """Combine signals from multiple strategies"""
-        df = data.copy()
+        df = self._output_frame(data, narrow)
+        
+        # One row of votes per child; the children only fill their own row
+        votes = np.empty((len(self.strategies), len(data)))
         
-        all_signals = []
-        for strategy in self.strategies:
-            signals = strategy.generate_signals(data)
-            all_signals.append(signals['Signal'])
+        def evaluate(i):
+            # Only the children's Signal column is needed
+            signals = self.strategies[i].generate_signals(data, narrow=True)
+            votes[i] = signals['Signal'].to_numpy(dtype=np.float64)
         
-        # Average the signals
-        df['Signal'] = pd.concat(all_signals, axis=1).mean(axis=1)
+        if self.workers > 1 and len(self.strategies) > 1:
+            # Indicator work runs in NumPy/pandas, which releases the GIL
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(evaluate, range(len(self.strategies))))
+        else:
+            for i in range(len(self.strategies)):
+                evaluate(i)
         
-        # Convert to discrete signals
-        df['Signal'] = df['Signal'].apply(lambda x: 1 if x > 0.3 else (-1 if x < -0.3 else 0))
+        # Weighted average of the votes, then discretize
+        combined = (self.weights @ votes) / self.weights.sum()
+        df['Signal'] = np.where(combined > self.buy_threshold, 1,
+                                np.where(combined < self.sell_threshold, -1, 0))
         
-        return df
\ No newline at end of file
+        return self._finish(df, data, narrow)
+    
+    def create_state(self):
+        """Each child's streaming state, combined by the same weighted vote"""
+        return CompositeState(self.params, [child.create_state() for child in self.strategies])
+
+def create_strategy(strategy_name, params):
+    """
+    Instantiate a strategy from its config name (case-insensitive)
+    
+    Returns None for unknown names.
+    """
+    strat_name_upper = strategy_name.upper()
+    if strat_name_upper in ["SMA_CROSSOVER", "SMA"]:
+        return MovingAverageCrossover(params)
+    elif strat_name_upper == "RSI":
+        return RSIStrategy(params)
+    elif strat_name_upper == "MACD":
+        return MACDStrategy(params)
+    elif strat_name_upper in ["BOLLINGER", "BOLLINGER_BANDS"]:
+        return BollingerBandsStrategy(params)
+    elif strat_name_upper == "MOMENTUM":
+        return MomentumStrategy(params)
+    elif strat_name_upper == "COMPOSITE":
+        # params: {'strategies': [{'name': ..., 'params': {...}}, ...], plus
+        # optional weights, buy_threshold, sell_threshold and workers}
+        children = [create_strategy(child['name'], child.get('params', {}))
+                    for child in params.get('strategies', [])]
+        if not children or any(child is None for child in children):
+            return None
+        return CompositeStrategy(children, weights=params.get('weights'),
+                                 buy_threshold=params.get('buy_threshold', 0.3),
+                                 sell_threshold=params.get('sell_threshold'),
+                                 workers=params.get('workers', 1))
+    return None
@@ -0,0 +1,319 @@
+"""
+Streaming Strategy State
+Incremental bar-by-bar versions of the batch strategies
+"""
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+
+NAN = float('nan')
+
+def _divide(numerator, denominator):
+    """Float division with pandas semantics for a zero denominator"""
+    if denominator == 0:
+        if numerator == 0 or numerator != numerator:
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+def _close(bar):
+    """Closing price from a bare number or a mapping/Series with 'Close'"""
+    if isinstance(bar, (int, float, np.number)):
+        return float(bar)
+    return float(bar['Close'])
+
+class RollingWindow:
+    """
+    Fixed-length window with O(1) running mean and standard deviation
+
+    Uses the same Kahan-compensated sum and Welford updates as pandas'
+    rolling mean/std, so streaming values track the batch indicators.
+    NaN values occupy a slot but are not counted, and the statistics are
+    NaN until the window holds `size` valid values.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.nobs = 0
+        # Running sum for the mean
+        self._sum = 0.0
+        self._add_comp = 0.0
+        self._remove_comp = 0.0
+        self._neg_ct = 0
+        self._same_ct = 0
+        self._prev = NAN
+        # Welford state for the variance
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._var_add_comp = 0.0
+        self._var_remove_comp = 0.0
+
+    def update(self, value):
+        """Push a value, dropping the oldest once the window is full"""
+        if len(self.values) == self.size:
+            self._remove(self.values.popleft())
+        self.values.append(value)
+        self._add(value)
+
+    @property
+    def mean(self):
+        if self.nobs < self.size or self.nobs == 0:
+            return NAN
+        result = self._sum / self.nobs
+        if self._same_ct >= self.nobs:
+            # Window holds one repeated value: avoid summation artifacts
+            result = self._prev
+        elif self._neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self._neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1)"""
+        if self.nobs < self.size or self.nobs <= 1:
+            return NAN
+        variance = self._ssqdm / (self.nobs - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+
+        y = value - self._add_comp
+        t = self._sum + y
+        self._add_comp = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_ct += 1
+        self._same_ct = self._same_ct + 1 if value == self._prev else 1
+        self._prev = value
+
+        prev_mean = self._mean - self._var_add_comp
+        y = value - self._var_add_comp
+        t = y - self._mean
+        self._var_add_comp = t + self._mean - y
+        self._mean = self._mean + t / self.nobs
+        self._ssqdm = self._ssqdm + (value - prev_mean) * (value - self._mean)
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+
+        y = -value - self._remove_comp
+        t = self._sum + y
+        self._remove_comp = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_ct -= 1
+
+        if self.nobs:
+            prev_mean = self._mean - self._var_remove_comp
+            y = value - self._var_remove_comp
+            t = y - self._mean
+            self._var_remove_comp = t + self._mean - y
+            self._mean = self._mean - t / self.nobs
+            self._ssqdm = self._ssqdm - (value - prev_mean) * (value - self._mean)
+        else:
+            self._mean = 0.0
+            self._ssqdm = 0.0
+
+class EWMA:
+    """
+    Recursive exponential moving average, equivalent to
+    Series.ewm(span=span, adjust=False).mean()
+
+    As with pandas' default ignore_na=False, a NaN input keeps the average
+    but decays its weight, so the next value counts for more after a gap.
+    """
+
+    def __init__(self, span):
+        alpha = 1. / (1. + (span - 1) / 2.0)
+        self._old_wt_factor = 1. - alpha
+        self._new_wt = alpha
+        self._old_wt = 1.
+        self.value = NAN
+
+    def update(self, value):
+        if self.value == self.value:
+            self._old_wt *= self._old_wt_factor
+            if value == value:
+                if self.value != value:
+                    old_wt = self._old_wt
+                    self.value = (old_wt * self.value + self._new_wt * value) / (old_wt + self._new_wt)
+                self._old_wt = 1.
+        elif value == value:
+            self.value = value
+        return self.value
+
+class StreamingState(ABC):
+    """
+    Incremental state of a strategy
+
+    Feed bars in order with update(); each call does O(1) work and returns
+    the signal the batch strategy would produce for that bar.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.signal = 0
+
+    def update(self, bar):
+        """Consume the next bar (a price or a mapping with 'Close') and return its signal"""
+        self.signal = self._next_signal(_close(bar))
+        return self.signal
+
+    @abstractmethod
+    def _next_signal(self, close):
+        pass
+
+class MovingAverageCrossoverState(StreamingState):
+    """Streaming SMA crossover"""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self._short = RollingWindow(params.get('short', 50))
+        self._long = RollingWindow(params.get('long', 200))
+        self.sma_short = NAN
+        self.sma_long = NAN
+
+    def _next_signal(self, close):
+        self._short.update(close)
+        self._long.update(close)
+        self.sma_short = self._short.mean
+        self.sma_long = self._long.mean
+
+        if self.sma_short > self.sma_long:
+            return 1
+        if self.sma_short < self.sma_long:
+            return -1
+        return 0
+
+class RSIState(StreamingState):
+    """Streaming RSI over rolling mean gains and losses"""
+
+    def __init__(self, params):
+        super().__init__(params)
+        period = params.get('period', 14)
+        self.oversold = params.get('oversold', 30)
+        self.overbought = params.get('overbought', 70)
+        self._gains = RollingWindow(period)
+        self._losses = RollingWindow(period)
+        self._prev_close = NAN
+        self.rsi = NAN
+
+    def _next_signal(self, close):
+        delta = close - self._prev_close
+        self._prev_close = close
+
+        # Same values as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0)
+        self._gains.update(delta if delta > 0 else 0.0)
+        self._losses.update(-(delta if delta < 0 else 0.0))
+
+        rs = _divide(self._gains.mean, self._losses.mean)
+        self.rsi = 100 - (100 / (1 + rs))
+
+        if self.rsi > self.overbought:
+            return -1
+        if self.rsi < self.oversold:
+            return 1
+        return 0
+
+class MACDState(StreamingState):
+    """Streaming MACD with recursive EMAs"""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self._fast = EWMA(params.get('fast', 12))
+        self._slow = EWMA(params.get('slow', 26))
+        self._signal_line = EWMA(params.get('signal', 9))
+        self.macd = NAN
+        self.signal_line = NAN
+
+    def _next_signal(self, close):
+        self.macd = self._fast.update(close) - self._slow.update(close)
+        self.signal_line = self._signal_line.update(self.macd)
+
+        if self.macd > self.signal_line:
+            return 1
+        if self.macd < self.signal_line:
+            return -1
+        return 0
+
+class BollingerBandsState(StreamingState):
+    """Streaming Bollinger Bands"""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.std_dev = params.get('std_dev', 2)
+        self._window = RollingWindow(params.get('period', 20))
+        self.upper = NAN
+        self.lower = NAN
+
+    def _next_signal(self, close):
+        self._window.update(close)
+        middle, std = self._window.mean, self._window.std
+        self.upper = middle + (self.std_dev * std)
+        self.lower = middle - (self.std_dev * std)
+
+        if close > self.upper:
+            return -1
+        if close < self.lower:
+            return 1
+        return 0
+
+class MomentumState(StreamingState):
+    """Streaming rate-of-change momentum"""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.threshold = params.get('threshold', 0.02)
+        self._closes = deque(maxlen=params.get('lookback', 20) + 1)
+        self.momentum = NAN
+
+    def _next_signal(self, close):
+        self._closes.append(close)
+        if len(self._closes) == self._closes.maxlen:
+            self.momentum = _divide(close, self._closes[0]) - 1
+        else:
+            self.momentum = NAN
+
+        if self.momentum < -self.threshold:
+            return -1
+        if self.momentum > self.threshold:
+            return 1
+        return 0
+
+class CompositeState(StreamingState):
+    """Streaming weighted vote of child strategy states"""
+
+    def __init__(self, params, children):
+        """
+        Args:
+            params: The composite's params (weights and thresholds)
+            children: One streaming state per child strategy
+        """
+        super().__init__(params)
+        self.children = children
+        self._weights = np.asarray(params['weights'], dtype=np.float64)
+        self._total = self._weights.sum()
+        self._votes = np.empty(len(children))
+        self.combined = NAN
+
+    def _next_signal(self, close):
+        for i, child in enumerate(self.children):
+            self._votes[i] = child.update(close)
+        self.combined = (self._weights @ self._votes) / self._total
+
+        if self.combined > self.params['buy_threshold']:
+            return 1
+        if self.combined < self.params['sell_threshold']:
+            return -1
+        return 0
@@ -0,0 +1,176 @@
+"""
+Concurrent fetching against a local stand-in server with injected latency and errors
+"""
+
+import asyncio
+import io
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from async_fetcher import RequestLimiter, TokenBucket, run_sync
+from benchmarks import synthetic_prices
+from data_fetcher import DataFetcher
+
+PRICES = synthetic_prices(300, seed=5)
+START, END = str(PRICES.index[20].date()), str(PRICES.index[250].date())
+
+class StandIn:
+    """Serves <ticker>.csv for a date range; scripted failures and delays per ticker"""
+
+    def __init__(self):
+        self.latency = 0.0
+        self.failures = {}   # ticker -> number of 500 responses before succeeding
+        self.stalls = set()  # tickers that never answer in time
+        self.hits = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        ticker = url.path.strip('/').rsplit('.', 1)[0]
+        query = parse_qs(url.query)
+        with self.lock:
+            self.hits[ticker] = self.hits.get(ticker, 0) + 1
+            failing = self.failures.get(ticker, 0) >= self.hits[ticker]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(1.0 if ticker in self.stalls else self.latency)
+            if failing:
+                handler.send_error(500)
+                return
+            frame = PRICES.loc[query['start'][0]:query['end'][0]].iloc[:-1]
+            body = frame.to_csv().encode()
+            handler.send_response(200)
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+class HTTPCSVProvider:
+    """Blocking provider: one HTTP request per ticker"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def __call__(self, tickers, start_date, end_date):
+        frames = {}
+        for ticker in tickers:
+            url = f"{self.base_url}/{ticker}.csv?start={start_date}&end={end_date}"
+            with urllib.request.urlopen(url, timeout=10) as response:
+                frames[ticker] = pd.read_csv(io.BytesIO(response.read()), index_col=0, parse_dates=True)
+        return pd.concat(frames, axis=1)
+
+@pytest.fixture
+def server():
+    stand_in = StandIn()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            stand_in.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    stand_in.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield stand_in
+    httpd.shutdown()
+    httpd.server_close()
+
+def _fetcher(server, **limits):
+    limits.setdefault('backoff', 0.01)
+    return DataFetcher(batch_size=1, provider=HTTPCSVProvider(server.url), limiter=RequestLimiter(**limits))
+
+TICKERS = [f"T{i}" for i in range(8)]
+
+def test_transient_errors_are_retried(server):
+    server.failures = {'T1': 1, 'T4': 2}
+    data, failures = _fetcher(server, retries=2).fetch_many_concurrent(TICKERS, START, END)
+    assert failures == {} and sorted(data) == TICKERS
+    assert server.hits['T1'] == 2 and server.hits['T4'] == 3 and server.hits['T0'] == 1
+    expected = PRICES.loc[START:END].iloc[:-1]
+    pd.testing.assert_frame_equal(data['T4'], expected, check_freq=False, check_names=False)
+
+def test_persistent_errors_fail_after_retries(server):
+    server.failures = {'T2': 100}
+    data, failures = _fetcher(server, retries=2).fetch_many_concurrent(TICKERS, START, END)
+    assert list(failures) == ['T2'] and 'T2' not in data and len(data) == 7
+    assert server.hits['T2'] == 3
+
+def test_concurrency_is_bounded(server):
+    server.latency = 0.1
+    began = time.perf_counter()
+    data, _ = _fetcher(server, max_concurrency=3).fetch_many_concurrent(TICKERS, START, END)
+    elapsed = time.perf_counter() - began
+    assert len(data) == 8
+    assert server.max_in_flight == 3
+    # Three waves of 0.1s instead of eight serial requests
+    assert elapsed < 0.7
+
+def test_timeout_fails_only_the_stalled_request(server):
+    server.stalls = {'T3'}
+    data, failures = _fetcher(server, timeout=0.3, retries=1).fetch_many_concurrent(TICKERS, START, END)
+    assert failures == {'T3': 'request timed out'}
+    assert len(data) == 7
+
+def test_rate_limit(server):
+    began = time.perf_counter()
+    data, _ = _fetcher(server, rate_limit=20, burst=1).fetch_many_concurrent(TICKERS, START, END)
+    # The first request starts at once, the other seven 1/20 s apart
+    assert time.perf_counter() - began >= 7 / 20 - 0.02
+    assert len(data) == 8
+
+def test_single_ticker_and_cache(server, tmp_path):
+    fetcher = DataFetcher(cache_dir=str(tmp_path), provider=HTTPCSVProvider(server.url),
+                          limiter=RequestLimiter(backoff=0.01))
+    df = fetcher.fetch_stock_data_concurrent('T0', START, END)
+    assert len(df) == 230
+    # Covered by the cache: no second request
+    pd.testing.assert_frame_equal(fetcher.fetch_stock_data_concurrent('T0', START, END), df)
+    assert server.hits == {'T0': 1}
+
+def test_run_sync_inside_running_loop(server):
+    fetcher = _fetcher(server)
+
+    async def caller():
+        return fetcher.fetch_many_concurrent(['T0'], START, END)
+    data, failures = asyncio.run(caller())
+    assert list(data) == ['T0'] and failures == {}
+
+def test_async_provider_is_awaited():
+    calls = []
+
+    class AsyncProvider:
+        async def download_async(self, tickers, start_date, end_date):
+            calls.append(tuple(tickers))
+            await asyncio.sleep(0)
+            return pd.concat({tickers[0]: PRICES.iloc[:10]}, axis=1)
+
+    fetcher = DataFetcher(batch_size=1, provider=AsyncProvider())
+    data, failures = run_sync(fetcher.fetch_many_async(['A', 'B'], START, END))
+    assert sorted(calls) == [('A',), ('B',)] and sorted(data) == ['A', 'B']
+
+def test_token_bucket_reservations():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+def test_backoff_doubles_up_to_cap():
+    limiter = RequestLimiter(backoff=0.5, max_backoff=3.0, jitter=0)
+    assert [limiter.delay(i) for i in range(4)] == [0.5, 1.0, 2.0, 3.0]
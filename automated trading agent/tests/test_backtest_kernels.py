@@ -0,0 +1,104 @@
+"""
+Parity of the backtest engines: compiled kernel, NumPy event jumps and legacy loop
+"""
+
+import importlib.util
+
+import numpy as np
+import pytest
+
+from backtester import Backtester, _simulate_bars
+from benchmarks import synthetic_prices
+
+def _inputs(seed, n=3000):
+    rng = np.random.default_rng(seed)
+    close = synthetic_prices(n, seed=seed)['Close'].to_numpy()
+    signal = rng.choice([-1.0, 0.0, 1.0, np.nan], size=n, p=[0.2, 0.2, 0.5, 0.1])
+    return close, signal
+
+CAPITAL_AND_FEES = [(10000, 1.0), (10000.0, 0.0), (150, 5.0), (50, 1.0)]
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('capital, fee', CAPITAL_AND_FEES)
+def test_python_kernel_matches_numpy(seed, capital, fee):
+    close, signal = _inputs(seed)
+    expected = Backtester(capital, fee, engine='array')._simulate(close, signal)
+    actual = _simulate_bars(close, signal, float(capital), float(fee))
+    for a, b in zip(actual, expected):
+        np.testing.assert_array_equal(a, b)
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('capital, fee', CAPITAL_AND_FEES)
+def test_numba_kernel_matches_numpy(seed, capital, fee):
+    pytest.importorskip('numba')
+    from backtester import _simulate_jit
+
+    close, signal = _inputs(seed)
+    expected = Backtester(capital, fee, engine='array')._simulate(close, signal)
+    actual = _simulate_jit(close, signal, float(capital), float(fee))
+    for a, b in zip(actual, expected):
+        np.testing.assert_array_equal(a, b)
+
+def test_engine_validation():
+    with pytest.raises(ValueError):
+        Backtester(engine='fortran')
+
+STOPS = [(0.02, None, None), (None, 0.05, None), (None, None, 0.03), (0.1, 0.05, 0.2)]
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('stop_loss, take_profit, trailing_stop', STOPS)
+def test_stop_exits_match_across_engines(seed, stop_loss, take_profit, trailing_stop):
+    close, _ = _inputs(seed)
+    # Mostly-long signals so positions stay open long enough to be stopped
+    signal = np.random.default_rng(seed).choice([-1.0, 0.0, 1.0, np.nan], size=len(close),
+                                                 p=[0.02, 0.05, 0.88, 0.05])
+    backtester = Backtester(engine='array', stop_loss=stop_loss, take_profit=take_profit,
+                            trailing_stop=trailing_stop)
+    expected = backtester._simulate(close, signal)
+    args = (close, signal, 10000.0, 1.0, float(stop_loss or 0), float(take_profit or 0), float(trailing_stop or 0))
+
+    kernels = [_simulate_bars]
+    if importlib.util.find_spec('numba') is not None:
+        from backtester import _simulate_jit
+        kernels.append(_simulate_jit)
+    for kernel in kernels:
+        for a, b in zip(kernel(*args), expected):
+            np.testing.assert_array_equal(a, b)
+
+    # Stops close positions the plain signal would have kept open
+    plain = Backtester(engine='array')._simulate(close, signal)
+    assert np.count_nonzero(expected[2]) > np.count_nonzero(plain[2])
+
+def test_stop_loss_exit_and_rearm():
+    close = np.array([100.0, 100.0, 97.0, 99.0, 101.0, 102.0])
+    signal = np.array([1.0, 1.0, 1.0, 1.0, np.nan, 1.0])
+    numpy_engine = Backtester(1001, 1.0, engine='array', stop_loss=0.02)._simulate(close, signal)
+    python_kernel = _simulate_bars(close, signal, 1001.0, 1.0, 0.02, 0.0, 0.0)
+    for cash, shares, costs in [numpy_engine, python_kernel]:
+        # Bought at 100, stopped at 97, blocked while the signal stays 1, re-enters after the NaN bar
+        np.testing.assert_array_equal(shares, [10, 10, 0, 0, 0, 9])
+        np.testing.assert_array_equal(costs > 0, [True, False, True, False, False, True])
+        assert cash[2] == 1001 - 1000 - 1 + 970 - 1
+
+def test_loop_engine_rejects_stops():
+    with pytest.raises(ValueError):
+        Backtester(engine='loop', stop_loss=0.02)
+
+@pytest.mark.parametrize('bad', [0.0, -5.0, np.nan, np.inf])
+@pytest.mark.parametrize('stop_loss, take_profit, trailing_stop', STOPS)
+def test_bad_closes_with_stops_match_across_engines(bad, stop_loss, take_profit, trailing_stop):
+    close = _inputs(0, n=400)[0].copy()
+    close[np.random.default_rng(1).choice(len(close), size=40, replace=False)] = bad
+    signal = np.random.default_rng(0).choice([-1.0, 0.0, 1.0, np.nan], size=len(close),
+                                             p=[0.02, 0.05, 0.88, 0.05])
+    args = (close, signal, 10000.0, 1.0, float(stop_loss or 0), float(take_profit or 0), float(trailing_stop or 0))
+    with np.errstate(all='ignore'):
+        expected = Backtester(engine='array', stop_loss=stop_loss, take_profit=take_profit,
+                              trailing_stop=trailing_stop)._simulate(close, signal)
+        kernels = [_simulate_bars]
+        if importlib.util.find_spec('numba') is not None:
+            from backtester import _simulate_jit
+            kernels.append(_simulate_jit)
+        for kernel in kernels:
+            for a, b in zip(kernel(*args), expected):
+                np.testing.assert_array_equal(a, b)
@@ -0,0 +1,50 @@
+"""
+Synthetic data generators and the benchmark report format
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import (STOP_ENGINES, synthetic_prices, synthetic_universe, run_benchmarks, compare,
+                        stop_overhead)
+
+def test_synthetic_prices_are_seeded():
+    first = synthetic_prices(500, seed=3)
+    pd.testing.assert_frame_equal(first, synthetic_prices(500, seed=3))
+    assert not first['Close'].equals(synthetic_prices(500, seed=4)['Close'])
+
+    # A ticker's series does not depend on the size of the universe
+    universe = dict(synthetic_universe(3, 500, seed=3))
+    pd.testing.assert_frame_equal(universe['SYN0000'], first)
+
+def test_synthetic_bars_are_consistent():
+    data = synthetic_prices(1000, freq='minute', seed=1)
+    assert data.index.is_monotonic_increasing
+    assert (data['High'] >= data[['Open', 'Close']].max(axis=1)).all()
+    assert (data['Low'] <= data[['Open', 'Close']].min(axis=1)).all()
+    assert data.index[390] - data.index[389] > pd.Timedelta(hours=1)
+
+def test_report_is_json_and_comparable():
+    report = run_benchmarks([('daily', 300, 2)], strategies=['sma', 'rsi'], repeat=1)
+    report = json.loads(json.dumps(report))
+
+    assert len(report['results']) == 2 * 3
+    for record in report['results']:
+        assert record['tickers'] == 2 and record['seconds'] > 0 and record['peak_mb'] > 0
+
+    table = compare(report, report)
+    assert len(table) == 6
+    assert np.allclose(table['ratio'], 1.0) and not table['regression'].any()
+
+def test_stop_scenarios_per_engine():
+    report = run_benchmarks([('daily', 300, 1)], strategies=['sma'], repeat=1, stops=True)
+    stages = {record['stage'] for record in report['results']}
+    for engine in STOP_ENGINES:
+        assert {f"backtest_{engine}_stops_off", f"backtest_{engine}_stops_on"} <= stages
+
+    overhead = stop_overhead(json.loads(json.dumps(report)))
+    assert list(overhead['engine']) == list(STOP_ENGINES)
+    assert (overhead['ratio'] > 0).all()
+    assert stop_overhead(run_benchmarks([('daily', 300, 1)], strategies=['sma'], repeat=1)).empty
@@ -0,0 +1,97 @@
+"""
+Compact dtypes through signals, sizing and backtest, within the documented tolerances
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from benchmarks import synthetic_prices
+from compact import compact_prices
+from panel import PricePanel
+from performance_metrics import PerformanceAnalyzer
+from risk_manager import RiskManager
+from strategies import create_strategy
+
+STRATEGIES = [
+    ('SMA', {'short': 20, 'long': 50}),
+    ('RSI', {'period': 14}),
+    ('MACD', {}),
+    ('BOLLINGER', {'period': 20}),
+    ('MOMENTUM', {'lookback': 20}),
+    ('COMPOSITE', {'strategies': [{'name': 'SMA', 'params': {'short': 20, 'long': 50}},
+                                  {'name': 'RSI'}, {'name': 'MACD'}]}),
+]
+
+@pytest.fixture
+def prices():
+    return synthetic_prices(5000, seed=11)
+
+def test_compact_prices(prices):
+    compact = compact_prices(prices)
+    assert (compact[['Open', 'High', 'Low', 'Close']].dtypes == np.float32).all()
+    assert compact['Volume'].dtype == np.int32
+    assert compact.memory_usage(index=False).sum() * 2 == prices.memory_usage(index=False).sum()
+    np.testing.assert_allclose(compact['Close'], prices['Close'], rtol=2**-24)
+
+    big = prices.assign(Volume=prices['Volume'] * 10**6)
+    assert compact_prices(big)['Volume'].dtype == np.int64
+    gappy = prices.assign(Volume=prices['Volume'].where(prices.index != prices.index[3]))
+    assert compact_prices(gappy)['Volume'].dtype == np.float32
+
+@pytest.mark.parametrize('name, params', STRATEGIES)
+@pytest.mark.parametrize('narrow', [False, True])
+def test_signals_stay_compact(prices, name, params, narrow):
+    compact = compact_prices(prices)
+    expected = create_strategy(name, params).generate_signals(prices, narrow=narrow)
+    signals = create_strategy(name, params).generate_signals(compact, narrow=narrow)
+
+    assert signals['Signal'].dtype == np.int8
+    assert list(signals.columns) == list(expected.columns)
+    for column in signals.columns:
+        if column == 'Signal' or column in prices.columns:
+            continue
+        assert signals[column].dtype == np.float32
+        # Differences of prices err by ~1e-7 of the price level, not of their own value
+        scale = np.nanmax(np.abs(expected[column]))
+        np.testing.assert_allclose(signals[column], expected[column], rtol=1e-6, atol=5e-6 * scale)
+    if not narrow:
+        pd.testing.assert_frame_equal(signals[compact.columns], compact)
+
+    # Signals can only flip where the float64 inputs were within rounding of a tie
+    assert (signals['Signal'] != expected['Signal']).mean() < 1e-3
+
+def test_sizing_and_backtest_stay_compact(prices):
+    compact = compact_prices(prices)
+    strategy = create_strategy('SMA', {'short': 20, 'long': 50})
+    risk = RiskManager({'max_position_size': 0.5})
+
+    signals = risk.apply_position_sizing(strategy.generate_signals(compact))
+    assert signals['Position_Size'].dtype == np.float32 and signals['Volatility'].dtype == np.float32
+    results = Backtester(initial_capital=100000).run(compact, signals)
+    assert results['Shares'].dtype == np.int32 and results['Position'].dtype == np.int8
+    assert results['Cash'].dtype == results['Total_Equity'].dtype == np.float64
+    assert results['Drawdown'].dtype == np.float32 and results['Close'].dtype == np.float32
+
+    # Same trades as float64 from the same signals: equity within ~1e-7 relative
+    wide = Backtester(initial_capital=100000).run(prices, signals[['Signal']].astype(np.float64))
+    np.testing.assert_array_equal(results['Shares'], wide['Shares'])
+    np.testing.assert_allclose(results['Total_Equity'], wide['Total_Equity'], rtol=1e-6)
+    np.testing.assert_allclose(results['Strategy_Return'], wide['Strategy_Return'], rtol=1e-5, atol=2.5e-7)
+
+    metrics = PerformanceAnalyzer().calculate_metrics(results)
+    expected = PerformanceAnalyzer().calculate_metrics(wide)
+    for key in ['total_return', 'sharpe_ratio', 'max_drawdown', 'total_trades', 'win_rate']:
+        assert metrics[key] == pytest.approx(expected[key], rel=1e-5)
+
+def test_copy_free_backtest(prices):
+    compact = compact_prices(prices)
+    signals = create_strategy('MACD', {}).generate_signals(compact, narrow=True)
+    results = Backtester().run(compact, signals, narrow=True)
+    assert results['Signal'].dtype == np.int8 and results['Position'].dtype == np.int8
+
+def test_compact_panel(prices):
+    panel = PricePanel.from_frames({'A': compact_prices(prices)}, dtype=np.float32)
+    assert panel['Close'].dtype == np.float32
+    np.testing.assert_allclose(panel.returns()[:, 0], prices['Close'].pct_change(), rtol=1e-5, atol=2.5e-7)
@@ -0,0 +1,62 @@
+"""
+Weighted, thresholded and threaded composite voting
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_prices
+from strategies import (CompositeStrategy, MovingAverageCrossover, RSIStrategy,
+                        MACDStrategy, MomentumStrategy, create_strategy)
+
+@pytest.fixture(scope='module')
+def data():
+    return synthetic_prices(3000, seed=21)
+
+def _children():
+    return [MovingAverageCrossover({'short': 20, 'long': 50}), RSIStrategy({}),
+            MACDStrategy({}), MomentumStrategy({})]
+
+def _child_votes(data):
+    return pd.concat([child.generate_signals(data, narrow=True)['Signal'] for child in _children()], axis=1)
+
+def test_equal_weights_match_mean_vote(data):
+    mean = _child_votes(data).mean(axis=1)
+    expected = mean.apply(lambda x: 1 if x > 0.3 else (-1 if x < -0.3 else 0))
+
+    signals = CompositeStrategy(_children()).generate_signals(data)
+    pd.testing.assert_series_equal(signals['Signal'], expected, check_names=False)
+
+def test_weights_and_thresholds(data):
+    votes = _child_votes(data).to_numpy()
+    weights = np.array([3.0, 1.0, 1.0, 0.0])
+    combined = votes @ weights / weights.sum()
+    expected = np.where(combined > 0.5, 1, np.where(combined < -0.1, -1, 0))
+
+    composite = CompositeStrategy(_children(), weights=weights, buy_threshold=0.5, sell_threshold=-0.1)
+    np.testing.assert_array_equal(composite.generate_signals(data, narrow=True)['Signal'].to_numpy(), expected)
+
+    with pytest.raises(ValueError):
+        CompositeStrategy(_children(), weights=[1.0, 2.0])
+    # A zero or NaN total would divide every vote into NaN
+    for bad in ([0.0, 0.0, 0.0, 0.0], [1.0, -1.0, 0.5, -0.5], [1.0, np.nan, 1.0, 1.0]):
+        with pytest.raises(ValueError):
+            CompositeStrategy(_children(), weights=bad)
+
+def test_threaded_matches_serial(data):
+    serial = CompositeStrategy(_children(), weights=[1, 2, 3, 4]).generate_signals(data)
+    threaded = CompositeStrategy(_children(), weights=[1, 2, 3, 4], workers=4).generate_signals(data)
+    pd.testing.assert_frame_equal(threaded, serial)
+
+def test_create_composite_from_config(data):
+    composite = create_strategy('composite', {
+        'strategies': [{'name': 'SMA', 'params': {'short': 20, 'long': 50}}, {'name': 'RSI'},
+                       {'name': 'MACD'}, {'name': 'Momentum'}],
+        'weights': [1, 2, 3, 4],
+        'workers': 2,
+    })
+    expected = CompositeStrategy(_children(), weights=[1, 2, 3, 4]).generate_signals(data)
+    pd.testing.assert_frame_equal(composite.generate_signals(data), expected)
+
+    assert create_strategy('composite', {'strategies': [{'name': 'unknown'}]}) is None
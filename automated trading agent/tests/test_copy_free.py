@@ -0,0 +1,82 @@
+"""
+Copy-free mode gives the same output as the copying paths and only mutates what it documents
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from benchmarks import synthetic_prices
+from parallel_runner import run_pipeline
+from risk_manager import RiskManager
+from strategies import create_strategy
+
+STRATEGIES = [
+    ('SMA', {'short': 10, 'long': 30}),
+    ('RSI', {}),
+    ('MACD', {}),
+    ('BOLLINGER', {'period': 20}),
+    ('MOMENTUM', {'lookback': 20}),
+]
+
+@pytest.fixture
+def prices():
+    return synthetic_prices(1200, seed=13)
+
+@pytest.mark.parametrize('name, params', STRATEGIES)
+def test_narrow_signals(prices, name, params):
+    before = prices.copy()
+    wide = create_strategy(name, params).generate_signals(prices)
+    narrow = create_strategy(name, params).generate_signals(prices, narrow=True)
+
+    pd.testing.assert_frame_equal(narrow, wide[narrow.columns])
+    assert list(narrow.columns) == [column for column in wide.columns if column not in prices.columns]
+    pd.testing.assert_frame_equal(prices, before)
+
+def test_inplace_position_sizing(prices):
+    risk = RiskManager({'max_position_size': 0.5})
+    signals = create_strategy('MACD', {}).generate_signals(prices)
+    before = signals.copy()
+
+    # The copying path leaves its input alone
+    sized = risk.apply_position_sizing(signals)
+    pd.testing.assert_frame_equal(signals, before)
+
+    # In place, the sizing columns are added to the caller's frame and nothing else changes
+    narrow = create_strategy('MACD', {}).generate_signals(prices, narrow=True)
+    prices_before = prices.copy()
+    result = risk.apply_position_sizing(narrow, prices=prices, inplace=True)
+    assert result is narrow
+    pd.testing.assert_frame_equal(narrow, sized[narrow.columns])
+    assert list(narrow.columns[-2:]) == ['Volatility', 'Position_Size']
+    pd.testing.assert_frame_equal(prices, prices_before)
+
+@pytest.mark.parametrize('engine', ['auto', 'array', 'loop'])
+def test_narrow_backtest(prices, engine):
+    signals = RiskManager({}).apply_position_sizing(create_strategy('SMA', {'short': 10, 'long': 30})
+                                                   .generate_signals(prices))
+    prices_before, signals_before = prices.copy(), signals.copy()
+    wide = Backtester(engine=engine).run(prices, signals)
+    narrow = Backtester(engine=engine).run(prices, signals, narrow=True)
+
+    assert narrow.columns[0] == 'Signal'
+    pd.testing.assert_frame_equal(narrow, wide.iloc[:, len(prices.columns):])
+    np.testing.assert_array_equal(narrow['Total_Equity'], wide['Total_Equity'])
+    pd.testing.assert_frame_equal(prices, prices_before)
+    pd.testing.assert_frame_equal(signals, signals_before)
+
+@pytest.mark.parametrize('name, params', STRATEGIES)
+def test_copy_free_pipeline(prices, name, params):
+    risk = RiskManager({'max_position_size': 0.5})
+    before = prices.copy()
+    signals, results, metrics = run_pipeline(create_strategy(name, params), prices.copy(), risk, Backtester())
+    narrow_signals, narrow_results, narrow_metrics = run_pipeline(
+        create_strategy(name, params), prices, risk, Backtester(), copy_free=True)
+
+    # Same columns the copying path adds, without the price columns
+    pd.testing.assert_frame_equal(narrow_signals, signals.drop(columns=prices.columns))
+    pd.testing.assert_frame_equal(narrow_results, results[narrow_results.columns])
+    assert list(results.columns) == list(prices.columns) + list(narrow_results.columns)
+    np.testing.assert_equal(narrow_metrics, metrics)
+    pd.testing.assert_frame_equal(prices, before)
@@ -0,0 +1,75 @@
+"""
+Candidate-only correlation screening against maintained holdings
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_manager import RiskManager, PortfolioRiskManager, CorrelationScreen
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(3)
+    index = pd.bdate_range('2020-01-01', periods=400)
+    market = rng.standard_normal(400) * 0.01
+    series = {f"T{i}": pd.Series(market * rng.uniform(0, 2) + rng.standard_normal(400) * 0.01, index=index)
+              for i in range(12)}
+    # Staggered histories and gaps exercise pairwise-complete bars
+    series['T3'] = series['T3'].iloc[150:]
+    series['T5'] = series['T5'].iloc[:300]
+    series['T7'] = series['T7'].where(rng.random(400) > 0.1)
+    return series
+
+def _old_check(manager, new_position, existing_positions):
+    all_positions = existing_positions.copy()
+    all_positions[new_position['ticker']] = new_position['returns']
+    max_corr = pd.DataFrame(all_positions).corr()[new_position['ticker']].drop(new_position['ticker']).max()
+    return max_corr < manager.max_correlation
+
+def test_matches_full_correlation_matrix(returns):
+    holdings = {t: returns[t] for t in list(returns)[:8]}
+    candidates = {t: returns[t] for t in list(returns)[8:]}
+    screen = CorrelationScreen(holdings)
+
+    corr = screen.correlations(candidates)
+    expected = pd.DataFrame({**holdings, **candidates}).corr().loc[list(candidates), list(holdings)]
+    pd.testing.assert_frame_equal(corr, expected, check_exact=False, rtol=1e-10, atol=1e-12)
+
+    manager = RiskManager({'max_correlation': 0.5})
+    for ticker in returns:
+        position = {'ticker': ticker, 'returns': returns[ticker]}
+        assert manager.diversification_check(position, holdings) == _old_check(manager, position, holdings)
+
+def test_incremental_add_and_remove(returns):
+    screen = CorrelationScreen()
+    for ticker in ['T3', 'T0', 'T5', 'T7', 'T1']:
+        screen.add(ticker, returns[ticker])
+    screen.remove('T0')
+    screen.add('T2', returns['T2'])
+    screen.add('T5', returns['T5'] * 2)  # replaced in place
+
+    fresh = CorrelationScreen({t: returns[t] for t in ['T3', 'T5', 'T7', 'T1', 'T2']})
+    candidates = {t: returns[t] for t in ['T8', 'T9', 'T0']}
+    pd.testing.assert_frame_equal(screen.correlations(candidates)[list(fresh.slots)],
+                                  fresh.correlations(candidates), check_exact=False, rtol=1e-10)
+    assert len(screen) == 5 and 'T0' not in screen
+
+def test_batch_screening(returns):
+    portfolio = PortfolioRiskManager()
+    for ticker in ['T0', 'T1', 'T2']:
+        portfolio.add_position(ticker, 10, 100.0, returns=returns[ticker])
+    portfolio.remove_position('T2')
+    assert list(portfolio.correlations.slots) == ['T0', 'T1']
+
+    manager = RiskManager({'max_correlation': 0.5})
+    candidates = {t: returns[t] for t in ['T1', 'T2', 'T8', 'T9']}
+    passed = manager.screen_candidates(candidates, portfolio.correlations)
+    max_corr = manager.screen_candidates(candidates, portfolio.correlations, return_max=True)
+    expected = pd.DataFrame({**candidates, 'T0': returns['T0']}).corr()
+    # A held candidate is compared with the other holdings only
+    assert max_corr['T1'] == pytest.approx(expected.loc['T1', 'T0'])
+    assert max_corr['T8'] == pytest.approx(max(expected.loc['T8', 'T0'],
+                                               pd.concat([returns['T8'], returns['T1']], axis=1).corr().iloc[0, 1]))
+    pd.testing.assert_series_equal(passed, max_corr < 0.5)
+    assert manager.diversification_check({'ticker': 'T9', 'returns': returns['T9']}, portfolio.correlations) == passed['T9']
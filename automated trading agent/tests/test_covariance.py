@@ -0,0 +1,127 @@
+"""
+Covariance estimators, rolling rank-one updates and the shared cache
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import ledoit_wolf as sklearn_ledoit_wolf
+
+import covariance
+from covariance import (RollingCovariance, covariance_matrix, estimate_covariance, rolling_covariances,
+                        rolling_windows)
+from indicators import IndicatorCache
+from portfolio_optimizer import PortfolioOptimizer
+from risk_manager import RiskManager, PortfolioRiskManager
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(0)
+    market = rng.standard_normal((300, 1)) * 0.01
+    return market * rng.uniform(0.5, 1.5, 60) + rng.standard_normal((300, 60)) * 0.02 + 0.0005
+
+def test_estimators(returns):
+    np.testing.assert_allclose(estimate_covariance(returns), np.cov(returns, rowvar=False), rtol=1e-12)
+
+    # Fewer bars than assets: the shrunk matrix is still positive definite
+    shrunk, shrinkage = covariance.ledoit_wolf(returns[:40])
+    expected, expected_shrinkage = sklearn_ledoit_wolf(returns[:40])
+    np.testing.assert_allclose(shrunk, expected, rtol=1e-10, atol=1e-15)
+    assert shrinkage == pytest.approx(expected_shrinkage)
+    assert np.linalg.eigvalsh(shrunk).min() > 0
+
+    ewma = returns[0, :, None] * returns[0]
+    for r in returns[1:]:
+        ewma = 0.94 * ewma + 0.06 * np.outer(r, r)
+    np.testing.assert_allclose(estimate_covariance(returns, 'ewma', decay=0.94), ewma, rtol=1e-10)
+
+    factor = estimate_covariance(returns[:40], 'factor', n_factors=3)
+    np.testing.assert_allclose(np.diag(factor), np.diag(np.cov(returns[:40], rowvar=False)))
+    assert np.linalg.eigvalsh(factor).min() > 0
+
+    with pytest.raises(ValueError):
+        estimate_covariance(returns, 'kendall')
+
+def test_rolling_updates(returns):
+    stats = RollingCovariance(returns.shape[1])
+    for row in returns[:200]:
+        stats.add(row)
+    for row in returns[:50]:
+        stats.remove(row)
+    np.testing.assert_allclose(stats.covariance(), np.cov(returns[50:200], rowvar=False), rtol=1e-9)
+    np.testing.assert_allclose(stats.mean, returns[50:200].mean(axis=0), rtol=1e-9)
+
+    ends = list(range(100, 301, 7)) + [300]
+    for end, mean, cov in rolling_covariances(returns, 100, ends, refresh=10):
+        np.testing.assert_allclose(cov, np.cov(returns[end - 100:end], rowvar=False), rtol=1e-9)
+        np.testing.assert_allclose(mean, returns[end - 100:end].mean(axis=0), rtol=1e-9)
+
+@pytest.mark.parametrize('method, params', [('sample', {}), ('ledoit_wolf', {}), ('ewma', {'decay': 0.97}),
+                                           ('factor', {'n_factors': 3})])
+def test_rolling_estimators_match_cold_estimates(returns, method, params):
+    ends = list(range(80, 301, 6)) + [300]
+    columns = np.arange(returns.shape[1]) % 3 != 1
+    for end, stats in rolling_windows(returns, 80, ends, method, refresh=10, **params):
+        window = returns[end - 80:end]
+        np.testing.assert_allclose(stats.mean, window.mean(axis=0), rtol=1e-9)
+        np.testing.assert_allclose(stats.covariance(), estimate_covariance(window, method, **params),
+                                   rtol=1e-8, atol=1e-15)
+        # A subset of columns is estimated as if only those assets were added
+        np.testing.assert_allclose(stats.covariance(columns),
+                                   estimate_covariance(window[:, columns], method, **params),
+                                   rtol=1e-8, atol=1e-15)
+
+def test_cache_keyed_by_universe_and_window(returns):
+    frame = pd.DataFrame(returns, index=pd.bdate_range('2020-01-01', periods=len(returns)),
+                         columns=[f"T{i}" for i in range(returns.shape[1])])
+    cache = IndicatorCache()
+    first = covariance_matrix(frame, 'ledoit_wolf', cache=cache)
+    again = covariance_matrix(frame.copy(), 'ledoit_wolf', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(first, again)
+
+    covariance_matrix(frame.iloc[1:], 'ledoit_wolf', cache=cache)
+    covariance_matrix(frame.iloc[:, :10], 'ledoit_wolf', cache=cache)
+    covariance_matrix(frame, 'ewma', cache=cache, decay=0.97)
+    assert cache.misses == 4
+
+    # Different returns on the same universe and dates are not served the cached matrix
+    risk = RiskManager({})
+    other = frame.iloc[:, :2].copy()
+    covariance_matrix(other, 'sample', cache=cache)
+    risk.calculate_position_correlation(other, method='sample')
+    other['T1'] = other['T0'] * 2 + 0.001
+    covariance_matrix(other, 'sample', cache=cache)
+    assert cache.misses == 6
+    corr = risk.calculate_position_correlation(other, method='sample')
+    assert corr.loc['T0', 'T1'] == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        covariance_matrix(frame.iloc[:0], cache=cache)
+
+def test_feeds_optimizer_and_risk(returns):
+    frame = pd.DataFrame(returns[:, :8], index=pd.bdate_range('2020-01-01', periods=len(returns)),
+                         columns=[f"T{i}" for i in range(8)])
+    data = {ticker: pd.DataFrame({'Close': 100 * (1 + frame[ticker]).cumprod()}) for ticker in frame}
+
+    sample = PortfolioOptimizer(max_weight=0.3)
+    shrunk = PortfolioOptimizer(max_weight=0.3, covariance='ledoit_wolf')
+    weights = shrunk.optimize_allocation(data, 'min_variance', lookback=100)
+    mean, cov = shrunk._moments(sample.returns_matrix(data).to_numpy()[-100:])
+    np.testing.assert_allclose(list(weights.values()), shrunk.optimize(mean, cov, 'min_variance'), atol=1e-9)
+    assert sample.optimize_allocation(data, 'min_variance', lookback=100) != weights
+
+    # Rolling estimates match a cold solve per window
+    aligned = sample.returns_matrix(data)
+    for optimizer in [sample, shrunk, PortfolioOptimizer(max_weight=0.3, covariance='ewma')]:
+        rolling = optimizer.rolling_allocation(data, lookback=100, rebalance_every=25, objective='min_variance')
+        end = aligned.index.get_loc(rolling.index[-1]) + 1
+        mean, cov = optimizer._moments(aligned.to_numpy()[end - 100:end])
+        np.testing.assert_allclose(rolling.iloc[-1], optimizer.optimize(mean, cov, 'min_variance'), atol=1e-9)
+
+    corr = RiskManager({}).calculate_position_correlation(frame, method='sample')
+    pd.testing.assert_frame_equal(corr, frame.corr(), check_exact=False)
+
+    var = PortfolioRiskManager().calculate_portfolio_var(frame.to_dict('series'), covariance='sample')
+    total = frame.sum(axis=1)
+    assert var == pytest.approx(total.mean() - 1.6448536269514722 * total.std())
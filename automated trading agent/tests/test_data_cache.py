@@ -0,0 +1,80 @@
+"""
+Coverage of the Parquet price cache, including segments that return no rows
+"""
+
+import pandas as pd
+
+from benchmarks import synthetic_prices
+from data_cache import DataCache
+from data_fetcher import DataFetcher
+
+def _prices(start, end):
+    df = synthetic_prices(400, seed=6)
+    df.index = pd.bdate_range('2020-03-02', periods=400)
+    return df.loc[pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta(days=1)]
+
+def test_empty_segments_without_sessions_are_covered(tmp_path):
+    cache = DataCache(str(tmp_path))
+    cache.store('A', _prices('2020-03-02', '2020-05-23'), '2020-03-02', '2020-05-23')
+
+    # A weekend before the first bar and the Memorial Day weekend after the
+    # last hold no sessions: recorded, never requested again
+    cache.store('A', pd.DataFrame(), '2020-02-29', '2020-03-02')
+    cache.store('A', pd.DataFrame(), '2020-05-23', '2020-05-26')
+    assert cache.coverage('A') == (pd.Timestamp('2020-02-29'), pd.Timestamp('2020-05-26'))
+    assert cache.missing_ranges('A', '2020-02-29', '2020-05-26') == []
+    assert len(cache.load('A', '2020-02-29', '2020-05-26')) == len(_prices('2020-03-02', '2020-05-23'))
+
+    # Empty segments that could hold bars (a failed download, dates before listing) stay missing
+    cache.store('A', pd.DataFrame(), '2020-01-01', '2020-02-29')
+    cache.store('A', pd.DataFrame(), '2020-05-26', '2020-05-27')
+    assert cache.coverage('A') == (pd.Timestamp('2020-02-29'), pd.Timestamp('2020-05-26'))
+    assert cache.missing_ranges('A', '2020-01-01', '2020-05-27') == [('2020-01-01', '2020-02-29'),
+                                                                     ('2020-05-26', '2020-05-27')]
+
+    # An empty download for an unknown ticker may be a failure: nothing is recorded
+    cache.store('B', pd.DataFrame(), '2020-02-29', '2020-03-02')
+    assert cache.coverage('B') is None
+    assert cache.missing_ranges('B', '2020-02-29', '2020-03-02') == [('2020-02-29', '2020-03-02')]
+
+    # A segment detached from the cached range would leave a hole, so it is ignored
+    cache.store('A', None, '2021-01-02', '2021-01-04')
+    assert cache.coverage('A')[1] == pd.Timestamp('2020-05-26')
+
+def test_fetcher_retries_failed_top_ups(tmp_path):
+    calls = []
+    failing = set()
+
+    def provider(tickers, start, end):
+        calls.append((tuple(tickers), start, end))
+        frames = {ticker: _prices(start, end) for ticker in tickers if ticker not in failing}
+        frames = {ticker: df for ticker, df in frames.items() if not df.empty}
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price']) if frames else pd.DataFrame()
+
+    fetcher = DataFetcher(cache_dir=str(tmp_path), provider=provider)
+    fetcher.fetch_many(['A', 'B'], '2020-03-02', '2020-06-01')
+
+    # A's top-up comes back empty: the cached rows serve it for now
+    failing.add('A')
+    calls.clear()
+    data, failures = fetcher.fetch_many(['A', 'B'], '2020-03-02', '2020-07-01')
+    assert calls == [(('A', 'B'), '2020-06-01', '2020-07-01')]
+    assert failures == {} and data['A'].index[-1] == pd.Timestamp('2020-05-29')
+
+    # The next run requests it again and fills the gap
+    failing.clear()
+    calls.clear()
+    data, _ = fetcher.fetch_many(['A', 'B'], '2020-03-02', '2020-07-01')
+    assert calls == [(('A',), '2020-06-01', '2020-07-01')]
+    pd.testing.assert_frame_equal(data['A'], data['B'])
+    assert data['A'].index[-1] == pd.Timestamp('2020-06-30')
+
+    # An empty weekend head is recorded; an empty head with sessions (before listing) is retried
+    for _ in range(2):
+        calls.clear()
+        fetcher.fetch_many(['A', 'B'], '2020-02-01', '2020-07-01')
+        assert calls == [(('A', 'B'), '2020-02-01', '2020-03-02')]
+    calls.clear()
+    fetcher.fetch_many(['A', 'B'], '2020-02-29', '2020-07-01')
+    assert fetcher.fetch_stock_data('A', '2020-02-29', '2020-07-01').equals(data['A'])
+    assert calls == [(('A', 'B'), '2020-02-29', '2020-03-02')]
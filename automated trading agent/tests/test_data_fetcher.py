@@ -0,0 +1,86 @@
+"""
+Batched downloads against an offline fake provider: batch sizes, split retries and the cache
+"""
+
+import pandas as pd
+import pytest
+
+from async_fetcher import RequestLimiter
+from benchmarks import synthetic_prices
+from data_fetcher import DataFetcher
+
+START, END = '2020-01-01', '2021-01-01'
+
+class FakeProvider:
+    """Seeded bars per ticker; any request containing a 'BAD' ticker raises"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start_date, end_date):
+        self.calls.append((tuple(tickers), start_date, end_date))
+        if any(ticker.startswith('BAD') for ticker in tickers):
+            raise ConnectionError('HTTP 404')
+        frames = {}
+        for ticker in tickers:
+            df = synthetic_prices(800, seed=sum(map(ord, ticker)))
+            df.index = pd.bdate_range('2019-01-01', periods=800)
+            frames[ticker] = df.loc[pd.Timestamp(start_date):pd.Timestamp(end_date) - pd.Timedelta(days=1)]
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+    def sizes(self):
+        return [len(tickers) for tickers, _, _ in self.calls]
+
+TICKERS = [f"T{i}" for i in range(7)]
+
+def test_batch_sizes():
+    provider = FakeProvider()
+    data, failures = DataFetcher(batch_size=3, provider=provider).fetch_many(TICKERS + ['T0'], START, END)
+    assert provider.sizes() == [3, 3, 1]
+    assert failures == {} and list(data) == TICKERS
+    assert data['T0'].index[0] == pd.Timestamp('2020-01-01') and data['T0'].index[-1] == pd.Timestamp('2020-12-31')
+
+def _fetch(provider, concurrent, **kwargs):
+    fetcher = DataFetcher(provider=provider, limiter=RequestLimiter(retries=0), **kwargs)
+    fetch = fetcher.fetch_many_concurrent if concurrent else fetcher.fetch_many
+    return fetch(['T0', 'BAD1', 'T2', 'T3', 'T4'], START, END)
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_failed_batch_is_split_in_halves(concurrent):
+    provider = FakeProvider()
+    data, failures = _fetch(provider, concurrent, batch_size=5)
+    assert failures == {'BAD1': 'HTTP 404'}
+    assert sorted(data) == ['T0', 'T2', 'T3', 'T4']
+    # The batch, then halves of each failing part until BAD1 is alone
+    assert sorted(tickers for tickers, _, _ in provider.calls) == sorted([
+        ('T0', 'BAD1', 'T2', 'T3', 'T4'), ('T0', 'BAD1'), ('T2', 'T3', 'T4'), ('T0',), ('BAD1',)])
+
+    # Same results as one request per ticker
+    expected, _ = DataFetcher(batch_size=1, provider=FakeProvider()).fetch_many(sorted(data), START, END)
+    for ticker, df in expected.items():
+        pd.testing.assert_frame_equal(data[ticker], df)
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_cached_tickers_are_not_requested_again(tmp_path, concurrent):
+    provider = FakeProvider()
+    fetcher = DataFetcher(cache_dir=str(tmp_path), batch_size=50, provider=provider)
+    fetch = fetcher.fetch_many_concurrent if concurrent else fetcher.fetch_many
+    first, _ = fetch(TICKERS[:4], START, END)
+    assert provider.calls == [(tuple(TICKERS[:4]), START, END)]
+
+    # Only the new tickers are requested; the cached ones are read from disk
+    provider.calls.clear()
+    data, failures = fetch(TICKERS, START, END)
+    assert provider.calls == [(tuple(TICKERS[4:]), START, END)]
+    assert failures == {} and sorted(data) == TICKERS
+    pd.testing.assert_frame_equal(data['T0'], first['T0'])
+
+    # A longer range tops up only the missing tail, for every ticker in one request
+    provider.calls.clear()
+    data, _ = fetch(TICKERS, START, '2021-03-01')
+    assert provider.calls == [(tuple(TICKERS), END, '2021-03-01')]
+    assert data['T0'].index[-1] == pd.Timestamp('2021-02-26')
+
+    provider.calls.clear()
+    fetch(TICKERS, START, '2021-03-01')
+    assert provider.calls == []
@@ -0,0 +1,79 @@
+"""
+Offline file replay through the provider interface and DataFetcher
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_prices
+from data_fetcher import DataFetcher
+from data_providers import DataProvider, FileProvider, YFinanceProvider, create_provider
+
+@pytest.fixture
+def replay_dir(tmp_path):
+    synthetic_prices(500, seed=1).to_parquet(tmp_path / 'AAA.parquet')
+    synthetic_prices(500, seed=2).iloc[50:].to_csv(tmp_path / 'BBB.csv')
+    synthetic_prices(500, seed=3).to_parquet(tmp_path / 'BRK_B.parquet')
+    return tmp_path
+
+def test_file_provider_slices_range(replay_dir):
+    provider = FileProvider(str(replay_dir))
+    expected = synthetic_prices(500, seed=1)
+    start, end = expected.index[100], expected.index[200]
+
+    frame = provider(['AAA', 'BBB', 'MISSING'], start, end)
+    assert list(frame.columns.get_level_values(0).unique()) == ['AAA', 'BBB']
+    assert frame.columns.names == ['Ticker', 'Price']
+    assert frame.index[0] == start and frame.index[-1] < end
+    pd.testing.assert_frame_equal(frame['AAA'], expected.iloc[100:200], check_names=False, check_freq=False)
+
+def test_csv_matches_parquet(replay_dir):
+    provider = FileProvider(str(replay_dir))
+    expected = synthetic_prices(500, seed=2).iloc[50:]
+    csv = provider.load('BBB')
+    np.testing.assert_allclose(csv.to_numpy(), expected.to_numpy())
+    assert (csv.index == expected.index).all()
+
+def test_fetcher_replays_files(replay_dir):
+    fetcher = DataFetcher(provider=FileProvider(str(replay_dir)), batch_size=2)
+    index = synthetic_prices(500, seed=1).index
+    data, failures = fetcher.fetch_many(['AAA', 'BBB', 'BRK/B', 'MISSING'], index[0], index[300])
+
+    assert sorted(data) == ['AAA', 'BBB', 'BRK/B']
+    assert failures == {'MISSING': 'no data returned'}
+    assert len(data['AAA']) == 300 and len(data['BBB']) == 250
+    single = fetcher.fetch_stock_data('BRK/B', index[0], index[300])
+    pd.testing.assert_frame_equal(single, data['BRK/B'])
+
+def test_fetcher_cache_tops_up_from_files(replay_dir, tmp_path):
+    provider = FileProvider(str(replay_dir))
+    fetcher = DataFetcher(cache_dir=str(tmp_path / 'cache'), provider=provider)
+    index = synthetic_prices(500, seed=1).index
+    fetcher.fetch_many(['AAA'], index[100], index[200])
+    data, _ = fetcher.fetch_many(['AAA'], index[0], index[400])
+    assert len(data['AAA']) == 400
+
+def test_callable_provider():
+    calls = []
+
+    def downloader(tickers, start, end):
+        calls.append(tuple(tickers))
+        return pd.DataFrame()
+
+    data, failures = DataFetcher(downloader=downloader).fetch_many(['X'], '2020-01-01', '2020-02-01')
+    assert calls == [('X',)] and data == {} and failures == {'X': 'no data returned'}
+
+def test_create_provider(replay_dir):
+    assert isinstance(create_provider({}), YFinanceProvider)
+    provider = create_provider({'provider': 'files', 'replay_dir': str(replay_dir)})
+    assert isinstance(provider, FileProvider) and isinstance(provider, DataProvider)
+    with pytest.raises(ValueError):
+        create_provider({'provider': 'files'})
+    with pytest.raises(ValueError):
+        create_provider({'provider': 'bloomberg'})
+    with pytest.raises(FileNotFoundError):
+        FileProvider(str(replay_dir / 'nowhere'))
+    # The base class only declares download
+    with pytest.raises(TypeError):
+        DataProvider()
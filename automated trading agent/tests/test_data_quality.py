@@ -0,0 +1,107 @@
+"""
+Cleaning passes, fill policies and the cleaned-data cache
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_prices
+from data_fetcher import DataFetcher
+from data_providers import FileProvider
+from data_quality import DataCleaner
+
+@pytest.fixture
+def prices():
+    return synthetic_prices(400, seed=7)
+
+def _dirty(prices):
+    df = prices.copy()
+    df.iloc[50, df.columns.get_loc('Close')] = 0.0                  # impossible price
+    df.iloc[100, df.columns.get_loc('Close')] *= 3                  # bad tick
+    df.iloc[150, df.columns.get_loc('High')] = df['Low'].iloc[150] * 0.9  # High below Low
+    df.iloc[200:203, df.columns.get_loc('Open')] = np.nan            # short gap
+    df.iloc[300:310] = np.nan                                        # long gap
+    df.iloc[250, df.columns.get_loc('Volume')] = -5
+    return pd.concat([df, df.iloc[[20]]])                            # duplicate, out of order
+
+def test_clean_data_is_unchanged(prices):
+    cleaned, summary = DataCleaner().clean(prices)
+    pd.testing.assert_frame_equal(cleaned, prices)
+    assert summary['rows'] == summary['rows_clean'] == 400
+    assert summary['outliers'] == summary['dropped'] == summary['duplicates'] == 0
+
+def test_each_pass(prices):
+    cleaned, summary = DataCleaner({'max_fill': 5}).clean(_dirty(prices))
+    assert summary['duplicates'] == 1 and cleaned.index.is_monotonic_increasing
+    assert summary['non_positive'] == 1 and summary['outliers'] == 1
+    assert summary['ohlc_inconsistent'] == 1
+    # Rows 50, 100 and 200-202 are filled; of 300-309 the first five are filled
+    assert summary['filled'] == 10 and summary['dropped'] == 5
+    assert len(cleaned) == 395
+
+    close = prices['Close']
+    assert cleaned['Close'].loc[prices.index[50]] == close.iloc[49]
+    assert cleaned['Close'].loc[prices.index[100]] == close.iloc[99]
+    assert cleaned['Volume'].loc[prices.index[250]] == 0
+    row = cleaned.loc[prices.index[150]]
+    assert row['High'] >= max(row['Open'], row['Close']) and row['Low'] <= min(row['Open'], row['Close'])
+    assert (cleaned[['Open', 'High', 'Low', 'Close']] > 0).all().all()
+
+def test_lasting_jump_is_kept(prices):
+    df = prices.copy()
+    df.iloc[200:, :4] *= 2
+    cleaned, summary = DataCleaner().clean(df)
+    assert summary['outliers'] == 0
+    pd.testing.assert_frame_equal(cleaned, df)
+
+@pytest.mark.parametrize('fill, rows', [('drop', 400 - 1 - 1 - 3 - 10), ('none', 400)])
+def test_fill_policies(prices, fill, rows):
+    cleaned, summary = DataCleaner({'fill': fill}).clean(_dirty(prices))
+    assert len(cleaned) == rows and summary['filled'] == 0
+    if fill == 'none':
+        assert cleaned['Close'].isna().sum() == 12
+
+def test_ohlc_drop_policy(prices):
+    cleaned, _ = DataCleaner({'repair_ohlc': False, 'fill': 'drop'}).clean(_dirty(prices))
+    assert prices.index[150] not in cleaned.index
+
+def test_gaps_are_reported(prices):
+    df = prices.drop(prices.index[100:120])
+    _, summary = DataCleaner({'max_gap': 5}).clean(df)
+    assert summary['gaps'] == 1 and summary['longest_gap'] == str(prices.index[120] - prices.index[99])
+    with pytest.raises(ValueError):
+        DataCleaner({'fill': 'interpolate'})
+
+def test_clean_many_summary(prices):
+    data = {'A': prices, 'B': _dirty(prices)}
+    cleaned, summary = DataCleaner().clean_many(data)
+    assert list(summary.index) == ['A', 'B'] and summary.loc['B', 'outliers'] == 1
+    assert sorted(cleaned) == ['A', 'B']
+
+def test_cleaned_copy_is_cached(prices, tmp_path):
+    replay = tmp_path / 'replay'
+    replay.mkdir()
+    _dirty(prices).to_parquet(replay / 'A.parquet')
+    fetcher = DataFetcher(cache_dir=str(tmp_path / 'cache'), provider=FileProvider(str(replay)))
+    start, end = '2000-01-01', '2002-01-01'
+    data, _ = fetcher.fetch_many(['A'], start, end)
+
+    class CountingCleaner(DataCleaner):
+        calls = 0
+
+        def clean(self, df):
+            CountingCleaner.calls += 1
+            return super().clean(df)
+
+    cleaner = CountingCleaner()
+    first, quality = fetcher.clean(data, start, end, cleaner)
+    second, cached_quality = fetcher.clean(data, start, end, cleaner)
+    assert CountingCleaner.calls == 1
+    pd.testing.assert_frame_equal(second['A'], first['A'])
+    pd.testing.assert_frame_equal(cached_quality, quality)
+
+    # Another policy or date range is cleaned again
+    fetcher.clean(data, start, end, CountingCleaner({'fill': 'drop'}))
+    fetcher.clean(data, start, '2001-06-01', cleaner)
+    assert CountingCleaner.calls == 3
@@ -0,0 +1,82 @@
+"""
+Indicator memo cache: content addressing, LRU eviction and sharing across strategies
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from benchmarks import synthetic_prices
+from indicators import IndicatorCache
+from strategies import (BaseStrategy, MovingAverageCrossover, BollingerBandsStrategy,
+                        MomentumStrategy, CompositeStrategy)
+
+@pytest.fixture
+def close():
+    return synthetic_prices(2000, seed=11)['Close']
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = IndicatorCache()
+    monkeypatch.setattr(BaseStrategy, 'indicator_cache', cache)
+    return cache
+
+def test_results_match_pandas(close):
+    cache = IndicatorCache()
+    pd.testing.assert_series_equal(indicators.sma(close, 20, cache), close.rolling(20).mean())
+    pd.testing.assert_series_equal(indicators.rolling_std(close, 20, cache), close.rolling(20).std())
+    pd.testing.assert_series_equal(indicators.ema(close, 12, cache), close.ewm(span=12, adjust=False).mean())
+    pd.testing.assert_series_equal(indicators.momentum(close, 20, cache), close.pct_change(periods=20))
+
+def test_keyed_by_content_not_object(close):
+    cache = IndicatorCache()
+    first = indicators.sma(close, 20, cache)
+
+    # A copy with another index hits the same entry and keeps its own index
+    shifted = pd.Series(close.to_numpy().copy(), index=close.index + pd.Timedelta(days=1))
+    second = indicators.sma(shifted, 20, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.index.equals(shifted.index)
+    np.testing.assert_array_equal(first.to_numpy(), second.to_numpy())
+
+    # Different values or parameters are different entries
+    indicators.sma(close * 2, 20, cache)
+    indicators.sma(close, 21, cache)
+    assert cache.misses == 3 and len(cache) == 3
+
+def test_lru_eviction_under_memory_cap(close):
+    entry_bytes = close.to_numpy().nbytes
+    cache = IndicatorCache(max_bytes=2 * entry_bytes)
+
+    indicators.sma(close, 5, cache)
+    indicators.sma(close, 10, cache)
+    indicators.sma(close, 5, cache)   # 5 becomes most recently used
+    indicators.sma(close, 15, cache)  # evicts 10
+    assert len(cache) == 2 and cache.nbytes <= cache.max_bytes
+
+    misses = cache.misses
+    indicators.sma(close, 5, cache)
+    assert cache.misses == misses
+    indicators.sma(close, 10, cache)
+    assert cache.misses == misses + 1
+
+    cache.set_max_bytes(0)
+    assert len(cache) == 0 and cache.nbytes == 0
+
+def test_cached_arrays_are_read_only(close):
+    cache = IndicatorCache()
+    values = indicators.sma(close, 20, cache).to_numpy()
+    with pytest.raises(ValueError):
+        values[-1] = 0.0
+
+def test_composite_computes_shared_window_once(cache):
+    data = synthetic_prices(2000, seed=11)
+    composite = CompositeStrategy([MovingAverageCrossover({'short': 20, 'long': 50}),
+                                   BollingerBandsStrategy({'period': 20}),
+                                   MomentumStrategy({'lookback': 20})])
+    composite.generate_signals(data)
+
+    # sma 20, sma 50, std 20 and momentum 20; the Bollinger middle band reuses sma 20
+    assert cache.misses == 4
+    assert cache.hits == 1
@@ -0,0 +1,78 @@
+"""
+Alignment, lookups and cross-asset consumers of the price panel
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_prices
+from panel import PricePanel
+from portfolio_backtester import PortfolioBacktester
+from risk_manager import PortfolioRiskManager, RiskManager
+from strategies import MovingAverageCrossover
+
+@pytest.fixture
+def data():
+    frames = {f"T{i}": synthetic_prices(600, seed=i, ticker=i) for i in range(4)}
+    # Later listing, missing bars inside the range and an early delisting
+    frames['T1'] = frames['T1'].iloc[120:]
+    frames['T2'] = frames['T2'].drop(frames['T2'].index[200:230])
+    frames['T3'] = frames['T3'].iloc[:450]
+    return frames
+
+def test_alignment(data):
+    panel = PricePanel.from_frames(data)
+    calendar = data['T0'].index
+    assert panel.shape == (600, 4) and panel.index.equals(calendar)
+    assert panel.valid.sum(axis=0).tolist() == [600, 480, 570, 450]
+    for ticker, df in data.items():
+        pd.testing.assert_frame_equal(panel.frame(ticker), df.astype(np.float64), check_freq=False)
+    assert np.isnan(panel['Close'][~panel.valid]).all()
+
+def test_lookups(data):
+    panel = PricePanel.from_frames(data)
+    date = data['T2'].index[300]
+    # T2 is missing 30 bars before this date
+    assert panel.row(date) == 330 and panel.column('T2') == 2
+    assert panel.value('Close', 'T2', date) == data['T2']['Close'].loc[date]
+    assert panel.rows(data['T0'].index[10], data['T0'].index[20]) == slice(10, 20)
+    np.testing.assert_array_equal(panel.values('Open', ['T3', 'T0'])[:, 1], data['T0']['Open'])
+    assert 'T1' in panel and 'T9' not in panel
+
+def test_returns_match_per_ticker_pct_change(data):
+    panel = PricePanel.from_frames(data)
+    expected = pd.DataFrame({ticker: df['Close'].pct_change() for ticker, df in data.items()})
+    pd.testing.assert_frame_equal(panel.returns_frame(), expected, check_freq=False, rtol=1e-12)
+    assert panel.returns() is panel.returns()
+
+def test_risk_functions_accept_panel(data):
+    panel = PricePanel.from_frames(data)
+    returns = {ticker: df['Close'].pct_change() for ticker, df in data.items()}
+    risk = RiskManager({})
+    pd.testing.assert_frame_equal(risk.calculate_position_correlation(panel),
+                                  risk.calculate_position_correlation(pd.DataFrame(returns)), check_freq=False)
+    pd.testing.assert_frame_equal(risk.calculate_position_correlation(panel, method='ledoit_wolf'),
+                                  risk.calculate_position_correlation(pd.DataFrame(returns), method='ledoit_wolf'))
+
+    portfolio = PortfolioRiskManager()
+    assert portfolio.calculate_portfolio_var(panel) == portfolio.calculate_portfolio_var(returns)
+    assert portfolio.calculate_portfolio_var(panel, covariance='sample') == pytest.approx(
+        portfolio.calculate_portfolio_var(returns, covariance='sample'), rel=1e-12)
+    pd.testing.assert_series_equal(portfolio.calculate_portfolio_var(panel, window=100),
+                                   portfolio.calculate_portfolio_var(returns, window=100), check_freq=False)
+
+@pytest.mark.parametrize('tickers', [None, ['T3', 'T1']])
+def test_portfolio_backtester_on_panel(data, tickers):
+    strategy = MovingAverageCrossover({'short': 10, 'long': 30})
+    risk = RiskManager({})
+    selected = {ticker: data[ticker] for ticker in (tickers or data)}
+    signals = {ticker: risk.apply_position_sizing(strategy.generate_signals(df, narrow=True), prices=df, inplace=True)
+               for ticker, df in selected.items()}
+
+    panel = PricePanel.from_frames(data)
+    expected, expected_holdings = PortfolioBacktester().run(
+        {ticker: selected[ticker] for ticker in panel.tickers if ticker in selected}, signals)
+    results, holdings = PortfolioBacktester().run(panel, signals)
+    pd.testing.assert_frame_equal(results, expected)
+    np.testing.assert_array_equal(holdings, expected_holdings)
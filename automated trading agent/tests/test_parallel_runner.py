@@ -0,0 +1,37 @@
+"""
+The process-pool grid against the serial run
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic_prices
+from main import TradingSystem
+
+GRID_STRATEGIES = [
+    ('SMA', {'short': 10, 'long': 30}),
+    ('RSI', {'period': 14}),
+    ('MACD', {}),
+    ('BOLLINGER', {'period': 20}),
+]
+
+def _system(copy_free):
+    config = {'data': {'cache_dir': None},
+              'risk_management': {'max_position_size': 0.5, 'stop_loss': 0.02, 'take_profit': 0.05},
+              'execution': {'copy_free': copy_free}}
+    system = TradingSystem(config)
+    system.data = {f"T{i}": synthetic_prices(800, seed=3, ticker=i) for i in range(2)}
+    return system
+
+@pytest.mark.parametrize('copy_free', [False, True])
+def test_parallel_grid_matches_serial(copy_free):
+    grid = [(ticker, name, params) for ticker in ['T0', 'T1'] for name, params in GRID_STRATEGIES]
+    serial = _system(copy_free).run_grid(grid, workers=1)
+    parallel = _system(copy_free).run_grid(grid, workers=2)
+
+    assert list(parallel) == list(serial)
+    for key, expected in serial.items():
+        pd.testing.assert_frame_equal(parallel[key]['signals'], expected['signals'], check_exact=True)
+        pd.testing.assert_frame_equal(parallel[key]['results'], expected['results'], check_exact=True)
+        np.testing.assert_equal(parallel[key]['metrics'], expected['metrics'])
@@ -0,0 +1,78 @@
+"""
+Parameter sweep: the strategies' own signals, shared indicators, constraints and ranking
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic_prices
+from indicators import IndicatorCache
+from parameter_sweep import CONSTRAINTS, ParameterSweep
+from strategies import create_strategy
+
+PARAMS = {
+    'SMA': [{}, {'short': 10, 'long': 30}, {'short': 5, 'long': 120}],
+    'SMA_CROSSOVER': [{'short': 20, 'long': 50}],
+    'RSI': [{}, {'period': 7, 'oversold': 25, 'overbought': 80}, {'period': 21}],
+    'MACD': [{}, {'fast': 5, 'slow': 35, 'signal': 5}],
+}
+
+@pytest.fixture(scope='module')
+def prices():
+    return synthetic_prices(1500, seed=8)
+
+@pytest.mark.parametrize('name', sorted(PARAMS))
+def test_sweep_matches_generate_signals(prices, name):
+    sweep = ParameterSweep(name, prices)
+    for params in PARAMS[name]:
+        # Same signals as a strategy using the shared cache, so the same metrics
+        expected = create_strategy(name, params).generate_signals(prices)[['Signal']]
+        np.testing.assert_equal(sweep.evaluate(params), sweep.analyzer.calculate_metrics(
+            sweep.backtester.run(sweep.prices, expected, narrow=True)))
+    # Indicators went through the sweep's private cache, which is capped
+    assert sweep.cache.misses > 0 and sweep.cache.max_bytes == IndicatorCache().max_bytes
+
+def test_indicators_are_shared_across_combinations(prices):
+    sweep = ParameterSweep('SMA', prices)
+    table = sweep.grid_search({'short': [5, 10, 20], 'long': [50, 100]})
+    assert len(table) == 6
+    # Five distinct windows are computed once each; the other lookups hit
+    assert sweep.cache.misses == 5 and sweep.cache.hits == 7
+
+    # Four EMAs shared across the four combinations, plus each one's signal line
+    shared = IndicatorCache()
+    ParameterSweep('MACD', prices, cache=shared).grid_search({'fast': [8, 12], 'slow': [26, 30]})
+    assert shared.misses == 8 and shared.hits == 4
+
+def test_constraints_skip_invalid_combinations(prices):
+    table = ParameterSweep('SMA', prices).grid_search({'short': [10, 50, 100], 'long': [50, 100]})
+    assert sorted(zip(table['short'], table['long'])) == [(10, 50), (10, 100), (50, 100)]
+    assert (table['short'] < table['long']).all()
+
+    table = ParameterSweep('RSI', prices).grid_search({'oversold': [20, 40], 'overbought': [30, 80]})
+    assert len(table) == 3 and CONSTRAINTS['RSI']({'oversold': 40, 'overbought': 30}) is False
+
+    empty = ParameterSweep('MACD', prices).grid_search({'fast': [30], 'slow': [26]})
+    assert empty.empty
+
+def test_ranking_is_stable(prices):
+    # 'tag' is not a strategy parameter, so its three combinations tie exactly
+    grid = {'short': [10, 20], 'long': [50], 'tag': ['a', 'b', 'c']}
+    table = ParameterSweep('SMA', prices).grid_search(grid, sort_by='total_return')
+    assert table['total_return'].is_monotonic_decreasing
+    for _, tied in table.groupby('short'):
+        assert list(tied['tag']) == ['a', 'b', 'c']
+        assert tied['total_return'].nunique() == 1
+
+    by_trades = ParameterSweep('SMA', prices).grid_search(grid, sort_by='total_trades')
+    assert by_trades['total_trades'].is_monotonic_decreasing
+
+def test_other_strategies_use_generate_signals(prices):
+    sweep = ParameterSweep('BOLLINGER', prices)
+    table = sweep.grid_search({'period': [10, 20]})
+    signals = create_strategy('BOLLINGER', {'period': 20}).generate_signals(sweep.prices)
+    expected = sweep.analyzer.calculate_metrics(sweep.backtester.run(sweep.prices, signals[['Signal']], narrow=True))
+    assert table.set_index('period').loc[20, 'sharpe_ratio'] == expected['sharpe_ratio']
+
+    with pytest.raises(ValueError):
+        ParameterSweep('UNKNOWN', prices).evaluate({})
@@ -0,0 +1,144 @@
+"""
+Drawdown periods, trade statistics, the metrics kernel and its batch form
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from benchmarks import synthetic_prices
+from performance_metrics import PerformanceAnalyzer
+from strategies import MovingAverageCrossover
+
+def _results(drawdown, position, cumulative=None):
+    n = len(drawdown)
+    if cumulative is None:
+        cumulative = 1 + np.arange(n) / 100
+    cumulative = pd.Series(cumulative, dtype=np.float64)
+    strategy_returns = cumulative.pct_change().fillna(0)
+    market_returns = pd.Series(np.linspace(-0.01, 0.01, n))
+    df = pd.DataFrame({
+        'Daily_Return': market_returns,
+        'Strategy_Return': strategy_returns,
+        'Cumulative_Strategy_Return': cumulative,
+        'Cumulative_Market_Return': (1 + market_returns).cumprod(),
+        'Drawdown': drawdown,
+        'Position': position,
+    })
+    df.index = pd.bdate_range('2024-01-01', periods=n)
+    return df
+
+def test_longest_recovered_drawdown_dates():
+    drawdown = [0, -0.1, -0.2, 0, 0, -0.05, -0.1, -0.1, -0.02, 0, -0.1, -0.1, -0.1, -0.1, -0.1]
+    results = _results(drawdown, np.zeros(len(drawdown)))
+    metrics = PerformanceAnalyzer().calculate_metrics(results)
+    # Bars 5-8 recover on bar 9; the longer drawdown from bar 10 never recovers
+    assert metrics['drawdown_duration'] == 4
+    assert metrics['drawdown_start'] == results.index[5]
+    assert metrics['drawdown_end'] == results.index[9]
+
+    flat = PerformanceAnalyzer().calculate_metrics(_results(np.zeros(10), np.zeros(10)))
+    assert flat['drawdown_duration'] == 0
+    assert flat['drawdown_start'] is None and flat['drawdown_end'] is None
+
+def test_trade_statistics_and_holding_periods():
+    position = [0, 1, 1, 1, 0, 0, -1, -1, 0, 0]
+    cumulative = [1.0, 1.0, 1.05, 1.1, 1.1, 1.1, 1.1, 1.0, 1.0, 1.0]
+    results = _results(np.zeros(10), position, cumulative)
+    analyzer = PerformanceAnalyzer()
+    metrics = analyzer.calculate_metrics(results)
+
+    # Position changes on bars 1, 4, 6 and 8
+    np.testing.assert_array_equal(analyzer.holding_periods(results), [3, 2, 2])
+    assert metrics['total_trades'] == 3
+    assert metrics['win_rate'] == pytest.approx(1 / 3)
+    assert metrics['avg_win'] == pytest.approx(0.1)
+    assert metrics['avg_loss'] == pytest.approx(1.0 / 1.1 - 1)
+    assert metrics['avg_trade_duration'] == pytest.approx(10 / 4)
+
+    # Every metric is a scalar, so sweep tables get no object columns
+    assert all(np.ndim(value) == 0 for value in metrics.values())
+    assert analyzer.holding_periods(results.drop(columns='Position')).size == 0
+    assert analyzer.holding_periods(_results(np.zeros(10), np.ones(10))).size == 0
+
+def _reference_metrics(df, risk_free_rate=0.02):
+    """The per-metric formulas calculate_metrics used before the shared kernel"""
+    years = len(df) / 252
+    total_return = df['Cumulative_Strategy_Return'].iloc[-1] - 1
+    annualized = (1 + total_return) ** (1 / years) - 1
+    excess = df['Strategy_Return'] - risk_free_rate / 252
+    # Same as excess.std() without the rounding a constant shift leaves on flat curves
+    std = df['Strategy_Return'].std()
+    downside = excess[excess < 0]
+    max_drawdown = df['Drawdown'].min()
+    drawdowns = df['Drawdown'][df['Drawdown'] < 0]
+    active = df['Strategy_Return'] - df['Daily_Return']
+    market = df['Daily_Return']
+    beta = 0 if market.var() == 0 else np.cov(df['Strategy_Return'], market)[0][1] / market.var()
+    market_annualized = df['Cumulative_Market_Return'].iloc[-1] ** (1 / years) - 1
+    var = np.percentile(df['Strategy_Return'], 5)
+    return {
+        'total_return': total_return,
+        'annualized_return': annualized,
+        'volatility': std * np.sqrt(252),
+        'sharpe_ratio': 0 if std == 0 else excess.mean() / std * np.sqrt(252),
+        'sortino_ratio': 0 if len(downside) == 0 or downside.std() == 0
+        else excess.mean() / downside.std() * np.sqrt(252),
+        'calmar_ratio': 0 if max_drawdown == 0 else annualized / abs(max_drawdown),
+        'max_drawdown': max_drawdown,
+        'avg_drawdown': drawdowns.mean() if len(drawdowns) > 0 else 0,
+        'information_ratio': 0 if active.std() == 0 else active.mean() / active.std() * np.sqrt(252),
+        'beta': beta,
+        'alpha': annualized - (risk_free_rate + beta * (market_annualized - risk_free_rate)),
+        'var_95': var,
+        'cvar_95': df['Strategy_Return'][df['Strategy_Return'] <= var].mean(),
+    }
+
+def _curves():
+    """Backtests of a traded, a flat and a never-drawn-down equity curve"""
+    prices = synthetic_prices(1000, seed=4)
+    traded = Backtester(initial_capital=10000).run(
+        prices, MovingAverageCrossover({'short': 10, 'long': 40}).generate_signals(prices))
+    flat = Backtester(initial_capital=10000).run(prices, prices.assign(Signal=0))
+
+    engine = Backtester(initial_capital=10000)
+    equity = pd.Series(10000 * 1.0005 ** np.arange(1000), index=prices.index)
+    rising = prices.assign(Shares=1, Total_Equity=equity)
+    rising = rising.assign(**engine._performance_columns(prices['Close'], equity, rising['Shares']))
+    return {'traded': traded, 'flat': flat, 'rising': rising}
+
+@pytest.mark.parametrize('name', ['traded', 'flat', 'rising'])
+def test_kernel_matches_per_metric_formulas(name):
+    results = _curves()[name]
+    metrics = PerformanceAnalyzer().calculate_metrics(results)
+    for key, expected in _reference_metrics(results).items():
+        assert metrics[key] == pytest.approx(expected, rel=1e-10, abs=1e-15, nan_ok=True), key
+    if name == 'flat':
+        assert metrics['volatility'] == metrics['sharpe_ratio'] == metrics['max_drawdown'] == 0
+    if name == 'rising':
+        assert metrics['max_drawdown'] == metrics['calmar_ratio'] == metrics['avg_drawdown'] == 0
+
+def test_batch_rows_match_calculate_metrics():
+    curves = _curves()
+    analyzer = PerformanceAnalyzer()
+    frames = list(curves.values())
+    table = analyzer.calculate_metrics_batch(
+        np.stack([df['Total_Equity'].to_numpy(dtype=np.float64) for df in frames]),
+        frames[0]['Daily_Return'].to_numpy(),
+        positions=np.stack([df['Position'].to_numpy() for df in frames]),
+        initial_capital=10000,
+        index=frames[0].index
+    )
+    assert len(table) == len(frames)
+    for row, results in zip(table.to_dict('records'), frames):
+        expected = analyzer.calculate_metrics(results)
+        assert sorted(row) == sorted(expected)
+        for key, value in expected.items():
+            if value is None:
+                # Missing dates are NaT in the table
+                assert pd.isna(row[key]), key
+            elif isinstance(value, pd.Timestamp):
+                assert row[key] == value, key
+            else:
+                assert row[key] == pytest.approx(value, rel=1e-12, abs=1e-15, nan_ok=True), key
@@ -0,0 +1,73 @@
+"""
+Shared-cash portfolio backtest against the single-ticker engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from benchmarks import synthetic_prices
+from portfolio_backtester import PortfolioBacktester
+from risk_manager import RiskManager, StopTracker
+from strategies import MovingAverageCrossover, RSIStrategy, MACDStrategy
+
+@pytest.mark.parametrize('strategy', [MovingAverageCrossover({'short': 5, 'long': 20}),
+                                      RSIStrategy({}), MACDStrategy({})])
+def test_single_ticker_matches_backtester(strategy):
+    data = synthetic_prices(2000, seed=5)
+    signals = strategy.generate_signals(data)
+
+    expected = Backtester().run(data, signals)
+    results, holdings = PortfolioBacktester().run({'X': data}, {'X': signals})
+
+    for column in ['Cash', 'Total_Equity', 'Transaction_Cost', 'Drawdown', 'Position']:
+        np.testing.assert_array_equal(results[column].to_numpy(), expected[column].to_numpy())
+    np.testing.assert_array_equal(holdings[:, 0], expected['Shares'].to_numpy())
+
+def test_shared_cash_and_position_size():
+    # Staggered listings: the calendar is the union of all dates
+    data = {f"T{i}": synthetic_prices(1500, seed=9, ticker=i).iloc[100 * i:] for i in range(4)}
+    risk_manager = RiskManager({'max_position_size': 0.25})
+    signals = {ticker: risk_manager.apply_position_sizing(MACDStrategy({}).generate_signals(df))
+               for ticker, df in data.items()}
+
+    engine = PortfolioBacktester(initial_capital=100000)
+    results, holdings = engine.run(data, signals)
+
+    assert results.index.equals(data['T0'].index)
+    assert holdings.shape == (1500, 4)
+    assert (holdings[:100, 1:] == 0).all()
+    assert (results['Cash'] >= 0).all()
+
+    # No entry spends more than its Position_Size share of equity
+    close = pd.concat([df['Close'] for df in data.values()], axis=1).to_numpy()
+    size = pd.concat([s['Position_Size'] for s in signals.values()], axis=1).to_numpy()
+    entries = np.argwhere((holdings[1:] > 0) & (holdings[:-1] == 0)) + [1, 0]
+    assert len(entries) > 0
+    # Entries are sized from the equity at the bar's close, before its fees
+    equity = (results['Total_Equity'] + results['Transaction_Cost']).to_numpy()
+    for bar, j in entries:
+        assert holdings[bar, j] * close[bar, j] <= size[bar, j] * equity[bar] + 1e-9
+
+def test_stops_match_backtester():
+    data = synthetic_prices(2000, seed=5)
+    signals = MovingAverageCrossover({'short': 5, 'long': 20}).generate_signals(data)
+    stops = {'stop_loss': 0.01, 'take_profit': 0.03, 'trailing_stop': 0.02}
+
+    expected = Backtester(**stops).run(data, signals)
+    results, holdings = PortfolioBacktester(**stops).run({'X': data}, {'X': signals})
+
+    for column in ['Cash', 'Total_Equity', 'Transaction_Cost']:
+        np.testing.assert_array_equal(results[column].to_numpy(), expected[column].to_numpy())
+    np.testing.assert_array_equal(holdings[:, 0], expected['Shares'].to_numpy())
+    # Stops change which bars the positions are held on
+    assert not expected['Shares'].equals(Backtester().run(data, signals)['Shares'])
+
+def test_stop_tracker():
+    tracker = StopTracker(3, stop_loss=0.1, take_profit=0.2, trailing_stop=0.05)
+    tracker.open(np.array([0, 1, 2]), np.array([100.0, 100.0, 100.0]))
+    np.testing.assert_array_equal(tracker.update(np.array([110.0, 89.0, 119.0])), [False, True, False])
+    # Slot 0 trails from 110; slot 2 hits its target
+    np.testing.assert_array_equal(tracker.update(np.array([104.0, 50.0, 120.0])), [True, False, True])
+    assert not tracker.active.any()
@@ -0,0 +1,128 @@
+"""
+Mean-variance optimizer against a general-purpose solver, and warm-started rebalancing
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import minimize
+
+from benchmarks import synthetic_prices, synthetic_universe
+from portfolio_optimizer import OBJECTIVES, PortfolioOptimizer, _projected_gradient
+
+CAP = 0.15
+
+@pytest.fixture(scope='module')
+def moments():
+    rng = np.random.default_rng(0)
+    n, t = 25, 300
+    market = rng.standard_normal(t) * 0.01
+    returns = (market[:, None] * rng.uniform(0.5, 1.5, n) + rng.standard_normal((t, n)) * 0.02
+               + rng.normal(0.0005, 0.0005, n))
+    return PortfolioOptimizer()._moments(returns)
+
+def _reference(objective, n, extra=()):
+    constraints = [{'type': 'eq', 'fun': lambda x: x.sum() - 1}, *extra]
+    result = minimize(objective, np.full(n, 1 / n), method='SLSQP', bounds=[(0, CAP)] * n,
+                      constraints=constraints, options={'ftol': 1e-15, 'maxiter': 2000})
+    return result.x
+
+def test_min_variance(moments):
+    mean, cov = moments
+    weights = PortfolioOptimizer(max_weight=CAP).optimize(mean, cov, 'min_variance')
+    expected = _reference(lambda x: x @ cov @ x, len(mean))
+    assert weights.sum() == pytest.approx(1) and weights.min() >= 0 and weights.max() <= CAP
+    assert weights @ cov @ weights <= expected @ cov @ expected + 1e-12
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+def test_max_sharpe(moments):
+    mean, cov = moments
+    optimizer = PortfolioOptimizer(risk_free_rate=0.02, max_weight=CAP)
+    weights = optimizer.optimize(mean, cov, 'max_sharpe')
+
+    def sharpe(x):
+        return (mean @ x - 0.02) / np.sqrt(x @ cov @ x)
+    expected = _reference(lambda x: -sharpe(x), len(mean))
+    assert sharpe(weights) >= sharpe(expected) - 1e-9
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+def test_target_return(moments):
+    mean, cov = moments
+    optimizer = PortfolioOptimizer(max_weight=CAP)
+    weights = optimizer.optimize(mean, cov, 'target_return', target_return=0.25)
+    expected = _reference(lambda x: x @ cov @ x, len(mean),
+                          [{'type': 'ineq', 'fun': lambda x: mean @ x - 0.25}])
+    assert mean @ weights == pytest.approx(0.25, abs=1e-9)
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+    # A floor the minimum variance portfolio already clears changes nothing
+    floor = optimizer.optimize(mean, cov, 'target_return', target_return=-1.0)
+    np.testing.assert_array_equal(floor, optimizer.optimize(mean, cov, 'min_variance'))
+
+    with pytest.raises(ValueError):
+        optimizer.optimize(mean, cov, 'target_return', target_return=10.0)
+    with pytest.raises(ValueError):
+        PortfolioOptimizer(max_weight=0.01).optimize(mean, cov, 'min_variance')
+
+def test_warm_start_matches_cold_start(moments):
+    mean, cov = moments
+    optimizer = PortfolioOptimizer(max_weight=CAP)
+    for objective in ['min_variance', 'max_sharpe']:
+        cold = optimizer.optimize(mean, cov, objective)
+        for start in [np.full(len(mean), 1 / len(mean)), np.roll(cold, 3)]:
+            warm = optimizer.optimize(mean, cov, objective, initial_weights=start)
+            np.testing.assert_allclose(warm, cold, atol=1e-9)
+
+def test_rolling_allocation():
+    # T3 lists later: it gets no weight until it has a full lookback
+    data = {f"T{i}": synthetic_prices(400, seed=7, ticker=i) for i in range(6)}
+    data['T3'] = data['T3'].iloc[150:]
+    optimizer = PortfolioOptimizer(max_weight=0.4)
+
+    weights = optimizer.rolling_allocation(data, lookback=100, rebalance_every=20, objective='min_variance')
+    assert list(weights.columns) == list(data)
+    assert len(weights) == len(range(100, 400, 20))
+    np.testing.assert_allclose(weights.sum(axis=1), 1)
+    assert (weights.to_numpy() <= 0.4 + 1e-12).all()
+    assert (weights.loc[:data['T3'].index[100], 'T3'] == 0).all()
+
+    # Each rebalance equals a cold solve on its own window
+    last = optimizer.optimize_allocation({t: df.loc[:weights.index[-1]] for t, df in data.items()},
+                                         objective='min_variance', lookback=100)
+    np.testing.assert_allclose(weights.iloc[-1].to_numpy(), list(last.values()), atol=1e-9)
+    assert PortfolioOptimizer().optimize_allocation({}) == {}
+
+def test_projected_gradient_fallback(moments):
+    mean, cov = moments
+    expected = PortfolioOptimizer(max_weight=CAP).optimize(mean, cov, 'max_sharpe')
+    gamma = PortfolioOptimizer(max_weight=CAP)._optimize(mean, cov, 'max_sharpe', None)[1]
+    weights = _projected_gradient(cov, gamma * mean, CAP, np.full(len(mean), 1 / len(mean)))
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+@pytest.fixture(scope='module')
+def universe():
+    return dict(synthetic_universe(300, 400))
+
+@pytest.mark.parametrize('objective', OBJECTIVES)
+def test_rolling_allocation_with_more_assets_than_bars(universe, objective):
+    # 300 assets on 100-bar windows: the sample covariance is singular and
+    # many portfolios are (numerically) riskless
+    data = universe
+    optimizer = PortfolioOptimizer(max_weight=0.05)
+    weights = optimizer.rolling_allocation(data, lookback=100, rebalance_every=20, objective=objective,
+                                           target_return=0.15)
+    values = weights.to_numpy()
+    assert len(weights) == len(range(100, 400, 20))
+    np.testing.assert_allclose(values.sum(axis=1), 1, atol=1e-12)
+    assert values.min() >= 0 and values.max() <= 0.05
+
+    # The last rebalance is as good as a cold solve of its window
+    window = optimizer.returns_matrix(data).loc[:weights.index[-1]].to_numpy()[-100:]
+    mean, cov = optimizer._moments(window)
+    last = values[-1]
+    cold = optimizer.optimize(mean, cov, objective, target_return=0.15)
+    assert last @ cov @ last <= cold @ cov @ cold + 1e-12
+    if objective == 'target_return':
+        assert mean @ last >= 0.15 - 1e-10
+    if objective == 'max_sharpe':
+        assert mean @ last > optimizer.risk_free_rate
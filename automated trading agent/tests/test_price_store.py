@@ -0,0 +1,66 @@
+"""
+Round trips and zero-copy reads of the memory-mapped price store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import Backtester
+from benchmarks import synthetic_prices
+from price_store import PriceStore
+from strategies import MACDStrategy
+
+@pytest.fixture
+def universe():
+    data = {f"T{i}": synthetic_prices(3000, 'minute', seed=4, ticker=i).iloc[100 * i:] for i in range(3)}
+    # Bars missing inside the range, and a symbol needing a safe directory name
+    data['BRK/B'] = data['T1'].iloc[::3]
+    return data
+
+def _assert_same(stored, original):
+    pd.testing.assert_frame_equal(stored, original.astype(np.float64), check_freq=False, check_index_type=False)
+
+def test_round_trip(tmp_path, universe):
+    store = PriceStore.write(str(tmp_path / 'store'), universe)
+    assert sorted(store) == sorted(universe)
+    assert len(store.index) == 3000
+    for ticker, df in universe.items():
+        _assert_same(store[ticker], df)
+
+    # Reopening reads the same data
+    reopened = PriceStore(str(tmp_path / 'store'))
+    _assert_same(reopened['BRK/B'], universe['BRK/B'])
+
+def test_frames_are_read_only_views(tmp_path, universe):
+    store = PriceStore.write(str(tmp_path / 'store'), universe)
+    frame = store.frame('T2')
+    close = frame['Close'].to_numpy()
+    assert not close.flags.writeable
+    base = close
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert base is not None
+
+    # The pipeline runs on store frames without copying them
+    signals = MACDStrategy({}).generate_signals(frame, narrow=True)
+    results = Backtester().run(frame, signals, narrow=True)
+    expected = Backtester().run(universe['T2'], MACDStrategy({}).generate_signals(universe['T2']))
+    np.testing.assert_array_equal(results['Total_Equity'].to_numpy(), expected['Total_Equity'].to_numpy())
+
+def test_date_slicing_and_coverage(tmp_path, universe):
+    store = PriceStore.write(str(tmp_path / 'store'), universe, coverage=('2000-01-01', '2000-02-01'))
+    frame = store.frame('T0', '2000-01-04', '2000-01-05')
+    _assert_same(frame, universe['T0'].loc['2000-01-04':'2000-01-04 23:59'])
+
+    assert store.covers(['T0', 'T1'], '2000-01-03', '2000-01-10')
+    assert not store.covers(['T0', 'XYZ'], '2000-01-03', '2000-01-10')
+    assert not store.covers(['T0'], '1999-12-01', '2000-01-10')
+
+def test_timezones(tmp_path, universe):
+    aware = {ticker: df.tz_localize('America/New_York') for ticker, df in universe.items()}
+    store = PriceStore.write(str(tmp_path / 'aware'), aware)
+    _assert_same(store['T1'], aware['T1'])
+
+    with pytest.raises(ValueError):
+        PriceStore.write(str(tmp_path / 'mixed'), {'A': universe['T0'], 'B': aware['T1']})
@@ -0,0 +1,102 @@
+"""
+Batch vs streaming parity for every strategy with a streaming mode
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming import EWMA
+from strategies import (BaseStrategy, MovingAverageCrossover, RSIStrategy, MACDStrategy,
+                        BollingerBandsStrategy, MomentumStrategy, CompositeStrategy)
+
+@pytest.fixture(scope='module')
+def prices():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, 3000)))
+    # Flat stretch: equal values, zero variance and zero gains/losses
+    close[1200:1260] = close[1200]
+    index = pd.bdate_range('2012-01-02', periods=len(close))
+    return pd.DataFrame({'Close': close}, index=index)
+
+CASES = [
+    (MovingAverageCrossover, {'short': 20, 'long': 50}, {'sma_short': 'SMA_Short', 'sma_long': 'SMA_Long'}),
+    (MovingAverageCrossover, {}, {'sma_short': 'SMA_Short', 'sma_long': 'SMA_Long'}),
+    (RSIStrategy, {}, {'rsi': 'RSI'}),
+    (RSIStrategy, {'period': 5, 'oversold': 40, 'overbought': 60}, {'rsi': 'RSI'}),
+    (MACDStrategy, {}, {'macd': 'MACD', 'signal_line': 'Signal_Line'}),
+    (MACDStrategy, {'fast': 5, 'slow': 35, 'signal': 5}, {'macd': 'MACD', 'signal_line': 'Signal_Line'}),
+    (BollingerBandsStrategy, {}, {'upper': 'BB_Upper', 'lower': 'BB_Lower'}),
+    (BollingerBandsStrategy, {'period': 10, 'std_dev': 1}, {'upper': 'BB_Upper', 'lower': 'BB_Lower'}),
+    (MomentumStrategy, {}, {'momentum': 'Momentum'}),
+    (MomentumStrategy, {'lookback': 5, 'threshold': 0.01}, {'momentum': 'Momentum'}),
+]
+
+@pytest.mark.parametrize('strategy_cls, params, indicators', CASES)
+def test_streaming_matches_batch(prices, strategy_cls, params, indicators):
+    strategy = strategy_cls(params)
+    batch = strategy.generate_signals(prices)
+
+    state = strategy.create_state()
+    signals = []
+    values = {attr: [] for attr in indicators}
+    for close in prices['Close']:
+        signals.append(state.update(close))
+        for attr in indicators:
+            values[attr].append(getattr(state, attr))
+
+    np.testing.assert_array_equal(np.array(signals), batch['Signal'].to_numpy())
+    for attr, column in indicators.items():
+        np.testing.assert_allclose(values[attr], batch[column].to_numpy(), rtol=1e-12, equal_nan=True)
+
+def test_update_accepts_bar_rows(prices):
+    strategy = MovingAverageCrossover({'short': 5, 'long': 20})
+    state = strategy.create_state()
+    streamed = [state.update(row) for _, row in prices.iloc[:100].iterrows()]
+    np.testing.assert_array_equal(streamed, strategy.generate_signals(prices.iloc[:100])['Signal'].to_numpy())
+
+@pytest.mark.parametrize('span', [2, 9, 26])
+def test_ewma_decays_over_nan_gaps(prices, span):
+    close = prices['Close'].copy()
+    # Leading, single-bar and multi-bar gaps
+    close.iloc[:3] = np.nan
+    close.iloc[100] = np.nan
+    close.iloc[500:540] = np.nan
+    close.iloc[-5:] = np.nan
+
+    ewma = EWMA(span)
+    streamed = [ewma.update(value) for value in close]
+    np.testing.assert_allclose(streamed, close.ewm(span=span, adjust=False).mean().to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+
+def test_macd_state_matches_batch_across_gaps(prices):
+    gappy = prices.copy()
+    gappy.iloc[700:730, 0] = np.nan
+    strategy = MACDStrategy({})
+    batch = strategy.generate_signals(gappy)
+
+    state = strategy.create_state()
+    signal_line, signals = [], []
+    for close in gappy['Close']:
+        signals.append(state.update(close))
+        signal_line.append(state.signal_line)
+    np.testing.assert_allclose(signal_line, batch['Signal_Line'].to_numpy(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_array_equal(signals, batch['Signal'].to_numpy())
+
+@pytest.mark.parametrize('weights, buy_threshold, sell_threshold', [
+    (None, 0.3, None), ([0.5, 0.3, 0.2, 0.7], 0.1, -0.25)])
+def test_composite_streaming_matches_batch(prices, weights, buy_threshold, sell_threshold):
+    children = [MovingAverageCrossover({'short': 20, 'long': 50}), RSIStrategy({}),
+                MACDStrategy({}), MomentumStrategy({'lookback': 5, 'threshold': 0.01})]
+    strategy = CompositeStrategy(children, weights, buy_threshold, sell_threshold)
+    state = strategy.create_state()
+    streamed = [state.update(close) for close in prices['Close']]
+    np.testing.assert_array_equal(streamed, strategy.generate_signals(prices)['Signal'].to_numpy())
+
+def test_composite_state_needs_streaming_children():
+    class BatchOnly(BaseStrategy):
+        def generate_signals(self, data, narrow=False):
+            return data
+
+    with pytest.raises(NotImplementedError):
+        CompositeStrategy([MACDStrategy({}), BatchOnly({})]).create_state()
@@ -0,0 +1,105 @@
+"""
+Rolling and streaming VaR/CVaR against full-window recomputation
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import stats
+
+import value_at_risk
+from risk_manager import RiskManager, PortfolioRiskManager
+from value_at_risk import P2Quantile, StreamingVaR, rolling_var
+
+# The percentile RiskManager has always used for 95% VaR
+Q95 = (1 - 0.95) * 100
+
+def _returns(n=3000, seed=0):
+    # Rounded so windows contain ties
+    return np.round(np.random.default_rng(seed).standard_t(4, size=n) * 0.01, 4)
+
+@pytest.mark.parametrize('window, confidence', [(250, 0.95), (100, 0.99), (20, 0.9), (5, 0.5), (1, 0.95)])
+def test_historical_matches_percentile(window, confidence):
+    returns = _returns()
+    windows = sliding_window_view(returns, window)
+    var = np.percentile(windows, (1 - confidence) * 100, axis=1)
+    tail = windows <= var[:, None]
+    cvar = np.where(tail, windows, 0).sum(axis=1) / tail.sum(axis=1)
+
+    result = value_at_risk.rolling_historical_var(returns, window, confidence)
+    assert result['VaR'].iloc[:window - 1].isna().all()
+    np.testing.assert_array_equal(result['VaR'].to_numpy()[window - 1:], var)
+    np.testing.assert_allclose(result['CVaR'].to_numpy()[window - 1:], cvar, rtol=1e-12)
+
+@pytest.mark.parametrize('window', [250, 1])
+def test_kernels_agree(window):
+    returns = _returns(5000, seed=1)
+    lo, frac = value_at_risk._quantile_position(window, 0.95)
+    expected = value_at_risk._rolling_tail_lists(returns, window, lo, frac)
+    if window == 1:
+        # The whole one-bar window is its own tail
+        np.testing.assert_array_equal(expected[0], returns)
+        np.testing.assert_array_equal(expected[1], returns)
+    if importlib.util.find_spec('numba') is None:
+        pytest.skip('numba not installed')
+    for a, b in zip(value_at_risk._rolling_tail_jit(returns, window, lo, frac), expected):
+        np.testing.assert_array_equal(a, b)
+
+def test_missing_returns_are_skipped():
+    returns = pd.Series(_returns(600), index=pd.date_range('2020-01-01', periods=600))
+    returns.iloc[[0, 50, 300]] = np.nan
+    result = rolling_var(returns, window=100)
+    assert result.index.equals(returns.index)
+    assert result['VaR'].iloc[[0, 50, 300]].isna().all()
+    # The window is the last 100 non-missing returns
+    assert np.isnan(result['VaR'].iloc[100])
+    assert result['VaR'].iloc[101] == np.percentile(returns.iloc[:102].dropna(), Q95)
+
+def test_parametric_and_ewma():
+    returns = pd.Series(_returns())
+    z = stats.norm.ppf(0.05)
+    parametric = rolling_var(returns, 250, method='parametric')
+    expected = returns.rolling(250).mean() + z * returns.rolling(250).std()
+    np.testing.assert_allclose(parametric['VaR'], expected)
+    assert (parametric['CVaR'].dropna() < parametric['VaR'].dropna()).all()
+
+    ewma = rolling_var(returns, method='ewma', decay=0.94)
+    variance = 0.0
+    for r in returns.to_numpy():
+        variance = 0.94 * variance + 0.06 * r * r
+    assert ewma['VaR'].iloc[-1] == pytest.approx(z * np.sqrt(variance))
+
+    with pytest.raises(ValueError):
+        rolling_var(returns, method='monte_carlo')
+
+def test_streaming_quantile():
+    returns = np.random.default_rng(3).standard_normal(200000)
+    for p in [0.01, 0.05, 0.5]:
+        sketch = P2Quantile(p)
+        sketch.update_many(returns)
+        assert sketch.value == pytest.approx(np.quantile(returns, p), abs=0.02)
+
+    small = P2Quantile(0.5)
+    small.update_many([3.0, 1.0, 2.0])
+    assert small.value == 2.0
+
+    stream = StreamingVaR(0.95)
+    stream.update_many(returns)
+    tail = returns[returns <= np.quantile(returns, 0.05)]
+    assert stream.var == pytest.approx(np.quantile(returns, 0.05), abs=0.02)
+    assert stream.cvar == pytest.approx(tail.mean(), abs=0.05)
+
+def test_risk_managers_roll_with_a_window():
+    returns = pd.Series(_returns(1000))
+    manager = RiskManager({})
+    assert manager.calculate_var(returns) == np.percentile(returns, Q95)
+    rolling = manager.calculate_var(returns, window=250)
+    assert rolling.iloc[-1] == np.percentile(returns.iloc[-250:], Q95)
+
+    portfolio = PortfolioRiskManager()
+    both = {'A': returns, 'B': returns * 0.5}
+    total = pd.DataFrame(both).sum(axis=1)
+    assert portfolio.calculate_portfolio_var(both, window=250).iloc[-1] == np.percentile(total.iloc[-250:], Q95)
@@ -0,0 +1,341 @@
+"""
+Value at Risk
+Rolling historical, parametric and EWMA VaR/CVaR, and a streaming quantile
+"""
+
+import bisect
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+
+try:
+    from numba import njit
+except ImportError:  # Optional: the list-based kernel is used without it
+    njit = None
+
+METHODS = ('historical', 'parametric', 'ewma')
+
+def _quantile_position(window, confidence):
+    """Order statistic and interpolation weight of np.percentile's linear method"""
+    index = (window - 1) * (((1 - confidence) * 100) / 100)
+    lo = int(np.floor(index))
+    return lo, index - lo
+
+def _rolling_tail_bars(values, window, lo, frac):
+    """
+    Rolling lower quantile and tail mean over a sorted window buffer
+
+    Written for numba's nopython mode. Each bar finds the outgoing and
+    incoming returns by binary search and moves only the slots between
+    them, and keeps the sum of the lo + 1 smallest returns up to date, so
+    a bar costs a partial shift of the buffer instead of a sort. The tail
+    sum is re-added from the buffer once per window to stop rounding drift.
+
+    Returns:
+        Tuple of (var, cvar) arrays, NaN until the window is full
+    """
+    n = len(values)
+    var = np.full(n, np.nan)
+    cvar = np.full(n, np.nan)
+    buf = np.empty(window)
+    m = 0
+    tail = 0.0
+    for i in range(n):
+        x = values[i]
+        if i < window:
+            q = np.searchsorted(buf[:m], x, side='right')
+            if q <= lo:
+                tail += x
+                if m > lo:
+                    tail -= buf[lo]
+            for j in range(m, q, -1):
+                buf[j] = buf[j - 1]
+            buf[q] = x
+            m += 1
+        else:
+            # Replace the outgoing return in one shift of the slots between
+            # its position and the incoming return's
+            old = values[i - window]
+            p = np.searchsorted(buf, old)
+            q = np.searchsorted(buf, x, side='right')
+            if q > p:
+                q -= 1
+            entering = buf[lo]
+            if p <= lo:
+                tail -= old
+                # With the whole window in the tail nothing moves up into it
+                entering = buf[lo + 1] if lo + 1 < window else 0.0
+                tail += entering
+            if q <= lo:
+                tail += x
+                tail -= entering
+            for j in range(p, q):
+                buf[j] = buf[j + 1]
+            for j in range(p, q, -1):
+                buf[j] = buf[j - 1]
+            buf[q] = x
+
+        if m < window:
+            continue
+        if i % window == 0:
+            tail = 0.0
+            for j in range(lo + 1):
+                tail += buf[j]
+        a = buf[lo]
+        b = buf[lo + 1] if lo + 1 < window else a
+        diff = b - a
+        level = a + diff * frac if frac < 0.5 else b - diff * (1 - frac)
+        # Ties with the quantile belong to the tail
+        total = tail
+        count = lo + 1
+        while count < window and buf[count] <= level:
+            total += buf[count]
+            count += 1
+        var[i] = level
+        cvar[i] = total / count
+    return var, cvar
+
+def _rolling_tail_lists(values, window, lo, frac):
+    """Same algorithm as _rolling_tail_bars on Python lists (no numba)"""
+    values = values.tolist()
+    n = len(values)
+    var = np.full(n, np.nan)
+    cvar = np.full(n, np.nan)
+    buf = []
+    tail = 0.0
+    for i in range(n):
+        x = values[i]
+        if i >= window:
+            old = values[i - window]
+            p = bisect.bisect_left(buf, old)
+            if p <= lo:
+                tail -= old
+                if lo + 1 < window:
+                    tail += buf[lo + 1]
+            del buf[p]
+        q = bisect.bisect_right(buf, x)
+        if q <= lo:
+            tail += x
+            if len(buf) > lo:
+                tail -= buf[lo]
+        buf.insert(q, x)
+
+        if len(buf) < window:
+            continue
+        if i % window == 0:
+            tail = 0.0
+            for j in range(lo + 1):
+                tail += buf[j]
+        a = buf[lo]
+        b = buf[lo + 1] if lo + 1 < window else a
+        diff = b - a
+        level = a + diff * frac if frac < 0.5 else b - diff * (1 - frac)
+        total = tail
+        count = lo + 1
+        while count < window and buf[count] <= level:
+            total += buf[count]
+            count += 1
+        var[i] = level
+        cvar[i] = total / count
+    return var, cvar
+
+# Compiled on first use when numba is installed
+_rolling_tail_jit = njit(cache=True, nogil=True)(_rolling_tail_bars) if njit is not None else None
+
+def _as_series(returns):
+    if isinstance(returns, pd.Series):
+        return returns
+    return pd.Series(np.asarray(returns, dtype=np.float64))
+
+def _frame(var, cvar, index):
+    return pd.DataFrame({'VaR': var, 'CVaR': cvar}, index=index)
+
+def rolling_historical_var(returns, window=250, confidence=0.95):
+    """
+    Rolling historical VaR and CVaR
+
+    VaR matches np.percentile(window, (1 - confidence) * 100) for every
+    window of the last `window` non-missing returns; CVaR is the mean of
+    the window's returns at or below it. Missing returns are skipped and
+    get NaN.
+
+    Returns:
+        DataFrame with 'VaR' and 'CVaR' columns on the returns' index
+    """
+    series = _as_series(returns)
+    values = series.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    lo, frac = _quantile_position(window, confidence)
+
+    kernel = _rolling_tail_jit if _rolling_tail_jit is not None else _rolling_tail_lists
+    tail_var, tail_cvar = kernel(np.ascontiguousarray(values[valid]), window, lo, frac)
+
+    var = np.full(len(values), np.nan)
+    cvar = np.full(len(values), np.nan)
+    var[valid] = tail_var
+    cvar[valid] = tail_cvar
+    return _frame(var, cvar, series.index)
+
+def _normal_tail(confidence):
+    """Lower quantile z of the standard normal and its expected shortfall factor"""
+    z = stats.norm.ppf(1 - confidence)
+    return z, stats.norm.pdf(z) / (1 - confidence)
+
+def parametric_var(returns, window=250, confidence=0.95):
+    """
+    Rolling Gaussian VaR and CVaR from the window mean and standard deviation
+
+    Returns:
+        DataFrame with 'VaR' and 'CVaR' columns on the returns' index
+    """
+    series = _as_series(returns)
+    rolling = series.rolling(window)
+    mean = rolling.mean().to_numpy()
+    std = rolling.std().to_numpy()
+    z, shortfall = _normal_tail(confidence)
+    return _frame(mean + z * std, mean - shortfall * std, series.index)
+
+def ewma_var(returns, confidence=0.95, decay=0.94):
+    """
+    RiskMetrics VaR and CVaR from an exponentially weighted variance
+
+    sigma^2 is updated as decay * sigma^2 + (1 - decay) * r^2 with a zero
+    mean, so each bar costs O(1) and no window is kept.
+
+    Returns:
+        DataFrame with 'VaR' and 'CVaR' columns on the returns' index
+    """
+    series = _as_series(returns)
+    variance = (series ** 2).ewm(alpha=1 - decay, adjust=False, ignore_na=True).mean()
+    std = np.sqrt(variance.to_numpy())
+    z, shortfall = _normal_tail(confidence)
+    return _frame(z * std, -shortfall * std, series.index)
+
+def rolling_var(returns, window=250, confidence=0.95, method='historical', decay=0.94):
+    """
+    Rolling VaR and CVaR by method name
+
+    Args:
+        returns: Series or array of periodic returns
+        window: Lookback in bars ('historical' and 'parametric')
+        confidence: VaR confidence level
+        method: 'historical', 'parametric' or 'ewma'
+        decay: EWMA decay factor ('ewma')
+    """
+    if method == 'historical':
+        return rolling_historical_var(returns, window, confidence)
+    if method == 'parametric':
+        return parametric_var(returns, window, confidence)
+    if method == 'ewma':
+        return ewma_var(returns, confidence, decay)
+    raise ValueError(f"Unknown VaR method: {method}")
+
+class P2Quantile:
+    """
+    Streaming quantile estimate in O(1) memory (Jain & Chlamtac P^2)
+
+    Five markers track the minimum, the p/2, p and (1+p)/2 quantiles and
+    the maximum; each observation moves them by a piecewise-parabolic
+    step. The first five observations are kept exactly.
+    """
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("p must be between 0 and 1")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        """Add one observation; NaN is ignored"""
+        if x != x:
+            return
+        self.count += 1
+        heights = self.heights
+        if self.count <= 5:
+            bisect.insort(heights, x)
+            return
+
+        positions = self.positions
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(heights, x) - 1
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def update_many(self, values):
+        for x in np.asarray(values, dtype=np.float64).tolist():
+            self.update(x)
+
+    def _parabolic(self, i, step):
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        """Current estimate (exact for up to five observations)"""
+        if self.count == 0:
+            return np.nan
+        if self.count <= 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        return self.heights[2]
+
+class StreamingVaR:
+    """
+    VaR and CVaR of an unbounded return stream
+
+    VaR is a P^2 estimate of the lower quantile. CVaR averages the returns
+    that fell at or below the VaR estimate current when they arrived, so
+    it converges for a stationary stream but lags regime changes. Use
+    rolling_var for a bounded lookback.
+    """
+
+    def __init__(self, confidence=0.95):
+        self.confidence = confidence
+        self.quantile = P2Quantile(1 - confidence)
+        self.tail_sum = 0.0
+        self.tail_count = 0
+
+    def update(self, x):
+        """Add one return; NaN is ignored"""
+        if x != x:
+            return
+        self.quantile.update(x)
+        if x <= self.quantile.value:
+            self.tail_sum += x
+            self.tail_count += 1
+
+    def update_many(self, returns):
+        for x in np.asarray(returns, dtype=np.float64).tolist():
+            self.update(x)
+
+    @property
+    def var(self):
+        return self.quantile.value
+
+    @property
+    def cvar(self):
+        return self.tail_sum / self.tail_count if self.tail_count else np.nan